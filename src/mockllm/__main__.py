@@ -1,9 +1,237 @@
+import argparse
+import importlib.util
+import os
+import sys
+from typing import List, Optional
+
 import uvicorn
 
+from .env import (
+    BATCH_ENV,
+    PROFILE_ENV,
+    PROFILE_SLOWEST_ENV,
+    RECORD_ENV,
+    REPLAY_ENV,
+    REPLAY_PACE_ENV,
+    RESPONSES_ENV,
+    SNAPSHOT_ENV,
+)
+from .recording import REPLAY_PACES
+from .snapshot import compile_snapshot
+
+OPTIONAL_BACKENDS = {"uvloop": "uvloop", "httptools": "httptools"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="mockllm", description="Mock LLM Server - You will do what I tell you!"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run the mock LLM server")
+    serve.add_argument("--host", default="0.0.0.0", help="Bind address")
+    serve.add_argument("--port", type=int, default=8000, help="Bind port")
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes (ignored with --dev)",
+    )
+    serve.add_argument(
+        "--config",
+        default=os.environ.get(RESPONSES_ENV, "responses.yml"),
+        help="Path to the responses YAML file",
+    )
+    serve.add_argument(
+        "--loop",
+        choices=["auto", "asyncio", "uvloop"],
+        default="auto",
+        help="Event loop implementation",
+    )
+    serve.add_argument(
+        "--http",
+        choices=["auto", "h11", "httptools"],
+        default="auto",
+        help="HTTP protocol implementation",
+    )
+    serve.add_argument(
+        "--backlog", type=int, default=2048, help="Maximum pending connections"
+    )
+    serve.add_argument(
+        "--timeout-keep-alive",
+        type=int,
+        default=5,
+        help="Seconds to keep idle connections open",
+    )
+    serve.add_argument(
+        "--log-level",
+        default="info",
+        choices=["critical", "error", "warning", "info", "debug", "trace"],
+    )
+    serve.add_argument(
+        "--record",
+        metavar="PATH",
+        help="Append every request and the response served to a JSONL log",
+    )
+    serve.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="Answer requests from a JSONL log captured with --record",
+    )
+    serve.add_argument(
+        "--replay-pace",
+        choices=REPLAY_PACES,
+        default="full",
+        help="Replay at full speed or with the recorded timings",
+    )
+    serve.add_argument(
+        "--snapshot",
+        metavar="PATH",
+        help="Load the config from a compiled snapshot, rebuilding it when stale",
+    )
+    serve.add_argument(
+        "--batch-dir",
+        metavar="PATH",
+        help="Store batch input and result files here (default: a temporary dir)",
+    )
+    serve.add_argument(
+        "--profile",
+        type=float,
+        metavar="RATE",
+        help="Profile this fraction of requests (0-1), served at /admin/profile",
+    )
+    serve.add_argument(
+        "--profile-slowest",
+        type=int,
+        default=20,
+        metavar="N",
+        help="Number of slowest profiled requests to keep",
+    )
+    serve.add_argument(
+        "--dev",
+        action="store_true",
+        help="Development mode: single process with auto-reload on code changes",
+    )
+    bench = commands.add_parser(
+        "bench", help="Benchmark the chat endpoints and report latency"
+    )
+    bench.add_argument(
+        "--url",
+        help="Benchmark a running server at this URL instead of in-process",
+    )
+    bench.add_argument(
+        "--config",
+        default=os.environ.get(RESPONSES_ENV, "responses.yml"),
+        help="Responses file for the in-process server",
+    )
+    bench.add_argument("--requests", type=int, default=200)
+    bench.add_argument("--concurrency", type=int, default=10)
+    bench.add_argument("--warmup", type=int, default=10)
+    bench.add_argument(
+        "--provider",
+        default="openai,anthropic",
+        help="Comma-separated providers: openai, anthropic",
+    )
+    bench.add_argument(
+        "--stream",
+        choices=["on", "off", "both"],
+        default="both",
+        help="Benchmark streaming, non-streaming or both",
+    )
+    bench.add_argument(
+        "--lag",
+        choices=["config", "on", "off", "both"],
+        default="config",
+        help="Override lag_enabled (in-process only)",
+    )
+    bench.add_argument("--prompt", default="what colour is the sky?")
+    bench.add_argument("--model", help="Model name sent in requests")
+    bench.add_argument(
+        "--output", help="Write the JSON report to this file ('-' for stdout)"
+    )
+    compile_ = commands.add_parser(
+        "compile", help="Validate a responses file and write its snapshot"
+    )
+    compile_.add_argument(
+        "config",
+        nargs="?",
+        default=os.environ.get(RESPONSES_ENV, "responses.yml"),
+        help="Path to the responses YAML file",
+    )
+    compile_.add_argument(
+        "-o",
+        "--output",
+        help="Snapshot path (default: the config path with .snapshot.json)",
+    )
+    return parser
+
 
-def main() -> None:
+def serve(args: argparse.Namespace) -> None:
+    """Run the server with uvicorn."""
+    # Worker processes import mockllm.server themselves and read the
+    # config path from the environment they inherit.
+    os.environ[RESPONSES_ENV] = args.config
+    for name, value in (
+        (RECORD_ENV, args.record),
+        (REPLAY_ENV, args.replay),
+        (REPLAY_PACE_ENV, args.replay_pace),
+        (SNAPSHOT_ENV, args.snapshot),
+        (BATCH_ENV, args.batch_dir),
+        (PROFILE_ENV, args.profile and str(args.profile)),
+        (PROFILE_SLOWEST_ENV, str(args.profile_slowest)),
+    ):
+        if value:
+            os.environ[name] = value
+    uvicorn.run(
+        "mockllm.server:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.dev else args.workers,
+        reload=args.dev,
+        loop=args.loop,
+        http=args.http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.timeout_keep_alive,
+        log_level=args.log_level,
+    )
+
+
+def compile_config(args: argparse.Namespace) -> None:
+    """Validate the responses file and write its snapshot."""
+    output = args.output or f"{os.path.splitext(args.config)[0]}.snapshot.json"
+    try:
+        data = compile_snapshot(args.config, output)
+    except (OSError, ValueError) as e:
+        raise SystemExit(f"{args.config}: {e}") from e
+    print(f"Compiled {len(data.get('responses', {}))} responses to {output}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """Run the mock LLM server."""
-    uvicorn.run("mockllm.server:app", host="0.0.0.0", port=8000, reload=True)
+    parser = build_parser()
+    argv = sys.argv[1:] if argv is None else argv
+    # ``mockllm [options]`` with no command is shorthand for ``mockllm serve``
+    if not argv or (argv[0].startswith("-") and argv[0] not in ("-h", "--help")):
+        argv = ["serve", *argv]
+    args = parser.parse_args(argv)
+    if args.command == "bench":
+        # The in-process benchmark pulls in the test client, which serving
+        # doesn't need
+        from . import bench
+
+        bench.run(args)
+        return
+    if args.command == "compile":
+        compile_config(args)
+        return
+    for backend in (args.loop, args.http):
+        module = OPTIONAL_BACKENDS.get(backend)
+        if module and importlib.util.find_spec(module) is None:
+            parser.error(f"{backend} is not installed (pip install {module})")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.profile is not None and not 0 < args.profile <= 1:
+        parser.error("--profile must be between 0 and 1")
+    serve(args)
 
 
 if __name__ == "__main__":
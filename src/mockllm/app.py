@@ -0,0 +1,398 @@
+"""The mock server's routes, and the factory that builds an app around them.
+
+An app serves from the ``ServerState`` it is created with rather than from
+module globals, so any number of independent apps can live in one process.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Union
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import (
+    FileResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+
+from . import metrics, profiling
+from .batches import BatchStore, parse_upload
+from .config import ResponseConfig
+from .models import (
+    AnthropicChatRequest,
+    BatchCreateRequest,
+    MessageBatchCreateRequest,
+    OpenAIChatRequest,
+    OpenAICompletionRequest,
+    OpenAIEmbeddingRequest,
+)
+from .profiling import Profiler, ProfilingMiddleware
+from .providers.anthropic import AnthropicProvider
+from .providers.base import LLMProvider
+from .providers.completions import CompletionsProvider
+from .providers.embeddings import EmbeddingsProvider
+from .providers.openai import OpenAIProvider
+from .recording import Recorder, ReplayLog
+from .streaming import cancel_on_disconnect
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """A stream that frees its rate limit slot once it has been sent.
+
+    The slot is freed when the response is done with, even if its body is
+    never iterated because the client went away before the first event.
+    """
+
+    def __init__(self, response: StreamingResponse, release: Callable[[], None]):
+        super().__init__(
+            response.body_iterator,
+            status_code=response.status_code,
+            background=response.background,
+        )
+        self.raw_headers = response.raw_headers
+        self._release = release
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._release()
+
+
+class ServerState:
+    """The configuration, providers and batch store one app serves from."""
+
+    def __init__(
+        self,
+        response_config: ResponseConfig,
+        recorder: Optional[Recorder] = None,
+        replay: Optional[ReplayLog] = None,
+        batches: Optional[BatchStore] = None,
+        profiler: Optional[Profiler] = None,
+    ):
+        self.response_config = response_config
+        self.profiler = profiler
+        self.openai = OpenAIProvider(response_config, recorder, replay)
+        self.anthropic = AnthropicProvider(response_config, recorder, replay)
+        self.completions = CompletionsProvider(response_config, recorder, replay)
+        self.embeddings = EmbeddingsProvider(response_config)
+        self.batches = batches if batches is not None else BatchStore()
+        self.batch_handlers = {
+            provider.route: provider.batch_response
+            for provider in (self.openai, self.completions, self.embeddings)
+        }
+
+
+def create_app(
+    response_config: ResponseConfig,
+    recorder: Optional[Recorder] = None,
+    replay: Optional[ReplayLog] = None,
+    batches: Optional[BatchStore] = None,
+    profiler: Optional[Profiler] = None,
+) -> FastAPI:
+    """A mock server app serving from ``response_config``.
+
+    With a ``profiler``, a sample of requests is traced and the results are
+    served under ``/admin/profile``.
+    """
+    app = FastAPI(title="Mock LLM Server")
+    app.state.mockllm = ServerState(
+        response_config, recorder, replay, batches, profiler
+    )
+    app.include_router(router)
+    if profiler is not None:
+        app.add_middleware(ProfilingMiddleware, profiler=profiler)
+    return app
+
+
+def server_state(http_request: Request) -> ServerState:
+    state: ServerState = http_request.app.state.mockllm
+    return state
+
+
+def api_key(http_request: Request) -> str:
+    """The caller's API key, used to give each client its own rate limits."""
+    authorization = http_request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return http_request.headers.get("x-api-key", "")
+
+
+def count_request(provider: Union[LLMProvider, EmbeddingsProvider], model: str) -> None:
+    """Count a request, labelled with its model if the config names it."""
+    label = provider.response_config.model_label(model)
+    metrics.REQUESTS.inc(provider.route, label)
+
+
+async def dispatch(
+    provider: LLMProvider,
+    request: Union[OpenAIChatRequest, AnthropicChatRequest, OpenAICompletionRequest],
+    http_request: Request,
+    response: Response,
+) -> Union[Dict[str, Any], Response]:
+    """Admit a request under the rate limits and pass it to its provider.
+
+    Injected faults that affect the whole response are applied here too.
+    """
+    trace = profiling.current()
+    if trace is not None:
+        trace.entered()
+    response_config = provider.response_config
+    fault = None
+    if response_config.faults is not None:
+        fault = response_config.faults.pick(
+            provider.route,
+            request.model,
+            provider.last_user_message(request) or "",
+            bool(request.stream),
+        )
+        if fault is not None and fault.type == "error":
+            raise HTTPException(
+                status_code=fault.status,
+                detail=fault.message,
+                headers={"retry-after": "1"} if fault.status == 429 else None,
+            )
+    limiter = response_config.limiter
+    headers: Dict[str, str] = {}
+    if limiter is not None:
+        headers = provider.admit(limiter, request, api_key(http_request))
+    # Set while this request holds a stream slot that nothing else will free
+    release = limiter.release if limiter is not None and request.stream else None
+    try:
+        if fault is not None and fault.type == "slow_headers":
+            await asyncio.sleep(fault.duration)
+        result = await provider.handle_chat_completion(request)
+    except BaseException as e:
+        if release is not None:
+            release()
+        if not isinstance(e, Exception):
+            raise
+        logger.error(f"Error processing request: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Internal server error: {str(e)}"
+        ) from e
+    if isinstance(result, StreamingResponse):
+        if fault is not None:
+            result.body_iterator = fault.apply(result.body_iterator)
+        result.body_iterator = cancel_on_disconnect(
+            result.body_iterator, http_request.receive, provider.route
+        )
+        result.headers.update(headers)
+        if release is not None:
+            result = SlotStreamingResponse(result, release)
+    else:
+        if release is not None:
+            # A stream request answered without a stream
+            release()
+        if fault is not None and fault.type == "truncate":
+            body = json.dumps(result).encode("utf-8")
+            return Response(
+                body[: len(body) // 2], media_type="application/json", headers=headers
+            )
+        response.headers.update(headers)
+    if trace is not None and not isinstance(result, StreamingResponse):
+        trace.returned()
+    return result
+
+
+@router.post("/v1/chat/completions", response_model=None)
+async def openai_chat_completion(
+    request: OpenAIChatRequest,
+    http_request: Request,
+    response: Response,
+) -> Union[Dict[str, Any], Response]:
+    """Handle OpenAI chat completion requests"""
+    logger.info(
+        "Received chat completion request",
+        extra={
+            "model": request.model,
+            "message_count": len(request.messages),
+            "stream": request.stream,
+        },
+    )
+    provider = server_state(http_request).openai
+    count_request(provider, request.model)
+    return await dispatch(provider, request, http_request, response)
+
+
+@router.post("/v1/messages", response_model=None)
+async def anthropic_chat_completion(
+    request: AnthropicChatRequest,
+    http_request: Request,
+    response: Response,
+) -> Union[Dict[str, Any], Response]:
+    """Handle Anthropic chat completion requests"""
+    logger.info(
+        "Received Anthropic chat completion request",
+        extra={
+            "model": request.model,
+            "message_count": len(request.messages),
+            "stream": request.stream,
+        },
+    )
+    provider = server_state(http_request).anthropic
+    count_request(provider, request.model)
+    return await dispatch(provider, request, http_request, response)
+
+
+@router.post("/v1/completions", response_model=None)
+async def openai_completion(
+    request: OpenAICompletionRequest,
+    http_request: Request,
+    response: Response,
+) -> Union[Dict[str, Any], Response]:
+    """Handle OpenAI legacy text completion requests"""
+    logger.info(
+        "Received completion request",
+        extra={"model": request.model, "stream": request.stream},
+    )
+    provider = server_state(http_request).completions
+    count_request(provider, request.model)
+    prompts = provider.prompts(request)
+    if not prompts:
+        raise HTTPException(status_code=400, detail="No prompt found in request")
+    if request.stream and len(prompts) > 1:
+        raise HTTPException(
+            status_code=400, detail="Streaming supports a single prompt"
+        )
+    return await dispatch(provider, request, http_request, response)
+
+
+@router.post("/v1/embeddings")
+async def openai_embeddings(
+    request: OpenAIEmbeddingRequest, http_request: Request
+) -> Dict[str, Any]:
+    """Handle OpenAI embeddings requests"""
+    provider = server_state(http_request).embeddings
+    count_request(provider, request.model)
+    try:
+        return provider.embeddings_response(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+def enabled_profiler(http_request: Request) -> Profiler:
+    profiler = server_state(http_request).profiler
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled")
+    return profiler
+
+
+@router.get("/admin/profile")
+async def profile(http_request: Request) -> Dict[str, Any]:
+    """Phase timings of sampled requests, and the slowest of them"""
+    return enabled_profiler(http_request).report()
+
+
+@router.get("/admin/profile/flame")
+async def profile_flame(http_request: Request) -> PlainTextResponse:
+    """Stack samples of the event loop thread, in collapsed flame graph format.
+
+    The loop is sampled while any sampled request is in flight, so the stacks
+    include unsampled requests served at the same time.
+    """
+    return PlainTextResponse(enabled_profiler(http_request).sampler.collapsed())
+
+
+@router.delete("/admin/profile")
+async def reset_profile(http_request: Request) -> Dict[str, Any]:
+    enabled_profiler(http_request).reset()
+    return {"reset": True}
+
+
+@router.get("/metrics")
+async def metrics_endpoint() -> Response:
+    """Expose in-process metrics in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@router.post("/v1/files")
+async def create_file(http_request: Request) -> Dict[str, Any]:
+    """Upload a file, such as the JSONL input of a batch"""
+    body = await http_request.body()
+    content_type = http_request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        try:
+            body, fields = parse_upload(content_type, body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e)) from e
+    else:
+        # A raw JSONL body, for clients without multipart support
+        fields = dict(http_request.query_params)
+    return server_state(http_request).batches.create_file(
+        body,
+        fields.get("filename", "upload.jsonl"),
+        fields.get("purpose", "batch"),
+    )
+
+
+@router.get("/v1/files/{file_id}")
+async def retrieve_file(file_id: str, http_request: Request) -> Dict[str, Any]:
+    return server_state(http_request).batches.get_file(file_id)
+
+
+@router.get("/v1/files/{file_id}/content")
+async def file_content(file_id: str, http_request: Request) -> FileResponse:
+    batches = server_state(http_request).batches
+    batches.get_file(file_id)
+    return FileResponse(batches.path(file_id), media_type="application/jsonl")
+
+
+@router.post("/v1/batches")
+async def create_batch(
+    request: BatchCreateRequest, http_request: Request
+) -> Dict[str, Any]:
+    """Process a JSONL file of chat requests as an OpenAI batch"""
+    state = server_state(http_request)
+    handler = state.batch_handlers.get(request.endpoint)
+    if handler is None:
+        raise HTTPException(
+            status_code=400, detail=f"Unsupported batch endpoint: {request.endpoint}"
+        )
+    logger.info("Received batch", extra={"input_file_id": request.input_file_id})
+    return await state.batches.create_batch(
+        request.input_file_id,
+        request.endpoint,
+        handler,
+        request.completion_window,
+        request.metadata,
+    )
+
+
+@router.get("/v1/batches/{batch_id}")
+async def retrieve_batch(batch_id: str, http_request: Request) -> Dict[str, Any]:
+    return server_state(http_request).batches.get_batch(batch_id)
+
+
+@router.post("/v1/messages/batches")
+async def create_message_batch(
+    request: MessageBatchCreateRequest, http_request: Request
+) -> Dict[str, Any]:
+    """Process chat requests as an Anthropic message batch"""
+    state = server_state(http_request)
+    logger.info("Received message batch", extra={"requests": len(request.requests)})
+    return await state.batches.create_message_batch(
+        [(item.custom_id, item.params) for item in request.requests],
+        state.anthropic.batch_response,
+    )
+
+
+@router.get("/v1/messages/batches/{batch_id}")
+async def retrieve_message_batch(
+    batch_id: str, http_request: Request
+) -> Dict[str, Any]:
+    return server_state(http_request).batches.get_message_batch(batch_id)
+
+
+@router.get("/v1/messages/batches/{batch_id}/results")
+async def message_batch_results(batch_id: str, http_request: Request) -> FileResponse:
+    batches = server_state(http_request).batches
+    return FileResponse(
+        batches.message_batch_results(batch_id), media_type="application/x-jsonl"
+    )
@@ -0,0 +1,459 @@
+"""Offline batches, modeled on the OpenAI Batch and Anthropic Message Batches APIs.
+
+Uploaded files, batch inputs and results are stored as files in a directory;
+batch and file metadata is kept in memory for the life of the process.
+Requests are served through their provider's normal lookup and token
+accounting, without lag. Small batches are processed before the create call
+returns; larger ones are processed in the background, in slices between which
+the event loop serves other traffic, and their status can be polled.
+"""
+
+import asyncio
+import atexit
+import email
+import email.policy
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from fastapi import HTTPException
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Batches with more requests than this are processed in the background
+INLINE_LIMIT = 256
+
+# Requests a background batch serves before letting other traffic through
+SLICE_SIZE = 32
+
+EXPIRY_SECONDS = 24 * 60 * 60
+
+BATCH_REQUESTS = metrics.REGISTRY.counter(
+    "mockllm_batch_requests_total",
+    "Requests processed in batches by result (succeeded or failed)",
+    ("endpoint", "result"),
+)
+
+# Serves one request body of a batch, raising ValueError if it is invalid
+Handler = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+# Processes a batch, yielding after each request it serves
+Job = Iterator[None]
+
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex}"
+
+
+def parse_upload(content_type: str, body: bytes) -> Tuple[bytes, Dict[str, str]]:
+    """File content and other form fields of a ``multipart/form-data`` body.
+
+    The ``filename`` field is set from the file part's filename.
+    """
+    message = email.message_from_bytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body,
+        policy=email.policy.HTTP,
+    )
+    if not message.is_multipart():
+        raise ValueError("Expected a multipart/form-data upload")
+    content: Optional[bytes] = None
+    fields: Dict[str, str] = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True)
+        if not isinstance(payload, bytes):
+            continue
+        if name == "file":
+            content = payload
+            fields["filename"] = part.get_filename() or "upload.jsonl"
+        elif isinstance(name, str):
+            fields[name] = payload.decode("utf-8")
+    if content is None:
+        raise ValueError("Missing file field")
+    return content, fields
+
+
+class BatchStore:
+    """Files and batches of a server process."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.message_batches: Dict[str, Dict[str, Any]] = {}
+        # Keeps background jobs referenced until they finish
+        self._jobs: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def directory(self) -> str:
+        """Storage directory, a temporary one removed at exit if not set."""
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="mockllm-batches-")
+            atexit.register(shutil.rmtree, self._directory, True)
+        os.makedirs(self._directory, exist_ok=True)
+        return self._directory
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.jsonl")
+
+    async def _run(self, job: Job, size: int, on_error: Callable[[str], None]) -> None:
+        """Run ``job`` now if it is small, or else in the background.
+
+        Jobs run on the event loop, as the lookup, metrics and replay state
+        they share with request handlers isn't thread-safe.
+        """
+        if size <= INLINE_LIMIT:
+            await self._drive(job, on_error)
+            return
+        task = asyncio.create_task(self._drive(job, on_error, SLICE_SIZE))
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+
+    async def _drive(
+        self, job: Job, on_error: Callable[[str], None], slice_size: int = 0
+    ) -> None:
+        """Exhaust ``job``, yielding to the event loop every ``slice_size`` items.
+
+        ``on_error`` is called with the error if the job raises.
+        """
+        try:
+            for served, _ in enumerate(job, 1):
+                if slice_size and served % slice_size == 0:
+                    await asyncio.sleep(0)
+        except Exception as e:
+            logger.exception("Batch processing failed")
+            on_error(str(e))
+
+    def _process(
+        self,
+        items: Iterable[Tuple[Optional[str], Any, Optional[str]]],
+        handler: Handler,
+        endpoint: str,
+        on_result: Callable[[Optional[str], Dict[str, Any], Optional[str]], None],
+        on_progress: Callable[[int, int], None],
+    ) -> Job:
+        """Serve ``(custom_id, body, error)`` items, reporting each result.
+
+        Items that already carry an error, such as unparsable input lines,
+        are reported as failed without being served, and an item whose
+        handler raises fails on its own without failing the batch.
+        """
+        succeeded = failed = 0
+        for custom_id, body, error in items:
+            if error is None:
+                try:
+                    result = handler(body)
+                except Exception as e:
+                    error = str(e) or type(e).__name__
+                else:
+                    on_result(custom_id, result, None)
+                    succeeded += 1
+                    on_progress(succeeded, failed)
+                    yield
+                    continue
+            on_result(custom_id, {}, error)
+            failed += 1
+            on_progress(succeeded, failed)
+            yield
+        BATCH_REQUESTS.inc(endpoint, "succeeded", amount=succeeded)
+        BATCH_REQUESTS.inc(endpoint, "failed", amount=failed)
+
+    # Files
+
+    def create_file(
+        self, content: bytes, filename: str, purpose: str
+    ) -> Dict[str, Any]:
+        file_id = new_id("file")
+        with open(self.path(file_id), "wb") as f:
+            f.write(content)
+        return self._add_file(file_id, filename, purpose)
+
+    def _add_file(self, file_id: str, filename: str, purpose: str) -> Dict[str, Any]:
+        self.files[file_id] = {
+            "id": file_id,
+            "object": "file",
+            "bytes": os.path.getsize(self.path(file_id)),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+        }
+        return self.files[file_id]
+
+    def get_file(self, file_id: str) -> Dict[str, Any]:
+        if file_id not in self.files:
+            raise HTTPException(status_code=404, detail=f"No such file: {file_id}")
+        return self.files[file_id]
+
+    # OpenAI batches
+
+    async def create_batch(
+        self,
+        input_file_id: str,
+        endpoint: str,
+        handler: Handler,
+        completion_window: str = "24h",
+        metadata: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        self.get_file(input_file_id)
+        with open(self.path(input_file_id), "rb") as f:
+            total = sum(1 for line in f if line.strip())
+        now = int(time.time())
+        batch_id = new_id("batch")
+        self.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": endpoint,
+            "errors": None,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": now,
+            "in_progress_at": now,
+            "expires_at": now + EXPIRY_SECONDS,
+            "finalizing_at": None,
+            "completed_at": None,
+            "failed_at": None,
+            "expired_at": None,
+            "cancelling_at": None,
+            "cancelled_at": None,
+            "request_counts": {"total": total, "completed": 0, "failed": 0},
+            "metadata": metadata,
+        }
+        await self._run(
+            self._run_batch(batch_id, handler),
+            total,
+            lambda error: self._fail_batch(batch_id, "batch_error", error),
+        )
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        if batch_id not in self.batches:
+            raise HTTPException(status_code=404, detail=f"No such batch: {batch_id}")
+        return dict(self.batches[batch_id])
+
+    def _fail_batch(self, batch_id: str, code: str, message: str) -> None:
+        batch = self.batches[batch_id]
+        batch["errors"] = {
+            "object": "list",
+            "data": [{"code": code, "message": message}],
+        }
+        batch["failed_at"] = int(time.time())
+        batch["status"] = "failed"
+
+    def _run_batch(self, batch_id: str, handler: Handler) -> Job:
+        batch = self.batches[batch_id]
+        endpoint = batch["endpoint"]
+        total = batch["request_counts"]["total"]
+        output_id, error_id = new_id("file"), new_id("file")
+
+        def items(
+            lines: Iterable[bytes],
+        ) -> Iterable[Tuple[Optional[str], Any, Optional[str]]]:
+            for line in lines:
+                if line.strip():
+                    yield _batch_item(line, endpoint)
+
+        def on_progress(completed: int, failed: int) -> None:
+            batch["request_counts"] = {
+                "total": total,
+                "completed": completed,
+                "failed": failed,
+            }
+
+        try:
+            with open(self.path(batch["input_file_id"]), "rb") as source, open(
+                self.path(output_id), "w", encoding="utf-8"
+            ) as output, open(self.path(error_id), "w", encoding="utf-8") as errors:
+
+                def on_result(
+                    custom_id: Optional[str], body: Dict[str, Any], error: Optional[str]
+                ) -> None:
+                    line: Dict[str, Any] = {
+                        "id": new_id("batch_req"),
+                        "custom_id": custom_id,
+                        "response": None,
+                        "error": None,
+                    }
+                    if error is None:
+                        line["response"] = {
+                            "status_code": 200,
+                            "request_id": new_id("req"),
+                            "body": body,
+                        }
+                        output.write(json.dumps(line) + "\n")
+                    else:
+                        line["error"] = {"code": "invalid_request", "message": error}
+                        errors.write(json.dumps(line) + "\n")
+
+                yield from self._process(
+                    items(source), handler, endpoint, on_result, on_progress
+                )
+        except OSError as e:
+            logger.error(f"Batch {batch_id} failed: {str(e)}")
+            self._fail_batch(batch_id, "io_error", str(e))
+            return
+
+        counts = batch["request_counts"]
+        if counts["completed"]:
+            self._add_file(output_id, f"{batch_id}_output.jsonl", "batch_output")
+            batch["output_file_id"] = output_id
+        if counts["failed"]:
+            self._add_file(error_id, f"{batch_id}_error.jsonl", "batch_output")
+            batch["error_file_id"] = error_id
+        now = int(time.time())
+        batch["finalizing_at"] = now
+        batch["completed_at"] = now
+        batch["status"] = "completed"
+
+    # Anthropic message batches
+
+    async def create_message_batch(
+        self, requests: List[Tuple[str, Dict[str, Any]]], handler: Handler
+    ) -> Dict[str, Any]:
+        now = time.time()
+        batch_id = new_id("msgbatch")
+        self.message_batches[batch_id] = {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "in_progress",
+            "request_counts": {
+                "processing": len(requests),
+                "succeeded": 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "ended_at": None,
+            "created_at": _timestamp(now),
+            "expires_at": _timestamp(now + EXPIRY_SECONDS),
+            "archived_at": None,
+            "cancel_initiated_at": None,
+            "results_url": None,
+        }
+        await self._run(
+            self._run_message_batch(batch_id, requests, handler),
+            len(requests),
+            lambda error: self._fail_message_batch(batch_id),
+        )
+        return self.get_message_batch(batch_id)
+
+    def get_message_batch(self, batch_id: str) -> Dict[str, Any]:
+        if batch_id not in self.message_batches:
+            raise HTTPException(
+                status_code=404, detail=f"No such message batch: {batch_id}"
+            )
+        return dict(self.message_batches[batch_id])
+
+    def message_batch_results(self, batch_id: str) -> str:
+        """Path of a message batch's results, once it has ended."""
+        batch = self.get_message_batch(batch_id)
+        if batch["processing_status"] != "ended":
+            raise HTTPException(
+                status_code=400, detail=f"Message batch {batch_id} has not ended"
+            )
+        return self.path(batch_id)
+
+    def _fail_message_batch(self, batch_id: str) -> None:
+        """End a message batch whose processing failed.
+
+        The API has no failed status, so requests not yet processed are
+        counted as errored.
+        """
+        batch = self.message_batches[batch_id]
+        counts = batch["request_counts"]
+        counts["errored"] += counts["processing"]
+        counts["processing"] = 0
+        batch["ended_at"] = _timestamp(time.time())
+        batch["results_url"] = f"/v1/messages/batches/{batch_id}/results"
+        batch["processing_status"] = "ended"
+
+    def _run_message_batch(
+        self,
+        batch_id: str,
+        requests: List[Tuple[str, Dict[str, Any]]],
+        handler: Handler,
+    ) -> Job:
+        batch = self.message_batches[batch_id]
+        total = len(requests)
+
+        def on_progress(succeeded: int, errored: int) -> None:
+            batch["request_counts"] = {
+                "processing": total - succeeded - errored,
+                "succeeded": succeeded,
+                "errored": errored,
+                "canceled": 0,
+                "expired": 0,
+            }
+
+        with open(self.path(batch_id), "w", encoding="utf-8") as results:
+
+            def on_result(
+                custom_id: Optional[str], body: Dict[str, Any], error: Optional[str]
+            ) -> None:
+                result: Dict[str, Any]
+                if error is None:
+                    result = {"type": "succeeded", "message": body}
+                else:
+                    result = {
+                        "type": "errored",
+                        "error": {
+                            "type": "error",
+                            "error": {
+                                "type": "invalid_request_error",
+                                "message": error,
+                            },
+                        },
+                    }
+                results.write(
+                    json.dumps({"custom_id": custom_id, "result": result}) + "\n"
+                )
+
+            yield from self._process(
+                ((custom_id, params, None) for custom_id, params in requests),
+                handler,
+                "/v1/messages",
+                on_result,
+                on_progress,
+            )
+
+        batch["ended_at"] = _timestamp(time.time())
+        batch["results_url"] = f"/v1/messages/batches/{batch_id}/results"
+        batch["processing_status"] = "ended"
+
+
+def _batch_item(line: bytes, endpoint: str) -> Tuple[Optional[str], Any, Optional[str]]:
+    """``(custom_id, body, error)`` of a line of an OpenAI batch input file."""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return None, None, "Invalid JSON line"
+    if not isinstance(item, dict):
+        return None, None, "Each line must be a JSON object"
+    custom_id = item.get("custom_id")
+    if item.get("url") != endpoint:
+        return custom_id, None, f"url must be {endpoint} for this batch"
+    return custom_id, item.get("body"), None
+
+
+def _timestamp(seconds: float) -> str:
+    """RFC 3339 timestamp, as Anthropic's API returns."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(seconds))
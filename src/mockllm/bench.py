@@ -0,0 +1,290 @@
+"""Load-test and benchmark harness for the mock server.
+
+Drives ``/v1/chat/completions`` and ``/v1/messages`` with configurable
+concurrency, either in-process through an ASGI transport or against a
+running server, and reports throughput and latency percentiles as text or
+JSON so results can be compared across releases.
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import itertools
+import json
+import math
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import httpx
+
+from . import __version__
+from .testing import BASE_URL, MockLLM
+
+PROVIDERS = {
+    "openai": ("/v1/chat/completions", "mock-llm"),
+    "anthropic": ("/v1/messages", "claude-3-sonnet-20240229"),
+}
+
+
+@dataclasses.dataclass
+class Scenario:
+    provider: str
+    stream: bool
+    lag: Optional[bool] = None  # None leaves the server's lag setting alone
+
+    @property
+    def name(self) -> str:
+        lag = "config" if self.lag is None else ("lag" if self.lag else "nolag")
+        return f"{self.provider}-{'stream' if self.stream else 'json'}-{lag}"
+
+
+@dataclasses.dataclass
+class Sample:
+    latency: float
+    ttft: Optional[float]
+    events: int
+    ok: bool
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def request_body(scenario: Scenario, prompt: str, model: Optional[str]) -> Dict:
+    return {
+        "model": model or PROVIDERS[scenario.provider][1],
+        "messages": [{"role": "user", "content": prompt}],
+        "stream": scenario.stream,
+    }
+
+
+def is_content(line: str) -> bool:
+    """Whether an SSE line is a delta carrying response text."""
+    if not line.startswith("data:"):
+        return False
+    try:
+        event = json.loads(line[5:])
+    except ValueError:
+        return False  # [DONE]
+    if event.get("type") == "content_block_delta":
+        return True
+    choices = event.get("choices") or []
+    return bool(choices and (choices[0].get("delta") or {}).get("content"))
+
+
+async def send(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    body: Dict[str, Any],
+    measure_ttft: bool = True,
+) -> Sample:
+    """Send one request, timing a stream's first content delta as its TTFT."""
+    path = PROVIDERS[scenario.provider][0]
+    start = time.perf_counter()
+    ttft = None
+    events = 0
+    try:
+        async with client.stream("POST", path, json=body) as response:
+            in_event = False
+            async for line in response.aiter_lines():
+                if not line:
+                    # A blank line completes an event
+                    events += in_event
+                    in_event = False
+                    continue
+                in_event = True
+                if ttft is None and measure_ttft and is_content(line):
+                    ttft = time.perf_counter() - start
+            ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    latency = time.perf_counter() - start
+    if not scenario.stream:
+        ttft, events = None, 0
+    return Sample(latency=latency, ttft=ttft, events=events, ok=ok)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    prompt: str,
+    model: Optional[str] = None,
+    measure_ttft: bool = True,
+) -> Dict[str, Any]:
+    """Send ``requests`` requests with at most ``concurrency`` in flight."""
+    body = request_body(scenario, prompt, model)
+    samples: List[Sample] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            samples.append(await send(client, scenario, body, measure_ttft))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    duration = time.perf_counter() - start
+
+    latencies = [s.latency for s in samples if s.ok]
+    ttfts = [s.ttft for s in samples if s.ok and s.ttft is not None]
+    events = sum(s.events for s in samples)
+    return {
+        "scenario": scenario.name,
+        "provider": scenario.provider,
+        "stream": scenario.stream,
+        "lag": scenario.lag,
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s.ok),
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "requests_per_s": len(samples) / duration if duration else None,
+        "latency_s": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        },
+        "ttft_s": {
+            "p50": percentile(ttfts, 50),
+            "p95": percentile(ttfts, 95),
+            "p99": percentile(ttfts, 99),
+        },
+        "events": events,
+        "events_per_s": events / duration if duration and scenario.stream else None,
+    }
+
+
+async def run_benchmark(
+    client: httpx.AsyncClient,
+    scenarios: Sequence[Scenario],
+    requests: int,
+    concurrency: int,
+    prompt: str,
+    model: Optional[str] = None,
+    set_lag: Optional[Callable[[bool], None]] = None,
+    warmup: int = 0,
+    measure_ttft: bool = True,
+) -> Dict[str, Any]:
+    """Run each scenario in turn and return a JSON-serializable report.
+
+    ``measure_ttft`` is off for transports that buffer response bodies, where
+    the first delta arrives with the last and TTFT would equal latency.
+    """
+    results = []
+    for scenario in scenarios:
+        if scenario.lag is not None:
+            if set_lag is None:
+                raise ValueError("Lag can only be toggled for in-process benchmarks")
+            set_lag(scenario.lag)
+        if warmup:
+            await run_scenario(
+                client, scenario, warmup, concurrency, prompt, model, measure_ttft
+            )
+        results.append(
+            await run_scenario(
+                client, scenario, requests, concurrency, prompt, model, measure_ttft
+            )
+        )
+    return {
+        "mockllm_version": __version__,
+        "python": platform.python_version(),
+        "timestamp": int(time.time()),
+        "target": str(client.base_url),
+        "scenarios": results,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.1f}"
+
+    lines = [
+        f"{'scenario':<28} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+        f"{'p99 ms':>8} {'ttft ms':>8} {'events/s':>10} {'errors':>6}"
+    ]
+    for r in report["scenarios"]:
+        events = "-" if r["events_per_s"] is None else f"{r['events_per_s']:.0f}"
+        lines.append(
+            f"{r['scenario']:<28} {r['requests_per_s']:>9.1f} "
+            f"{ms(r['latency_s']['p50']):>8} {ms(r['latency_s']['p95']):>8} "
+            f"{ms(r['latency_s']['p99']):>8} {ms(r['ttft_s']['p50']):>8} "
+            f"{events:>10} {r['errors']:>6}"
+        )
+    return "\n".join(lines)
+
+
+def build_scenarios(
+    providers: Sequence[str], streams: Sequence[bool], lags: Sequence[Optional[bool]]
+) -> List[Scenario]:
+    return [
+        Scenario(provider=p, stream=s, lag=lag)
+        for p, s, lag in itertools.product(providers, streams, lags)
+    ]
+
+
+def run(args: argparse.Namespace) -> None:
+    """Entry point for ``mockllm bench``."""
+    providers = [p.strip() for p in args.provider.split(",") if p.strip()]
+    unknown = set(providers) - set(PROVIDERS)
+    if unknown:
+        raise SystemExit(f"Unknown provider(s): {', '.join(sorted(unknown))}")
+    streams = {"on": [True], "off": [False], "both": [False, True]}[args.stream]
+    lag_choices: Dict[str, List[Optional[bool]]] = {
+        "config": [None],
+        "on": [True],
+        "off": [False],
+        "both": [False, True],
+    }
+    lags = lag_choices[args.lag]
+    if args.url and lags != [None]:
+        raise SystemExit("--lag can only be used for in-process benchmarks")
+    scenarios = build_scenarios(providers, streams, lags)
+    report = asyncio.run(_run(args, scenarios))
+
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+async def _run(args: argparse.Namespace, scenarios: List[Scenario]) -> Dict:
+    set_lag: Optional[Callable[[bool], None]] = None
+    if args.url:
+        transport: httpx.AsyncBaseTransport = httpx.AsyncHTTPTransport()
+        base_url = args.url
+    else:
+        mock = MockLLM(args.config)
+
+        def override_lag(enabled: bool) -> None:
+            table = mock.response_config.table
+            mock.response_config.table = dataclasses.replace(table, lag_enabled=enabled)
+
+        set_lag = override_lag
+        transport = mock.transport()
+        base_url = BASE_URL
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=None
+    ) as client:
+        return await run_benchmark(
+            client,
+            scenarios,
+            args.requests,
+            args.concurrency,
+            args.prompt,
+            model=args.model,
+            set_lag=set_lag,
+            warmup=args.warmup,
+            # The in-process ASGI transport buffers the whole response body
+            measure_ttft=bool(args.url),
+        )
@@ -0,0 +1,106 @@
+import codecs
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+STREAM_MODES = ("char", "token")
+
+# Approximates BPE tokens (a word with its leading space, or a run of
+# punctuation) when no tiktoken encoding is available.
+_PSEUDO_TOKEN = re.compile(r" ?\w+| ?[^\w\s]+|\s+")
+
+
+class StreamPlan(NamedTuple):
+    """Precomputed chunks of a response and the tokens in each chunk."""
+
+    chunks: Tuple[str, ...]
+    token_counts: Tuple[int, ...]
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.token_counts)
+
+
+class ChunkPlanner:
+    """Splits responses into token-aligned stream chunks.
+
+    Plans for canned responses are computed once when the configuration is
+    loaded, so streaming replays a list of strings with no tokenization on
+    the request path. Other text is planned on demand and memoized.
+    """
+
+    def __init__(
+        self,
+        encoding_name: Optional[str] = "cl100k_base",
+        tokens_per_chunk: int = 1,
+        cache_size: int = 1024,
+    ):
+        if tokens_per_chunk < 1:
+            raise ValueError("tokens_per_chunk must be at least 1")
+        self.tokens_per_chunk = tokens_per_chunk
+        self.encoding = self._load_encoding(encoding_name)
+        self._plans: Dict[str, StreamPlan] = {}
+        self._plan_uncached = lru_cache(maxsize=cache_size)(self._build)
+
+    @staticmethod
+    def _load_encoding(name: Optional[str]) -> Optional[tiktoken.Encoding]:
+        if not name:
+            return None
+        try:
+            return tiktoken.get_encoding(name)
+        except Exception as e:
+            logger.warning(
+                f"Could not load tiktoken encoding {name!r}, "
+                f"using approximate tokenization: {str(e)}"
+            )
+            return None
+
+    def precompute(self, texts: Iterable[str]) -> None:
+        """Build and keep plans for a fixed set of texts."""
+        for text in texts:
+            if text not in self._plans:
+                self._plans[text] = self._build(text)
+
+    def plan(self, text: str) -> StreamPlan:
+        """Return the chunk plan for text."""
+        plan = self._plans.get(text)
+        if plan is None:
+            plan = self._plan_uncached(text)
+        return plan
+
+    def _token_bytes(self, text: str) -> List[bytes]:
+        if self.encoding is None:
+            return [t.encode("utf-8") for t in _PSEUDO_TOKEN.findall(text)]
+        tokens = self.encoding.encode(text, disallowed_special=())
+        return self.encoding.decode_tokens_bytes(tokens)
+
+    def _build(self, text: str) -> StreamPlan:
+        # Token boundaries can fall inside a multi-byte character, so decode
+        # incrementally and carry partial characters into the next chunk.
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        chunks: List[str] = []
+        counts: List[int] = []
+        pending = 0
+        token_bytes = self._token_bytes(text)
+        for start in range(0, len(token_bytes), self.tokens_per_chunk):
+            group = token_bytes[start : start + self.tokens_per_chunk]
+            pending += len(group)
+            chunk = decoder.decode(b"".join(group))
+            if chunk:
+                chunks.append(chunk)
+                counts.append(pending)
+                pending = 0
+        tail = decoder.decode(b"", final=True)
+        if tail or pending:
+            if chunks:
+                chunks[-1] += tail
+                counts[-1] += pending
+            else:
+                chunks.append(tail)
+                counts.append(pending)
+        return StreamPlan(tuple(chunks), tuple(counts))
@@ -1,67 +1,475 @@
 import asyncio
 import logging
+import os
 import random
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import AsyncGenerator, Dict, Generator, Optional
+from types import MappingProxyType
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
-import yaml
 from fastapi import HTTPException
-from pythonjsonlogger.json import JsonFormatter
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from . import metrics, profiling, snapshot
+from .chunking import ChunkPlanner
+from .conversations import ConversationIndex
+from .embeddings import EmbeddingModel
+from .faults import FaultInjector
+from .generator import ResponseGenerator
+from .latency import (
+    LatencyModel,
+    LatencyProfile,
+    approximate_tokens,
+    chunk_tokens,
+    pace,
+)
+from .limits import RateLimiter
+from .matcher import PromptMatcher
+from .packs import PackIndex
+from .schema import validate_config
+from .utils import OPENAI_FORMAT, MessageFormat, TokenCounter
 
-log_handler = logging.StreamHandler()
-log_handler.setFormatter(JsonFormatter())
-logging.basicConfig(level=logging.INFO, handlers=[log_handler])
 logger = logging.getLogger(__name__)
 
 
+class Completion(NamedTuple):
+    """A resolved response and the completion tokens it is reported as."""
+
+    text: str
+    tokens: int
+    truncated: bool  # cut short by max_tokens
+
+
+@dataclass(frozen=True)
+class ResponseTable:
+    """Immutable snapshot of a loaded response configuration.
+
+    A new table is built on every (re)load and swapped in with a single
+    attribute assignment, so readers never observe a half-loaded config.
+    """
+
+    responses: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+    default_response: str = "I don't know the answer to that."
+    lag_enabled: bool = False
+    lag_factor: float = 10
+    reload_mode: str = "watch"
+    matcher: PromptMatcher = field(default_factory=PromptMatcher)
+    tokens: TokenCounter = field(default_factory=TokenCounter)
+    stream_mode: str = "char"
+    planner: ChunkPlanner = field(default_factory=lambda: ChunkPlanner(None))
+    coalesce_frames: int = 1
+    latency: Optional[LatencyModel] = None
+    conversations: ConversationIndex = field(default_factory=ConversationIndex)
+    limiter: Optional[RateLimiter] = None
+    faults: Optional[FaultInjector] = None
+    packs: Optional[PackIndex] = None
+    generator: Optional[ResponseGenerator] = None
+    embeddings: EmbeddingModel = field(default_factory=EmbeddingModel)
+    # Models the config names, which get their own metric labels
+    models: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_dict(
+        cls, data: Dict[str, Any], validated: bool = False, base_dir: str = "."
+    ) -> "ResponseTable":
+        """Build a table from parsed YAML data.
+
+        The data is checked against the schema unless ``validated`` says it
+        already has been, e.g. because it was loaded from a snapshot. Paths
+        in the data are relative to ``base_dir``.
+        """
+        if not validated:
+            data = validate_config(data)
+        settings = data.get("settings") or {}
+        reload_mode = settings.get("reload_mode", cls.reload_mode)
+        stream_mode = settings.get("stream_mode", cls.stream_mode)
+        responses = dict(data.get("responses") or {})
+        matcher = PromptMatcher(
+            responses,
+            data.get("rules") or [],
+            cache_size=settings.get("match_cache_size", 1024),
+            fuzzy_threshold=settings.get("fuzzy_threshold", 0.8),
+        )
+        conversations = ConversationIndex(data.get("conversations") or [])
+        defaults = data.get("defaults") or {}
+        default_response = defaults.get("unknown_response", cls.default_response)
+        if stream_mode == "token":
+            planner = ChunkPlanner(
+                settings.get("stream_encoding", "cl100k_base"),
+                tokens_per_chunk=settings.get("tokens_per_chunk", 1),
+            )
+            planner.precompute(responses.values())
+            planner.precompute(matcher.rule_responses)
+            planner.precompute(conversations.responses)
+            planner.precompute([default_response])
+        else:
+            planner = ChunkPlanner(None)
+        return cls(
+            responses=MappingProxyType(responses),
+            default_response=default_response,
+            lag_enabled=settings.get("lag_enabled", False),
+            lag_factor=settings.get("lag_factor", 10),
+            reload_mode=reload_mode,
+            matcher=matcher,
+            tokens=TokenCounter(
+                settings.get("model_encodings") or {},
+                cache_size=settings.get("token_cache_size", 4096),
+                prompt_tokens=settings.get("prompt_tokens", "exact"),
+                approximate_above=settings.get("approximate_above"),
+            ),
+            stream_mode=stream_mode,
+            planner=planner,
+            coalesce_frames=settings.get("coalesce_frames", 1),
+            latency=(
+                LatencyModel.from_dict(settings["latency"])
+                if settings.get("latency")
+                else None
+            ),
+            conversations=conversations,
+            limiter=(
+                RateLimiter.from_dict(settings["rate_limits"])
+                if settings.get("rate_limits")
+                else None
+            ),
+            faults=(
+                FaultInjector.from_dict(data["faults"]) if data.get("faults") else None
+            ),
+            packs=(
+                PackIndex.from_dict(data["packs"], base_dir)
+                if data.get("packs")
+                else None
+            ),
+            generator=(
+                ResponseGenerator.from_dict(defaults["generator"])
+                if defaults.get("generator") is not None
+                else None
+            ),
+            embeddings=EmbeddingModel.from_dict(settings.get("embeddings") or {}),
+            models=_named_models(data),
+        )
+
+    def lookup(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """Resolve a prompt to its response, or the default response.
+
+        With a generator configured, unmatched prompts get generated text
+        instead of the default response, generated only as far as
+        ``max_tokens`` needs.
+        """
+        start = time.perf_counter()
+        response = self.matcher.match(prompt)
+        if response is None and self.packs is not None:
+            response = self.packs.get(prompt)
+        metrics.LOOKUP_SECONDS.observe(time.perf_counter() - start)
+        if response is None:
+            metrics.MATCHES.inc("miss")
+            if self.generator is not None:
+                # Every word is at least one token, so one word over the
+                # limit is enough for the caller to see the cut and truncate
+                # at the exact token boundary
+                limit = None if max_tokens is None else max_tokens + 1
+                return self.generator.generate(prompt, limit)
+            return self.default_response
+        metrics.MATCHES.inc("hit")
+        return response
+
+
+def _named_models(data: Dict[str, Any]) -> FrozenSet[str]:
+    """Models named by per-model settings or fault filters."""
+    settings = data.get("settings") or {}
+    models: Set[str] = set()
+    for section in ("latency", "rate_limits"):
+        models.update((settings.get(section) or {}).get("models") or {})
+    models.update(settings.get("model_encodings") or {})
+    models.update((settings.get("embeddings") or {}).get("model_dimensions") or {})
+    for rule in (data.get("faults") or {}).get("rules") or []:
+        if isinstance(rule, dict) and isinstance(rule.get("model"), str):
+            models.add(rule["model"])
+    return frozenset(models)
+
+
+class _ConfigFileHandler(FileSystemEventHandler):
+    """Watchdog handler that reloads a ResponseConfig when its file changes."""
+
+    def __init__(self, config: "ResponseConfig", path: str):
+        self.config = config
+        self.target = os.path.abspath(path)
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        paths = (event.src_path, getattr(event, "dest_path", ""))
+        if any(p and os.path.abspath(os.fsdecode(p)) == self.target for p in paths):
+            self.config.reload()
+
+
 class ResponseConfig:
     """Handles loading and managing response configurations from YAML."""
 
-    def __init__(self, yaml_path: str = "responses.yml"):
+    def __init__(
+        self,
+        yaml_path: Optional[str] = "responses.yml",
+        reload_mode: Optional[str] = None,
+        snapshot_path: Optional[str] = None,
+    ):
         self.yaml_path = yaml_path
-        self.last_modified = 0
-        self.responses: Dict[str, str] = {}
-        self.default_response = "I don't know the answer to that."
-        self.lag_enabled = False
-        self.lag_factor = 10
+        self.snapshot_path = snapshot_path
+        self.last_modified = 0.0
+        self.table = ResponseTable()
+        self._reload_mode = reload_mode
+        self._reload_lock = threading.Lock()
+        self._observer: Optional[Any] = None
         self.load_responses()
+        if self.reload_mode == "watch":
+            self.start_watching()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base_dir: str = ".") -> "ResponseConfig":
+        """A configuration held in memory rather than read from a file.
+
+        It is never reloaded; ``configure`` replaces it. Paths in the data
+        are relative to ``base_dir``.
+        """
+        config = cls(None, reload_mode="off")
+        config.configure(data, base_dir)
+        return config
+
+    def configure(self, data: Dict[str, Any], base_dir: str = ".") -> None:
+        """Swap in the configuration in ``data``, as parsed from YAML."""
+        self.table = ResponseTable.from_dict(data, base_dir=base_dir)
+
+    @property
+    def reload_mode(self) -> str:
+        """Reload mode, from the constructor or the YAML ``settings`` section."""
+        return self._reload_mode or self.table.reload_mode
+
+    @property
+    def responses(self) -> Mapping[str, str]:
+        return self.table.responses
+
+    @property
+    def default_response(self) -> str:
+        return self.table.default_response
+
+    @property
+    def lag_enabled(self) -> bool:
+        return self.table.lag_enabled
+
+    @property
+    def lag_factor(self) -> float:
+        return self.table.lag_factor
+
+    @property
+    def limiter(self) -> Optional[RateLimiter]:
+        return self.table.limiter
+
+    @property
+    def faults(self) -> Optional[FaultInjector]:
+        return self.table.faults
+
+    @property
+    def coalesce_frames(self) -> int:
+        """SSE frames to join per write; lagged streams always send each frame."""
+        table = self.table
+        return 1 if table.lag_enabled else table.coalesce_frames
 
     def load_responses(self) -> None:
         """Load or reload responses from YAML file if modified."""
+        if self.yaml_path is None:
+            return
         try:
             current_mtime = Path(self.yaml_path).stat().st_mtime
-            if current_mtime > self.last_modified:
-                with open(self.yaml_path, "r") as f:
-                    data = yaml.safe_load(f)
-                    self.responses = data.get("responses", {})
-                    self.default_response = data.get("defaults", {}).get(
-                        "unknown_response", self.default_response
-                    )
-                    settings = data.get("settings", {})
-                    self.lag_enabled = settings.get("lag_enabled", False)
-                    self.lag_factor = settings.get("lag_factor", 10)
-                self.last_modified = int(current_mtime)
-                logger.info(
-                    f"Loaded {len(self.responses)} responses from {self.yaml_path}"
+            if current_mtime == self.last_modified:
+                return
+            with self._reload_lock:
+                # Another thread may have reloaded while we waited for the lock
+                if current_mtime == self.last_modified:
+                    return
+                start = time.perf_counter()
+                # A broken file is reported once, not again on every check
+                self.last_modified = current_mtime
+                data = snapshot.load(self.yaml_path, self.snapshot_path)
+                self.table = ResponseTable.from_dict(
+                    data,
+                    validated=True,
+                    base_dir=os.path.dirname(os.path.abspath(self.yaml_path)),
                 )
+            metrics.CONFIG_RELOAD_SECONDS.observe(time.perf_counter() - start)
+            metrics.CONFIG_RELOADS.inc("success")
+            logger.info(f"Loaded {len(self.responses)} responses from {self.yaml_path}")
         except Exception as e:
+            metrics.CONFIG_RELOADS.inc("failure")
             logger.error(f"Error loading responses: {str(e)}")
             raise HTTPException(
                 status_code=500, detail="Failed to load response configuration"
             ) from e
 
+    def reload(self) -> bool:
+        """Reload from disk, keeping the current table if the new file is invalid.
+
+        Returns True if the configuration loaded successfully.
+        """
+        try:
+            self.load_responses()
+            return True
+        except HTTPException:
+            logger.warning(f"Keeping previous configuration for {self.yaml_path}")
+            return False
+
+    def start_watching(self) -> None:
+        """Start a background observer that reloads the file when it changes."""
+        if self._observer is not None or self.yaml_path is None:
+            return
+        # Watch the parent directory so editors that replace the file
+        # atomically (write to temp file, then rename) are still picked up.
+        directory = os.path.dirname(os.path.abspath(self.yaml_path))
+        observer = Observer()
+        observer.daemon = True
+        observer.schedule(
+            _ConfigFileHandler(self, self.yaml_path), directory, recursive=False
+        )
+        observer.start()
+        self._observer = observer
+        logger.info(f"Watching {self.yaml_path} for changes")
+
+    def stop_watching(self) -> None:
+        """Stop the background observer, if running."""
+        if self._observer is None:
+            return
+        self._observer.stop()
+        self._observer.join()
+        self._observer = None
+
+    def _refresh(self) -> ResponseTable:
+        """Return the current table, checking the file first in poll mode."""
+        if self.reload_mode == "poll":
+            with profiling.phase("reload"):
+                self.reload()
+        return self.table
+
     def get_response(self, prompt: str) -> str:
         """Get response for a given prompt."""
-        self.load_responses()  # Check for updates
-        return self.responses.get(prompt, self.default_response)
+        table = self._refresh()
+        return table.lookup(prompt)
+
+    def get_conversation_response(
+        self, system: Optional[str], user_messages: Sequence[str]
+    ) -> Optional[str]:
+        """Scripted response for a conversation, or None if it isn't scripted."""
+        return self._refresh().conversations.lookup(system, user_messages)
+
+    def count_prompt_tokens(
+        self,
+        messages: Iterable[Tuple[str, str]],
+        model: str,
+        message_format: MessageFormat = OPENAI_FORMAT,
+    ) -> int:
+        """Count the prompt tokens of ``(role, content)`` messages."""
+        with profiling.phase("tokenize"):
+            start = time.perf_counter()
+            count = self.table.tokens.count_messages(messages, model, message_format)
+            metrics.TOKEN_COUNT_SECONDS.observe(time.perf_counter() - start)
+        return count
+
+    def model_label(self, model: str) -> str:
+        """``model`` as a metric label: ``other`` unless the config names it.
+
+        Models come from clients, so labelling every one would let them add
+        series without limit.
+        """
+        return model if model in self.table.models else "other"
+
+    def count_response_tokens(self, response: str, model: str) -> int:
+        """Count tokens in a canned response, memoized per (response, model)."""
+        with profiling.phase("tokenize"):
+            start = time.perf_counter()
+            count = self.table.tokens.count_cached(response, model)
+            metrics.TOKEN_COUNT_SECONDS.observe(time.perf_counter() - start)
+        return count
+
+    def embed(
+        self, texts: Sequence[str], model: str, dimensions: Optional[int] = None
+    ) -> List[array]:
+        """Embedding vectors of texts, ``dimensions`` long or the model's size."""
+        embeddings = self._refresh().embeddings
+        size = dimensions or embeddings.dimensions_for(model)
+        return [embeddings.vector(text, model, size) for text in texts]
+
+    def stream_tokens(self, response: str) -> float:
+        """Tokens a streamed response is paced over in the current stream mode."""
+        table = self.table
+        if table.stream_mode == "token":
+            return table.planner.plan(response).total_tokens
+        return approximate_tokens(response)
+
+    def complete(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+        *,
+        response: Optional[str] = None,
+    ) -> Completion:
+        """Resolve the response for a prompt, cut to at most max_tokens.
+
+        Responses are counted and cut with the model's encoding, at the exact
+        token. In token stream mode the precomputed plan's count is used
+        instead when the plan was built with the model's encoding, so streams
+        report usage without tokenizing the text again.
+        """
+        table = self._refresh()
+        if response is None:
+            with profiling.phase("lookup"):
+                response = table.lookup(prompt, max_tokens)
+        else:
+            # Replayed and scripted responses are hits too
+            metrics.MATCHES.inc("hit")
+        tokens: Optional[int] = None
+        if table.stream_mode == "token":
+            with profiling.phase("tokenize"):
+                plan = table.planner.plan(response)
+            encoding = table.planner.encoding
+            if encoding is not None and encoding is table.tokens.encoding_for(model):
+                tokens = plan.total_tokens
+        if tokens is None:
+            tokens = self.count_response_tokens(response, model)
+        if max_tokens is None or tokens <= max_tokens:
+            return Completion(response, tokens, False)
+        # A truncated response is planned again when streamed, which splits
+        # the chunk the cut falls in
+        with profiling.phase("tokenize"):
+            text = table.tokens.truncate(response, max_tokens, model)
+        return Completion(text, self.count_response_tokens(text, model), True)
 
     def get_streaming_response(
         self, prompt: str, chunk_size: Optional[int] = None
     ) -> Generator[str, None, None]:
         """Generator that yields response content
         character by character or in chunks."""
-        response = self.get_response(prompt)
-        if chunk_size:
+        table = self._refresh()
+        response = table.lookup(prompt)
+        if table.stream_mode == "token" and not chunk_size:
+            # Replay the precomputed token-aligned chunks
+            yield from table.planner.plan(response).chunks
+        elif chunk_size:
             # Yield response in chunks
             for i in range(0, len(response), chunk_size):
                 yield response[i : i + chunk_size]
@@ -70,33 +478,94 @@ class ResponseConfig:
             for char in response:
                 yield char
 
-    async def get_response_with_lag(self, prompt: str) -> str:
-        """Get response with artificial lag for non-streaming responses."""
-        response = self.get_response(prompt)
-        if self.lag_enabled:
+    @staticmethod
+    def _split(response: str, chunk_size: Optional[int]) -> Iterator[str]:
+        if chunk_size:
+            return (
+                response[i : i + chunk_size]
+                for i in range(0, len(response), chunk_size)
+            )
+        return iter(response)
+
+    async def get_response_with_lag(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        *,
+        response: Optional[str] = None,
+        profile: Optional[LatencyProfile] = None,
+    ) -> str:
+        """Get response with artificial lag for non-streaming responses.
+
+        ``response`` replaces the configured response for the prompt, and
+        ``profile`` replaces the configured lag, e.g. when replaying traffic.
+        """
+        table = self._refresh()
+        if response is None:
+            response = table.lookup(prompt)
+        if profile is None and table.lag_enabled and table.latency is not None:
+            profile = table.latency.profile_for(model)
+        if profile is not None:
+            tokens = table.tokens.count_cached(response, model or "")
+            rng = table.latency.rng(model, prompt) if table.latency else random.Random()
+            delay = profile.total_delay(tokens, rng)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif table.lag_enabled:
             # Base delay on response length and lag factor
-            delay = len(response) / (self.lag_factor * 10)
+            delay = len(response) / (table.lag_factor * 10)
             await asyncio.sleep(delay)
         return response
 
     async def get_streaming_response_with_lag(
-        self, prompt: str, chunk_size: Optional[int] = None
+        self,
+        prompt: str,
+        chunk_size: Optional[int] = None,
+        model: Optional[str] = None,
+        *,
+        response: Optional[str] = None,
+        profile: Optional[LatencyProfile] = None,
     ) -> AsyncGenerator[str, None]:
-        """Generator that yields response content with artificial lag."""
-        response = self.get_response(prompt)
+        """Generator that yields response content with artificial lag.
 
-        if chunk_size:
+        ``response`` and ``profile`` override the configured response and lag
+        as in ``get_response_with_lag``.
+        """
+        table = self._refresh()
+        if response is None:
+            response = table.lookup(prompt)
+        if profile is None and table.lag_enabled and table.latency is not None:
+            profile = table.latency.profile_for(model)
+
+        if profile is not None:
+            if table.stream_mode == "token" and not chunk_size:
+                plan = table.planner.plan(response)
+                chunks: List[Tuple[str, float]] = list(
+                    zip(plan.chunks, plan.token_counts)
+                )
+            else:
+                chunks = chunk_tokens(list(self._split(response, chunk_size)))
+            rng = table.latency.rng(model, prompt) if table.latency else random.Random()
+            async for chunk in pace(chunks, profile, rng):
+                yield chunk
+        elif table.stream_mode == "token" and not chunk_size:
+            for chunk in table.planner.plan(response).chunks:
+                if table.lag_enabled:
+                    delay = len(chunk) / (table.lag_factor * 10)
+                    await asyncio.sleep(delay)
+                yield chunk
+        elif chunk_size:
             for i in range(0, len(response), chunk_size):
                 chunk = response[i : i + chunk_size]
-                if self.lag_enabled:
-                    delay = len(chunk) / (self.lag_factor * 10)
+                if table.lag_enabled:
+                    delay = len(chunk) / (table.lag_factor * 10)
                     await asyncio.sleep(delay)
                 yield chunk
         else:
             for char in response:
-                if self.lag_enabled:
+                if table.lag_enabled:
                     # Add random variation to character delay
-                    base_delay = 1 / (self.lag_factor * 10)
+                    base_delay = 1 / (table.lag_factor * 10)
                     variation = random.uniform(-0.5, 0.5) * base_delay
                     delay = max(0, base_delay + variation)
                     await asyncio.sleep(delay)
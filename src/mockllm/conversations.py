@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from .matcher import normalize
+
+
+@lru_cache(maxsize=65536)
+def _normalized(content: str) -> str:
+    # Agent transcripts resend the same messages on every turn, so each
+    # message is normalized once rather than once per request.
+    return normalize(content)
+
+
+class _Turn:
+    __slots__ = ("children", "wildcard", "response")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Turn"] = {}
+        self.wildcard: Optional["_Turn"] = None
+        self.response: Optional[str] = None
+
+
+class ConversationIndex:
+    """Scripted multi-turn conversations stored as a trie of user turns.
+
+    Each conversation is a path from a root, selected by the (normalized)
+    system prompt, through one node per user message. A turn without a
+    ``user`` message matches any message at that position, which scripts a
+    response by system prompt and turn index alone. Lookup walks the user
+    messages of a request and stops at the first turn that doesn't match,
+    so it takes at most one step per scripted turn, however long the
+    transcript, and requests outside any script cost a single step. Messages
+    seen in earlier requests are normalized from a cache, so only a new turn
+    is normalized.
+    """
+
+    def __init__(self, conversations: Optional[List[Dict[str, Any]]] = None):
+        self.roots: Dict[Optional[str], _Turn] = {}
+        self.responses: List[str] = []
+        self.count = 0
+        for position, conversation in enumerate(conversations or []):
+            self._add(position, conversation)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _add(self, position: int, conversation: Any) -> None:
+        if not isinstance(conversation, dict) or not isinstance(
+            conversation.get("turns"), list
+        ):
+            raise ValueError(f"Conversation {position} needs a list of 'turns'")
+        system = conversation.get("system")
+        node = self.roots.setdefault(
+            None if system is None else normalize(system), _Turn()
+        )
+        for index, turn in enumerate(conversation["turns"]):
+            if not isinstance(turn, dict) or not isinstance(turn.get("response"), str):
+                raise ValueError(
+                    f"Conversation {position} turn {index} needs a string 'response'"
+                )
+            user = turn.get("user")
+            if user is None:
+                if node.wildcard is None:
+                    node.wildcard = _Turn()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(normalize(user), _Turn())
+            # The first script to define a turn wins
+            if node.response is None:
+                node.response = turn["response"]
+            self.responses.append(turn["response"])
+        self.count += 1
+
+    def lookup(
+        self, system: Optional[str], user_messages: Sequence[str]
+    ) -> Optional[str]:
+        """Scripted response for the last of ``user_messages``, if any."""
+        if not self.roots or not user_messages:
+            return None
+        response = None
+        if system is not None:
+            response = self._walk(self.roots.get(_normalized(system)), user_messages)
+        if response is None:
+            response = self._walk(self.roots.get(None), user_messages)
+        return response
+
+    @staticmethod
+    def _walk(node: Optional[_Turn], user_messages: Sequence[str]) -> Optional[str]:
+        for content in user_messages:
+            if node is None:
+                return None
+            node = node.children.get(_normalized(content), node.wildcard)
+        return None if node is None else node.response
@@ -0,0 +1,70 @@
+"""Deterministic fake embedding vectors."""
+
+import base64
+import hashlib
+import math
+import sys
+from array import array
+from functools import lru_cache
+from typing import Any, List, Mapping, Optional, Union
+
+
+class EmbeddingModel:
+    """Maps text to a fixed pseudo-random float32 vector.
+
+    A vector's components come from one SHAKE-256 digest of the seed, model
+    and text, so the same input always gets the same vector, different
+    inputs get uncorrelated ones, and a shorter ``dimensions`` is a prefix of
+    the full vector, rescaled when normalizing, like OpenAI's shortened
+    embeddings. Vectors are cached per (text, model, dimensions).
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        model_dimensions: Optional[Mapping[str, int]] = None,
+        normalize: bool = True,
+        seed: int = 0,
+        cache_size: int = 4096,
+    ):
+        if dimensions < 1:
+            raise ValueError("embedding dimensions must be at least 1")
+        self.dimensions = dimensions
+        self.model_dimensions = dict(model_dimensions or {})
+        self.normalize = normalize
+        self.seed = seed
+        self.vector = lru_cache(maxsize=cache_size)(self._vector)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "EmbeddingModel":
+        return cls(
+            dimensions=data.get("dimensions", 1536),
+            model_dimensions=data.get("model_dimensions"),
+            normalize=data.get("normalize", True),
+            seed=data.get("seed", 0),
+            cache_size=data.get("cache_size", 4096),
+        )
+
+    def dimensions_for(self, model: str) -> int:
+        return self.model_dimensions.get(model, self.dimensions)
+
+    def _vector(self, text: str, model: str, dimensions: int) -> array:
+        digest = hashlib.shake_256(f"{self.seed}:{model}:{text}".encode("utf-8"))
+        ints = array("i", digest.digest(4 * dimensions))
+        if sys.byteorder == "big":
+            ints.byteswap()
+        if self.normalize:
+            scale = 1 / (math.hypot(*ints) or 1.0)
+        else:
+            scale = 1 / 2**31  # uniform in [-1, 1)
+        return array("f", [value * scale for value in ints])
+
+
+def encode(vector: array, encoding_format: str = "float") -> Union[List[float], str]:
+    """A vector as a JSON list, or as base64 of little-endian float32."""
+    if encoding_format == "base64":
+        if sys.byteorder == "big":
+            vector = array("f", vector)
+            vector.byteswap()
+        return base64.b64encode(vector.tobytes()).decode("ascii")
+    return vector.tolist()
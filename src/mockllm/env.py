@@ -0,0 +1,14 @@
+"""Environment variables ``mockllm serve`` sets to configure mockllm.server.
+
+uvicorn imports the server in its own worker processes, so the command line
+options reach it through the environment.
+"""
+
+RESPONSES_ENV = "MOCKLLM_RESPONSES"
+SNAPSHOT_ENV = "MOCKLLM_SNAPSHOT"
+RECORD_ENV = "MOCKLLM_RECORD"
+REPLAY_ENV = "MOCKLLM_REPLAY"
+REPLAY_PACE_ENV = "MOCKLLM_REPLAY_PACE"
+BATCH_ENV = "MOCKLLM_BATCH_DIR"
+PROFILE_ENV = "MOCKLLM_PROFILE"
+PROFILE_SLOWEST_ENV = "MOCKLLM_PROFILE_SLOWEST"
@@ -0,0 +1,147 @@
+"""Seeded fault injection for resilience testing of clients.
+
+The ``faults`` section of the responses file lists faults, each with an
+optional route, model and prompt filter and the rate at which it fires::
+
+    faults:
+      seed: 42
+      rules:
+        - type: error          # fail before responding
+          status: 529
+          rate: 0.05
+        - type: disconnect     # drop the connection after `after` events
+          after: 5
+          model: gpt-4
+        - type: stall          # pause the stream for `duration` seconds
+          after: 3
+          duration: 30
+        - type: truncate       # cut the JSON body or an event in half
+          prompt: "flaky"
+        - type: slow_headers   # wait `duration` seconds before responding
+          duration: 2
+
+Draws come from one RNG seeded with ``seed``, so a given sequence of
+requests fails the same way on every run.
+"""
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, AsyncIterable, List, Mapping, Optional
+
+from . import metrics
+from .matcher import normalize
+
+FAULT_TYPES = ("error", "disconnect", "stall", "truncate", "slow_headers")
+# Faults that only make sense for streamed responses
+STREAM_FAULTS = ("disconnect", "stall")
+
+ERROR_MESSAGES = {
+    429: "Rate limit exceeded",
+    500: "Internal server error",
+    503: "Service unavailable",
+    529: "Overloaded",
+}
+
+INJECTED = metrics.REGISTRY.counter(
+    "mockllm_faults_injected_total", "Faults injected into responses", ("type",)
+)
+
+
+class InjectedDisconnect(Exception):
+    """Raised inside a stream to drop the connection mid-response."""
+
+
+@dataclass(frozen=True)
+class Fault:
+    type: str
+    rate: float = 1.0
+    route: Optional[str] = None
+    model: Optional[str] = None
+    prompt: Optional[str] = None  # normalized substring of the last user message
+    status: int = 500
+    after: int = 0  # events sent before a stream fault
+    duration: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Fault":
+        fault_type = data.get("type")
+        if fault_type not in FAULT_TYPES:
+            raise ValueError(
+                f"Invalid fault type {fault_type!r}, expected one of {FAULT_TYPES}"
+            )
+        fault = cls(
+            type=fault_type,
+            rate=float(data.get("rate", 1.0)),
+            route=data.get("route"),
+            model=data.get("model"),
+            prompt=normalize(data["prompt"]) if data.get("prompt") else None,
+            status=int(data.get("status", 500)),
+            after=int(data.get("after", 0)),
+            duration=float(data.get("duration", 0.0)),
+        )
+        if not 0.0 <= fault.rate <= 1.0:
+            raise ValueError(f"Fault rate must be between 0 and 1, got {fault.rate}")
+        if not 400 <= fault.status < 600:
+            raise ValueError(f"Fault status must be 4xx or 5xx, got {fault.status}")
+        return fault
+
+    @property
+    def message(self) -> str:
+        return ERROR_MESSAGES.get(self.status, "Injected fault")
+
+    def matches(self, route: str, model: str, prompt: str, stream: bool) -> bool:
+        return (
+            (stream or self.type not in STREAM_FAULTS)
+            and (self.route is None or self.route == route)
+            and (self.model is None or self.model == model)
+            and (self.prompt is None or self.prompt in normalize(prompt))
+        )
+
+    async def apply(self, frames: AsyncIterable[Any]) -> AsyncGenerator[Any, None]:
+        """Pass a stream through, injecting the fault after ``after`` events."""
+        sent = 0
+        try:
+            async for frame in frames:
+                if sent == self.after:
+                    if self.type == "disconnect":
+                        raise InjectedDisconnect(f"Disconnected after {sent} events")
+                    if self.type == "stall":
+                        await asyncio.sleep(self.duration)
+                    elif self.type == "truncate":
+                        yield frame[: len(frame) // 2]
+                        return
+                yield frame
+                sent += 1
+        finally:
+            # Run the inner stream's cleanup now rather than when collected
+            aclose = getattr(frames, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+
+class FaultInjector:
+    """Picks the fault, if any, to inject into a request."""
+
+    def __init__(self, faults: List[Fault], seed: Optional[int] = None):
+        self.faults = faults
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "FaultInjector":
+        return cls(
+            [Fault.from_dict(rule) for rule in data.get("rules") or []],
+            seed=data.get("seed"),
+        )
+
+    def pick(
+        self, route: str, model: str, prompt: str, stream: bool = False
+    ) -> Optional[Fault]:
+        for fault in self.faults:
+            if (
+                fault.matches(route, model, prompt, stream)
+                and self.rng.random() < fault.rate
+            ):
+                INJECTED.inc(fault.type)
+                return fault
+        return None
@@ -0,0 +1,107 @@
+"""Synthetic responses for prompts that have no configured response."""
+
+import random
+from array import array
+from operator import itemgetter
+from typing import Any, List, Mapping, Optional, Sequence
+
+from .latency import Distribution, parse_distribution
+
+# Common English words, so generated text tokenizes like real prose
+DEFAULT_CORPUS = (
+    "the of and to a in is it you that he was for on are with as his they be at "
+    "one have this from or had by hot word but what some we can out other were "
+    "all there when up use your how said an each she which do their time if will "
+    "way about many then them write would like so these her long make thing see "
+    "him two has look more day could go come did number sound no most people my "
+    "over know water than call first who may down side been now find any new "
+    "work part take get place made live where after back little only round man "
+    "year came show every good me give our under name very through just form "
+    "sentence great think say help low line differ turn cause much mean before "
+    "move right boy old too same tell does set three want air well also play "
+    "small end put home read hand port large spell add even land here must big "
+    "high such follow act why ask men change went light kind off need house "
+    "picture try us again animal point mother world near build self earth father "
+    "head stand own page should country found answer school grow study still "
+    "learn plant cover food sun four between state keep eye never last let "
+    "thought city tree cross farm hard start might story saw far sea draw left "
+    "late run while press close night real life few north open seem together "
+    "next white children begin got walk example ease paper group always music "
+    "those both mark often letter until mile river car feet care second book "
+    "carry took science eat room friend began idea fish mountain stop once base "
+    "hear horse cut sure watch color face wood main enough plain girl usual young "
+    "ready above ever red list though feel talk bird soon body dog family direct "
+    "pose leave song measure door product black short numeral class wind question "
+    "happen complete ship area half rock order fire south problem piece told knew "
+    "pass since top whole king space heard best hour better true during hundred"
+).split()
+
+# Sentences are 6 to 18 words long
+MIN_SENTENCE = 6
+SENTENCE_SPREAD = 13
+
+DEFAULT_LENGTH = {"distribution": "lognormal", "median": 120, "sigma": 0.6}
+
+
+class ResponseGenerator:
+    """Generates deterministic filler text for unmatched prompts.
+
+    The random stream is seeded by the prompt, so a prompt always gets the
+    same response, while different prompts get responses whose lengths (in
+    words, roughly one token each) follow the configured distribution. The
+    words of a response come from a single batch of random bytes, so
+    generating is cheap even for long responses.
+    """
+
+    def __init__(
+        self,
+        length: Distribution,
+        seed: int = 0,
+        corpus: Sequence[str] = DEFAULT_CORPUS,
+        max_words: int = 4096,
+    ):
+        if not corpus:
+            raise ValueError("generator corpus must not be empty")
+        self.length = length
+        self.seed = seed
+        self.corpus = list(corpus)
+        self.max_words = max_words
+        # Maps every 16-bit random value to a word, so a response's words
+        # are picked in a single C-level call rather than a Python loop
+        self._table = [self.corpus[i % len(self.corpus)] for i in range(1 << 16)]
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "ResponseGenerator":
+        return cls(
+            parse_distribution(data.get("length", DEFAULT_LENGTH)),
+            seed=data.get("seed", 0),
+            corpus=data.get("corpus") or DEFAULT_CORPUS,
+            max_words=data.get("max_words", 4096),
+        )
+
+    def generate(self, prompt: str, limit: Optional[int] = None) -> str:
+        """The response for a prompt, cut short at ``limit`` words."""
+        rng = random.Random(f"{self.seed}:{prompt}")
+        count = min(self.max_words, max(1, round(self.length.sample(rng))))
+        # Sentence lengths are drawn for the full response before the words,
+        # so a limit cuts the same text short rather than changing it
+        lengths = rng.randbytes(count // MIN_SENTENCE + 1)
+        if limit is not None:
+            count = min(count, limit)
+        if count <= 0:
+            return ""
+        indexes = array("H", rng.randbytes(2 * count))
+        if count == 1:
+            words: Sequence[str] = [self._table[indexes[0]]]
+        else:
+            words = itemgetter(*indexes)(self._table)
+        sentences: List[str] = []
+        start = 0
+        for length in lengths:
+            if start >= count:
+                break
+            end = start + MIN_SENTENCE + length % SENTENCE_SPREAD
+            sentence = " ".join(words[start:end])
+            sentences.append(sentence[:1].upper() + sentence[1:] + ".")
+            start = end
+        return " ".join(sentences)
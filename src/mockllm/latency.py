@@ -0,0 +1,218 @@
+import asyncio
+import bisect
+import math
+import random
+from abc import ABC, abstractmethod
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence, Tuple
+
+DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal", "percentiles")
+
+
+class Distribution(ABC):
+    """A non-negative delay distribution, in seconds."""
+
+    mean: float = 0.0
+
+    @abstractmethod
+    def sample(self, rng: random.Random) -> float:
+        """Draw one delay using ``rng``."""
+
+
+class Constant(Distribution):
+    def __init__(self, value: float):
+        self.mean = value
+
+    def sample(self, rng: random.Random) -> float:
+        return self.mean
+
+
+class Uniform(Distribution):
+    def __init__(self, low: float, high: float):
+        self.low, self.high = low, high
+        self.mean = (low + high) / 2
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.uniform(self.low, self.high)
+
+
+class Normal(Distribution):
+    def __init__(self, mean: float, stddev: float):
+        self.mean, self.stddev = mean, stddev
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, rng.gauss(self.mean, self.stddev))
+
+
+class LogNormal(Distribution):
+    def __init__(self, median: float, sigma: float):
+        self.mu, self.sigma = math.log(median), sigma
+        self.mean = math.exp(self.mu + sigma * sigma / 2)
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(self.mu, self.sigma)
+
+
+class Percentiles(Distribution):
+    """Empirical distribution from a percentile table such as {50: 0.2, 99: 1.5}.
+
+    Samples are drawn by inverse transform, interpolating linearly between
+    the given percentiles and clamping outside them.
+    """
+
+    def __init__(self, table: Dict[Any, float]):
+        points = sorted((float(str(p).lstrip("p")), float(v)) for p, v in table.items())
+        if not points:
+            raise ValueError("percentiles table must not be empty")
+        self.quantiles = [p / 100 for p, _ in points]
+        self.values = [v for _, v in points]
+        # Trapezoidal mean over the table, clamped at both ends
+        mean = self.values[0] * self.quantiles[0]
+        for i in range(1, len(points)):
+            width = self.quantiles[i] - self.quantiles[i - 1]
+            mean += width * (self.values[i] + self.values[i - 1]) / 2
+        self.mean = mean + self.values[-1] * (1 - self.quantiles[-1])
+
+    def sample(self, rng: random.Random) -> float:
+        u = rng.random()
+        i = bisect.bisect_left(self.quantiles, u)
+        if i == 0:
+            return self.values[0]
+        if i == len(self.quantiles):
+            return self.values[-1]
+        q0, q1 = self.quantiles[i - 1], self.quantiles[i]
+        v0, v1 = self.values[i - 1], self.values[i]
+        return v0 + (v1 - v0) * (u - q0) / (q1 - q0)
+
+
+def parse_distribution(spec: Any) -> Distribution:
+    """Build a distribution from a number or a mapping with a ``distribution`` key."""
+    if isinstance(spec, (int, float)):
+        return Constant(float(spec))
+    if not isinstance(spec, dict):
+        raise ValueError(f"Invalid latency distribution: {spec!r}")
+    kind = spec.get("distribution", "constant")
+    if kind == "constant":
+        return Constant(float(spec["value"]))
+    if kind == "uniform":
+        return Uniform(float(spec["low"]), float(spec["high"]))
+    if kind == "normal":
+        return Normal(float(spec["mean"]), float(spec.get("stddev", 0.0)))
+    if kind == "lognormal":
+        return LogNormal(float(spec["median"]), float(spec.get("sigma", 0.5)))
+    if kind == "percentiles":
+        return Percentiles(spec["values"])
+    raise ValueError(f"Invalid distribution {kind!r}, expected one of {DISTRIBUTIONS}")
+
+
+class LatencyProfile:
+    """Timing of a simulated model: time to first token and token pacing."""
+
+    def __init__(
+        self,
+        ttft: Distribution,
+        inter_token: Distribution,
+        max_tokens_per_second: Optional[float] = None,
+        batch_interval: float = 0.02,
+    ):
+        self.ttft = ttft
+        self.inter_token = inter_token
+        self.max_tokens_per_second = max_tokens_per_second
+        self.batch_interval = batch_interval
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyProfile":
+        max_tps = data.get("max_tokens_per_second")
+        return cls(
+            ttft=parse_distribution(data.get("ttft", 0.0)),
+            inter_token=parse_distribution(data.get("inter_token", 0.0)),
+            max_tokens_per_second=float(max_tps) if max_tps else None,
+            batch_interval=float(data.get("batch_interval", 0.02)),
+        )
+
+    def total_delay(self, tokens: float, rng: random.Random) -> float:
+        """Delay before a complete, non-streamed response is returned."""
+        generation = tokens * self.inter_token.mean
+        if self.max_tokens_per_second:
+            generation = max(generation, tokens / self.max_tokens_per_second)
+        return self.ttft.sample(rng) + generation
+
+
+class LatencyModel:
+    """Per-model latency profiles with seeded, per-request random streams."""
+
+    def __init__(
+        self,
+        default: LatencyProfile,
+        models: Optional[Dict[str, LatencyProfile]] = None,
+        seed: Optional[int] = None,
+    ):
+        self.default = default
+        self.models = models or {}
+        self.seed = seed
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyModel":
+        return cls(
+            default=LatencyProfile.from_dict(data.get("default") or {}),
+            models={
+                name: LatencyProfile.from_dict(profile)
+                for name, profile in (data.get("models") or {}).items()
+            },
+            seed=data.get("seed"),
+        )
+
+    def profile_for(self, model: Optional[str]) -> LatencyProfile:
+        if model is None:
+            return self.default
+        return self.models.get(model, self.default)
+
+    def rng(self, *keys: Optional[str]) -> random.Random:
+        """Random stream for one request; identical requests replay identically
+        when a seed is configured."""
+        if self.seed is None:
+            return random.Random()
+        return random.Random(":".join([str(self.seed), *map(str, keys)]))
+
+
+async def pace(
+    chunks: Sequence[Tuple[str, float]],
+    profile: LatencyProfile,
+    rng: random.Random,
+) -> AsyncGenerator[str, None]:
+    """Yield chunks on a deadline schedule.
+
+    Each chunk gets an absolute deadline (time to first token, then the
+    inter-token delay for its tokens, bounded by the throughput cap). The
+    stream sleeps at most once per ``batch_interval`` and then releases every
+    chunk whose deadline has passed, so slow timers are caught up rather than
+    accumulated, and thousands of streams don't each hold a timer per token.
+    """
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = first_token = start + profile.ttft.sample(rng)
+    cap = profile.max_tokens_per_second
+    emitted = 0.0
+    last = len(chunks) - 1
+    for i, (chunk, tokens) in enumerate(chunks):
+        if i:
+            deadline += profile.inter_token.sample(rng) * tokens
+            if cap:
+                deadline = max(deadline, first_token + emitted / cap)
+        emitted += tokens
+        wait = deadline - loop.time()
+        if wait > 0:
+            # The first and last chunks are released on time, the rest
+            # are released in batches.
+            if 0 < i < last:
+                wait = max(wait, profile.batch_interval)
+            await asyncio.sleep(wait)
+        yield chunk
+
+
+def approximate_tokens(text: str) -> float:
+    """Rough token count for text that hasn't been tokenized."""
+    return len(text) / 4
+
+
+def chunk_tokens(chunks: Sequence[str]) -> List[Tuple[str, float]]:
+    return [(chunk, approximate_tokens(chunk)) for chunk in chunks]
@@ -0,0 +1,223 @@
+"""Simulated provider rate limits.
+
+Requests are admitted against per-(API key, model) token buckets for
+requests and tokens per minute, and against a cap on concurrent streams.
+Buckets refill lazily when they are next used, so admission is a few
+arithmetic operations and needs no background task. All state is only
+touched from the event loop thread, so no locks are taken.
+
+API keys and models come from clients, so the number of bucket pairs kept
+is bounded: past ``max_clients``, pairs whose buckets have refilled (and so
+are the same as new ones) are dropped, and then the least recently used.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from . import metrics
+
+# Bucket pairs kept before idle ones are dropped
+MAX_CLIENTS = 10000
+
+REJECTIONS = metrics.REGISTRY.counter(
+    "mockllm_rate_limited_total",
+    "Requests rejected by simulated rate limits",
+    ("limit",),
+)
+
+
+class TokenBucket:
+    """A bucket of ``capacity`` units refilled evenly over ``period`` seconds."""
+
+    __slots__ = ("capacity", "rate", "level", "updated")
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def wait(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units are available, 0 if they are now."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A request larger than the bucket is admitted once it is full
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0.0) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def full(self, now: float) -> bool:
+        return self.level + (now - self.updated) * self.rate >= self.capacity
+
+    def state(self) -> "BucketState":
+        return BucketState(
+            limit=int(self.capacity),
+            remaining=max(int(self.level), 0),
+            reset=(self.capacity - self.level) / self.rate,
+        )
+
+
+class BucketState(NamedTuple):
+    limit: int
+    remaining: int
+    reset: float  # seconds until the bucket is full again
+
+
+class Limit(NamedTuple):
+    requests_per_minute: Optional[int] = None
+    tokens_per_minute: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any], base: "Limit") -> "Limit":
+        return cls(
+            requests_per_minute=data.get(
+                "requests_per_minute", base.requests_per_minute
+            ),
+            tokens_per_minute=data.get("tokens_per_minute", base.tokens_per_minute),
+        )
+
+
+# A key's requests and tokens buckets, None for limits that aren't set
+Buckets = Tuple[Optional[TokenBucket], Optional[TokenBucket]]
+
+
+class Admission(NamedTuple):
+    """Outcome of admitting a request."""
+
+    retry_after: Optional[float]  # None when the request was admitted
+    requests: Optional[BucketState]
+    tokens: Optional[BucketState]
+
+
+@dataclass
+class RateLimiter:
+    """Rate limits shared by every request the server handles.
+
+    ``models`` overrides ``default`` for individual models. Every API key
+    gets its own buckets for each model, created on first use.
+    """
+
+    default: Limit = Limit()
+    models: Dict[str, Limit] = field(default_factory=dict)
+    max_concurrent_streams: Optional[int] = None
+    max_clients: int = MAX_CLIENTS
+    active_streams: int = 0
+    _buckets: "OrderedDict[Tuple[str, str], Buckets]" = field(
+        default_factory=OrderedDict, repr=False
+    )
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "RateLimiter":
+        default = Limit.from_dict(data, Limit())
+        return cls(
+            default=default,
+            models={
+                model: Limit.from_dict(limit or {}, default)
+                for model, limit in (data.get("models") or {}).items()
+            },
+            max_concurrent_streams=data.get("max_concurrent_streams"),
+            max_clients=data.get("max_clients", MAX_CLIENTS),
+        )
+
+    def _buckets_for(self, api_key: str, model: str) -> Buckets:
+        key = (api_key, model)
+        buckets = self._buckets.get(key)
+        if buckets is not None:
+            self._buckets.move_to_end(key)
+        else:
+            if len(self._buckets) >= self.max_clients:
+                self._evict()
+            limit = self.models.get(model, self.default)
+            buckets = self._buckets[key] = (
+                (
+                    TokenBucket(limit.requests_per_minute)
+                    if limit.requests_per_minute
+                    else None
+                ),
+                (
+                    TokenBucket(limit.tokens_per_minute)
+                    if limit.tokens_per_minute
+                    else None
+                ),
+            )
+        return buckets
+
+    def _evict(self) -> None:
+        """Drop refilled bucket pairs, then the least recently used.
+
+        Evicting down to three quarters of ``max_clients`` means a sweep
+        happens at most once per quarter of that many new clients.
+        """
+        now = time.monotonic()
+        idle = [
+            key
+            for key, buckets in self._buckets.items()
+            if all(bucket is None or bucket.full(now) for bucket in buckets)
+        ]
+        for key in idle:
+            del self._buckets[key]
+        while len(self._buckets) > self.max_clients * 3 // 4:
+            self._buckets.popitem(last=False)
+
+    def admit(self, api_key: str, model: str, tokens: int, stream: bool) -> Admission:
+        """Admit a request estimated to use ``tokens``, or say when to retry.
+
+        Nothing is consumed from the buckets unless the request is admitted.
+        An admitted stream holds a stream slot until ``release`` is called.
+        """
+        requests, token_bucket = self._buckets_for(api_key, model)
+        now = time.monotonic()
+        wait = 0.0
+        limit = ""
+        if requests is not None:
+            wait = requests.wait(1, now)
+            limit = "requests"
+        if token_bucket is not None and not wait:
+            wait = token_bucket.wait(tokens, now)
+            limit = "tokens"
+        if (
+            stream
+            and not wait
+            and self.max_concurrent_streams is not None
+            and self.active_streams >= self.max_concurrent_streams
+        ):
+            # Streams don't finish on a schedule, so suggest a short backoff
+            wait = 1.0
+            limit = "streams"
+        if wait:
+            REJECTIONS.inc(limit)
+        else:
+            if requests is not None:
+                requests.take(1)
+            if token_bucket is not None:
+                token_bucket.take(tokens)
+            if stream:
+                self.active_streams += 1
+        return Admission(
+            retry_after=wait or None,
+            requests=requests.state() if requests is not None else None,
+            tokens=token_bucket.state() if token_bucket is not None else None,
+        )
+
+    def release(self) -> None:
+        """Free the slot of an admitted stream."""
+        self.active_streams -= 1
+
+
+def retry_after(seconds: float) -> str:
+    """Value of a ``retry-after`` header, in whole seconds."""
+    return str(max(1, math.ceil(seconds)))
+
+
+def duration(seconds: float) -> str:
+    """Format a reset time like OpenAI does, e.g. ``1m30s`` or ``120ms``."""
+    if seconds < 1:
+        return f"{max(0, math.ceil(seconds * 1000))}ms"
+    minutes, seconds = divmod(seconds, 60)
+    text = f"{seconds:.3g}s"
+    return f"{int(minutes)}m{text}" if minutes else text
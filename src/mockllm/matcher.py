@@ -0,0 +1,237 @@
+import re
+from collections import Counter, deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Optional, Tuple
+
+RULE_TYPES = ("exact", "prefix", "contains", "regex", "fuzzy")
+
+
+def normalize(text: str) -> str:
+    """Case-fold text and collapse runs of whitespace."""
+    return " ".join(text.casefold().split())
+
+
+class _Automaton:
+    """Aho-Corasick automaton over normalized patterns.
+
+    The goto table doubles as a trie, so the same structure answers both
+    longest-prefix and earliest-declared-substring queries in a single pass
+    over the prompt.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Rule id ending exactly at a node, and lowest rule id of any
+        # pattern ending at a node or one of its suffixes.
+        self.terminal: List[Optional[int]] = [None]
+        self.output: List[Optional[int]] = [None]
+        for pattern, rule_id in patterns:
+            self._add(pattern, rule_id)
+        self._build_links()
+
+    def _add(self, pattern: str, rule_id: int) -> None:
+        node = 0
+        for char in pattern:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.terminal.append(None)
+                self.output.append(None)
+            node = nxt
+        # Earlier rules win over later duplicates
+        if self.terminal[node] is None:
+            self.terminal[node] = rule_id
+
+    def _build_links(self) -> None:
+        queue: Deque[int] = deque()
+        for child in self.goto[0].values():
+            self.output[child] = self.terminal[child]
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.output[child] = _min_id(
+                    self.terminal[child], self.output[self.fail[child]]
+                )
+                queue.append(child)
+
+    def longest_prefix(self, text: str) -> Optional[int]:
+        """Rule id of the longest pattern that is a prefix of text."""
+        node, best = 0, self.terminal[0]
+        for char in text:
+            node = self.goto[node].get(char, -1)
+            if node < 0:
+                break
+            if self.terminal[node] is not None:
+                best = self.terminal[node]
+        return best
+
+    def first_rule_in(self, text: str) -> Optional[int]:
+        """Lowest rule id among all patterns occurring anywhere in text."""
+        node, best = 0, None
+        for char in text:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            best = _min_id(best, self.output[node])
+        return best
+
+
+def _min_id(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class PromptMatcher:
+    """Resolves prompts to responses using indexes precompiled at load time.
+
+    Lookup order is: raw exact key, normalized exact key, longest prefix rule,
+    earliest-declared substring rule, the first declared regex rule that
+    matches and finally token-similarity rules. Apart from regex rules, which
+    are tried one by one, every step is a hash lookup or a single pass over
+    the prompt, so the cost does not grow with the number of rules.
+    """
+
+    def __init__(
+        self,
+        responses: Optional[Mapping[str, str]] = None,
+        rules: Optional[List[Dict[str, Any]]] = None,
+        cache_size: int = 1024,
+        fuzzy_threshold: float = 0.8,
+    ):
+        self.exact: Dict[str, str] = dict(responses or {})
+        self.normalized: Dict[str, str] = {}
+        for prompt, response in self.exact.items():
+            self.normalized.setdefault(normalize(prompt), response)
+
+        self.rule_responses: List[str] = []
+        prefixes: List[Tuple[str, int]] = []
+        substrings: List[Tuple[str, int]] = []
+        regexes: List[Tuple[str, int]] = []
+        self.fuzzy_tokens: List[frozenset] = []
+        self.fuzzy_thresholds: List[float] = []
+        self.fuzzy_rule_ids: List[int] = []
+        self.fuzzy_index: Dict[str, List[int]] = {}
+
+        for position, rule in enumerate(rules or []):
+            rule_type, pattern, response = self._parse_rule(position, rule)
+            rule_id = len(self.rule_responses)
+            self.rule_responses.append(response)
+            if rule_type == "exact":
+                self.normalized.setdefault(normalize(pattern), response)
+            elif rule_type == "prefix":
+                prefixes.append((normalize(pattern), rule_id))
+            elif rule_type == "contains":
+                substrings.append((normalize(pattern), rule_id))
+            elif rule_type == "regex":
+                regexes.append((pattern, rule_id))
+            else:
+                self._add_fuzzy(
+                    pattern, rule_id, float(rule.get("threshold", fuzzy_threshold))
+                )
+
+        self.prefixes = _Automaton(prefixes)
+        self.substrings = _Automaton(substrings)
+        self.regexes = self._compile_regexes(regexes)
+        self.match = lru_cache(maxsize=cache_size)(self._match)
+
+    @staticmethod
+    def _parse_rule(position: int, rule: Any) -> Tuple[str, str, str]:
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rule {position} must be a mapping")
+        rule_type = rule.get("type", "exact")
+        pattern = rule.get("pattern")
+        response = rule.get("response")
+        if rule_type not in RULE_TYPES:
+            raise ValueError(
+                f"Rule {position} has invalid type {rule_type!r}, "
+                f"expected one of {RULE_TYPES}"
+            )
+        if not isinstance(pattern, str) or not pattern:
+            raise ValueError(f"Rule {position} needs a non-empty string 'pattern'")
+        if rule_type != "regex" and not normalize(pattern):
+            # It would match every prompt (prefix, contains) or none at all
+            raise ValueError(
+                f"Rule {position} pattern {pattern!r} is empty once case and "
+                "whitespace are normalized"
+            )
+        if not isinstance(response, str):
+            raise ValueError(f"Rule {position} needs a string 'response'")
+        return rule_type, pattern, response
+
+    def _add_fuzzy(self, pattern: str, rule_id: int, threshold: float) -> None:
+        tokens = frozenset(normalize(pattern).split())
+        fuzzy_id = len(self.fuzzy_tokens)
+        self.fuzzy_tokens.append(tokens)
+        self.fuzzy_thresholds.append(threshold)
+        self.fuzzy_rule_ids.append(rule_id)
+        for token in tokens:
+            self.fuzzy_index.setdefault(token, []).append(fuzzy_id)
+
+    @staticmethod
+    def _compile_regexes(
+        regexes: List[Tuple[str, int]],
+    ) -> List[Tuple["re.Pattern[str]", int]]:
+        compiled = []
+        for pattern, rule_id in regexes:
+            try:
+                compiled.append((re.compile(pattern), rule_id))
+            except re.error as e:
+                raise ValueError(f"Invalid regex {pattern!r}: {e}") from e
+        return compiled
+
+    def __len__(self) -> int:
+        return len(self.normalized) + len(self.rule_responses)
+
+    def _match(self, prompt: str) -> Optional[str]:
+        response = self.exact.get(prompt)
+        if response is not None:
+            return response
+
+        text = normalize(prompt)
+        response = self.normalized.get(text)
+        if response is not None:
+            return response
+
+        rule_id = self.prefixes.longest_prefix(text)
+        if rule_id is None:
+            rule_id = self.substrings.first_rule_in(text)
+        if rule_id is None:
+            rule_id = next(
+                (rid for regex, rid in self.regexes if regex.search(prompt)), None
+            )
+        if rule_id is None and self.fuzzy_tokens:
+            rule_id = self._best_fuzzy(text)
+        if rule_id is None:
+            return None
+        return self.rule_responses[rule_id]
+
+    def _best_fuzzy(self, text: str) -> Optional[int]:
+        """Best Jaccard token match, considering only rules sharing a token."""
+        tokens = frozenset(text.split())
+        shared: Counter = Counter()
+        for token in tokens:
+            shared.update(self.fuzzy_index.get(token, ()))
+        best: Optional[Tuple[float, int]] = None
+        for fuzzy_id, count in shared.items():
+            union = len(tokens) + len(self.fuzzy_tokens[fuzzy_id]) - count
+            score = count / union
+            if score < self.fuzzy_thresholds[fuzzy_id]:
+                continue
+            # Highest score wins, earliest declared rule breaks ties
+            if best is None or (score, -fuzzy_id) > (best[0], -best[1]):
+                best = (score, fuzzy_id)
+        if best is None:
+            return None
+        return self.fuzzy_rule_ids[best[1]]
@@ -0,0 +1,249 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Metrics are plain dictionaries, each guarded by its own lock: most updates
+come from the event loop thread, but the config watcher and other background
+threads update metrics too, and rendering must not see a half-made update.
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncGenerator, AsyncIterable, Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Sample lines of the metric in the text format."""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self.values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} "
+            f"{_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket (plus +Inf), and the sum
+        self.counts: Dict[Labels, List[int]] = {}
+        self.sums: Dict[Labels, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self.counts.get(labels)
+            if counts is None:
+                counts = self.counts[labels] = [0] * (len(self.buckets) + 1)
+                self.sums[labels] = 0.0
+            counts[bucket] += 1
+            self.sums[labels] += value
+
+    def count(self, *labels: str) -> int:
+        return sum(self.counts.get(labels, ()))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [
+                (labels, list(counts), self.sums[labels])
+                for labels, counts in self.counts.items()
+            ]
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = _format_labels(names, labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter(
+    "mockllm_requests_total", "Chat requests received", ("route", "model")
+)
+MATCHES = REGISTRY.counter(
+    "mockllm_response_matches_total",
+    "Responses resolved by result (hit or miss)",
+    ("result",),
+)
+LOOKUP_SECONDS = REGISTRY.histogram(
+    "mockllm_lookup_seconds", "Time spent resolving a prompt to a response"
+)
+TOKEN_COUNT_SECONDS = REGISTRY.histogram(
+    "mockllm_token_count_seconds", "Time spent counting tokens"
+)
+STREAM_SECONDS = REGISTRY.histogram(
+    "mockllm_stream_duration_seconds", "Duration of streamed responses", ("route",)
+)
+STREAM_CHUNKS = REGISTRY.counter(
+    "mockllm_stream_chunks_total", "SSE events emitted by streams", ("route",)
+)
+ACTIVE_STREAMS = REGISTRY.gauge(
+    "mockllm_active_streams", "Streams currently being sent", ("route",)
+)
+CONFIG_RELOADS = REGISTRY.counter(
+    "mockllm_config_reloads_total", "Response config loads by result", ("result",)
+)
+CONFIG_RELOAD_SECONDS = REGISTRY.histogram(
+    "mockllm_config_reload_seconds", "Time spent loading the response config"
+)
+
+
+def _count_events(frame: bytes) -> int:
+    # JSON payloads escape newlines, so "\ndata:" only starts a line
+    return frame.startswith(b"data:") + frame.count(b"\ndata:")
+
+
+async def track_stream(
+    frames: AsyncIterable[bytes], route: str
+) -> AsyncGenerator[bytes, None]:
+    """Record duration, event count and concurrency of a stream.
+
+    A frame may hold several SSE events, such as Anthropic's start and end
+    frames, so events are counted by their ``data:`` lines.
+    """
+    ACTIVE_STREAMS.inc(route)
+    start = time.perf_counter()
+    try:
+        async for frame in frames:
+            STREAM_CHUNKS.inc(route, amount=_count_events(frame))
+            yield frame
+    finally:
+        ACTIVE_STREAMS.dec(route)
+        STREAM_SECONDS.observe(time.perf_counter() - start, route)
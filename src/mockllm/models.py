@@ -1,6 +1,6 @@
 import time
 import uuid
-from typing import Dict, List, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -13,14 +13,21 @@ class OpenAIMessage(BaseModel):
     content: str
 
 
+class OpenAIStreamOptions(BaseModel):
+    """OpenAI streaming options model."""
+
+    include_usage: bool = False
+
+
 class OpenAIChatRequest(BaseModel):
     """OpenAI chat completion request model."""
 
     model: str
     messages: List[OpenAIMessage]
     temperature: Optional[float] = Field(default=0.7)
-    max_tokens: Optional[int] = Field(default=150)
+    max_tokens: Optional[int] = Field(default=None, ge=0)
     stream: Optional[bool] = Field(default=False)
+    stream_options: Optional[OpenAIStreamOptions] = None
 
 
 class OpenAIDeltaMessage(BaseModel):
@@ -67,6 +74,48 @@ class OpenAIStreamResponse(BaseModel):
     choices: List[OpenAIStreamChoice]
 
 
+class OpenAICompletionRequest(BaseModel):
+    """OpenAI legacy text completion request model."""
+
+    model: str
+    prompt: Union[str, List[str]]
+    temperature: Optional[float] = Field(default=1.0)
+    # The legacy API defaults to 16 tokens
+    max_tokens: Optional[int] = Field(default=16, ge=0)
+    stream: Optional[bool] = Field(default=False)
+    stream_options: Optional[OpenAIStreamOptions] = None
+
+
+class OpenAICompletionResponse(BaseModel):
+    """OpenAI legacy text completion response model."""
+
+    id: str = Field(default_factory=lambda: f"mock-{uuid.uuid4()}")
+    object: str = "text_completion"
+    created: int = Field(default_factory=lambda: int(time.time()))
+    model: str
+    choices: List[Dict[str, Any]]
+    usage: Dict[str, int]
+
+
+class OpenAIEmbeddingRequest(BaseModel):
+    """OpenAI embeddings request model."""
+
+    model: str
+    input: Union[str, List[str], List[int], List[List[int]]]
+    encoding_format: Literal["float", "base64"] = "float"
+    dimensions: Optional[int] = Field(default=None, ge=1)
+    user: Optional[str] = None
+
+
+class OpenAIEmbeddingResponse(BaseModel):
+    """OpenAI embeddings response model."""
+
+    object: str = "list"
+    data: List[Dict[str, Any]]
+    model: str
+    usage: Dict[str, int]
+
+
 # Anthropic Models
 class AnthropicMessage(BaseModel):
     """Anthropic message model."""
@@ -81,6 +130,7 @@ class AnthropicChatRequest(BaseModel):
     model: str
     max_tokens: Optional[int] = Field(default=1024)
     messages: List[AnthropicMessage]
+    system: Optional[str] = None
     stream: Optional[bool] = Field(default=False)
     temperature: Optional[float] = Field(default=1.0)
 
@@ -115,6 +165,29 @@ class AnthropicStreamResponse(BaseModel):
     usage: Optional[Dict[str, int]] = None
 
 
+# Batch Models
+class BatchCreateRequest(BaseModel):
+    """OpenAI batch creation request model."""
+
+    input_file_id: str
+    endpoint: str
+    completion_window: str = "24h"
+    metadata: Optional[Dict[str, str]] = None
+
+
+class MessageBatchRequest(BaseModel):
+    """One request of an Anthropic message batch."""
+
+    custom_id: str
+    params: Dict[str, Any]
+
+
+class MessageBatchCreateRequest(BaseModel):
+    """Anthropic message batch creation request model."""
+
+    requests: List[MessageBatchRequest]
+
+
 # For backward compatibility
 Message = OpenAIMessage
 ChatRequest = OpenAIChatRequest
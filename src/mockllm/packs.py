@@ -0,0 +1,234 @@
+"""Response packs: directories of response files served without loading them.
+
+Every ``.yml``, ``.yaml`` or ``.json`` file in a packs directory holds a
+``responses`` mapping, like the main responses file. Each pack is compiled
+once into a binary file in a cache directory::
+
+    header   magic, source mtime_ns, source size, entry count
+    index    key hashes (u64), offsets (u64), key lengths (u32),
+             body lengths (u32), each column sorted by key hash
+    records  normalized key followed by response body, UTF-8
+
+At startup only the index columns are read. They are merged into one
+sorted array, so a lookup is a hash and a binary search; the pack holding
+the match is then memory-mapped and the response sliced out of it. At most
+``max_resident`` packs are mapped at once, least recently used first out,
+and mapped pages are backed by the cache file rather than the heap.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+from pydantic import BaseModel, ConfigDict
+
+from . import metrics
+from .matcher import normalize
+from .snapshot import Loader
+
+logger = logging.getLogger(__name__)
+
+PACK_SUFFIXES = (".yml", ".yaml", ".json")
+CACHE_DIR = ".mockllm-cache"
+
+MAGIC = b"MLLMPK01"
+HEADER = struct.Struct("<8sqqQ")
+
+PACK_LOADS = metrics.REGISTRY.counter(
+    "mockllm_pack_loads_total", "Response packs mapped into memory"
+)
+
+
+class PackFile(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    responses: Dict[str, str] = {}
+
+
+def key_hash(key: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def compile_pack(source: str, target: str) -> None:
+    """Compile a pack's YAML or JSON source into its binary form."""
+    stat = os.stat(source)
+    with open(source, "rb") as f:
+        data = yaml.load(f.read(), Loader=Loader) or {}
+    responses = PackFile.model_validate(data).responses
+
+    entries: List[Tuple[int, bytes, bytes]] = []
+    seen = set()
+    for prompt, response in responses.items():
+        key = normalize(prompt).encode("utf-8")
+        if key not in seen:  # the first of several equivalent keys wins
+            seen.add(key)
+            entries.append((key_hash(key), key, response.encode("utf-8")))
+    entries.sort(key=lambda entry: entry[0])
+
+    hashes, offsets = array("Q"), array("Q")
+    key_lengths, body_lengths = array("I"), array("I")
+    offset = HEADER.size + len(entries) * 24
+    for hashed, key, body in entries:
+        hashes.append(hashed)
+        offsets.append(offset)
+        key_lengths.append(len(key))
+        body_lengths.append(len(body))
+        offset += len(key) + len(body)
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, len(entries)))
+            for column in (hashes, offsets, key_lengths, body_lengths):
+                f.write(column.tobytes())
+            for _, key, body in entries:
+                f.write(key)
+                f.write(body)
+        os.replace(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_index(path: str, source: str) -> Optional[Tuple[bytes, List[array]]]:
+    """Header and index columns of a compiled pack, or None if it is stale."""
+    try:
+        stat = os.stat(source)
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            magic, mtime_ns, size, count = HEADER.unpack(header)
+            if (magic, mtime_ns, size) != (MAGIC, stat.st_mtime_ns, stat.st_size):
+                return None
+            columns = []
+            for typecode in "QQII":
+                column = array(typecode)
+                column.fromfile(f, count)
+                columns.append(column)
+    except (OSError, EOFError, struct.error):
+        return None
+    return header, columns
+
+
+class PackIndex:
+    """Exact-prompt responses from a directory of packs.
+
+    When several packs define the same prompt, the pack whose file name
+    sorts first wins.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_resident: int = 16,
+        cache_dir: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.max_resident = max(1, max_resident)
+        self.cache_dir = cache_dir or os.path.join(directory, CACHE_DIR)
+        self.paths: List[str] = []
+        self.headers: List[bytes] = []
+        self._resident: "OrderedDict[int, mmap.mmap]" = OrderedDict()
+
+        names = sorted(
+            name
+            for name in os.listdir(directory)
+            if name.endswith(PACK_SUFFIXES) and not name.startswith(".")
+        )
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # (hash, pack, offset, key length, body length) of every entry
+        merged: List[Tuple[int, int, int, int, int]] = []
+        for name in names:
+            pack_id = len(self.paths)
+            source = os.path.join(directory, name)
+            path = os.path.join(self.cache_dir, name + ".pack")
+            index = _read_index(path, source)
+            if index is None:
+                compile_pack(source, path)
+                index = _read_index(path, source)
+                if index is None:
+                    raise ValueError(f"Could not compile response pack {source}")
+            header, (hashes, offsets, key_lengths, body_lengths) = index
+            self.paths.append(path)
+            self.headers.append(header)
+            merged.extend(
+                (h, pack_id, o, k, b)
+                for h, o, k, b in zip(hashes, offsets, key_lengths, body_lengths)
+            )
+        # Stable on pack id, so the first pack's entry comes first
+        merged.sort(key=lambda entry: (entry[0], entry[1]))
+        self.hashes = array("Q", (entry[0] for entry in merged))
+        self.packs = array("I", (entry[1] for entry in merged))
+        self.offsets = array("Q", (entry[2] for entry in merged))
+        self.key_lengths = array("I", (entry[3] for entry in merged))
+        self.body_lengths = array("I", (entry[4] for entry in merged))
+        logger.info(
+            f"Indexed {len(self.hashes)} responses in {len(self.paths)} packs "
+            f"from {directory}"
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], base_dir: str = ".") -> "PackIndex":
+        directory = os.path.join(base_dir, data["directory"])
+        cache_dir = data.get("cache_dir")
+        return cls(
+            directory,
+            max_resident=data.get("max_resident", 16),
+            cache_dir=os.path.join(base_dir, cache_dir) if cache_dir else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @property
+    def resident(self) -> int:
+        return len(self._resident)
+
+    def _map(self, pack_id: int) -> Optional[mmap.mmap]:
+        mapped = self._resident.get(pack_id)
+        if mapped is not None:
+            self._resident.move_to_end(pack_id)
+            return mapped
+        with open(self.paths[pack_id], "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[: HEADER.size] != self.headers[pack_id]:
+            # Recompiled since it was indexed; the offsets no longer apply
+            logger.warning(f"Response pack {self.paths[pack_id]} changed, reload")
+            mapped.close()
+            return None
+        PACK_LOADS.inc()
+        self._resident[pack_id] = mapped
+        if len(self._resident) > self.max_resident:
+            _, evicted = self._resident.popitem(last=False)
+            evicted.close()
+        return mapped
+
+    def get(self, prompt: str) -> Optional[str]:
+        """Response for a prompt, or None if no pack defines it."""
+        if not self.hashes:
+            return None
+        key = normalize(prompt).encode("utf-8")
+        hashed = key_hash(key)
+        i = bisect_left(self.hashes, hashed)
+        while i < len(self.hashes) and self.hashes[i] == hashed:
+            mapped = self._map(self.packs[i])
+            if mapped is None:
+                return None
+            start = self.offsets[i]
+            end = start + self.key_lengths[i]
+            if mapped[start:end] == key:
+                return mapped[end : end + self.body_lengths[i]].decode("utf-8")
+            i += 1
+        return None
+
+    def close(self) -> None:
+        while self._resident:
+            _, mapped = self._resident.popitem()
+            mapped.close()
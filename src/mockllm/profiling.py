@@ -0,0 +1,331 @@
+"""Opt-in profiling of a sample of requests.
+
+A sampled request carries a ``Trace`` in a context variable. Code on the
+request path times its phases with ``phase``, which costs a context variable
+lookup when the request isn't sampled. While sampled requests are in flight,
+a background thread also samples the event loop thread's stack, and the
+stacks are aggregated in the collapsed format flame graph tools read.
+
+Stack samples are not attributed to requests: the loop thread interleaves
+every request in flight, including unsampled ones and the tasks a sampled
+request's body is streamed from, so the stacks show where the whole process
+spends its time while profiling is active.
+"""
+
+import heapq
+import itertools
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+from . import metrics
+
+PHASES = ("parse", "reload", "lookup", "tokenize", "serialize", "stream")
+
+# Paths never sampled, so reading a profile doesn't show up in it
+UNSAMPLED_PREFIXES = ("/admin/", "/metrics")
+
+PHASE_SECONDS = metrics.REGISTRY.histogram(
+    "mockllm_profile_phase_seconds",
+    "Time sampled requests spent in each phase",
+    ["phase"],
+)
+
+Scope = Dict[str, Any]
+Message = Dict[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("mockllm_trace", default=None)
+
+
+class Trace:
+    """Phase timings of one sampled request.
+
+    Phases are exclusive: a phase nested in another is not counted in the
+    outer one, and ``stream`` excludes the phases timed while the body is
+    sent, so the phases and ``other`` add up to the request's duration.
+    """
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.status = 0
+        self.timestamp = time.time()
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.seconds = 0.0
+        self._active: Optional["_Phase"] = None
+        # When the handler returned a body for the framework to serialize
+        self._returned: Optional[float] = None
+        self._response_start: Optional[float] = None
+        self._while_sending = 0.0
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if self._response_start is not None:
+            self._while_sending += seconds
+
+    def entered(self) -> None:
+        """The handler was called; everything before it was parsing."""
+        self.add("parse", time.perf_counter() - self.start)
+
+    def returned(self) -> None:
+        """The handler returned a body that is yet to be serialized."""
+        self._returned = time.perf_counter()
+
+    def response_started(self, status: int) -> None:
+        now = time.perf_counter()
+        self.status = status
+        if self._returned is not None:
+            self.add("serialize", now - self._returned)
+        self._response_start = now
+
+    def finish(self) -> None:
+        end = time.perf_counter()
+        if self._response_start is not None:
+            stream = end - self._response_start - self._while_sending
+            self.phases["stream"] = self.phases.get("stream", 0.0) + stream
+        self.seconds = end - self.start
+
+    def as_dict(self) -> Dict[str, Any]:
+        phases = {name: self.phases[name] for name in PHASES if name in self.phases}
+        phases["other"] = max(0.0, self.seconds - sum(self.phases.values()))
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "timestamp": self.timestamp,
+            "seconds": self.seconds,
+            "phases": phases,
+        }
+
+
+class _Phase:
+    __slots__ = ("trace", "name", "start", "nested", "outer")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+        self.start = 0.0
+        self.nested = 0.0
+        self.outer: Optional[_Phase] = None
+
+    def __enter__(self) -> None:
+        self.outer = self.trace._active
+        self.trace._active = self
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.start
+        self.trace._active = self.outer
+        self.trace.add(self.name, elapsed - self.nested)
+        if self.outer is not None:
+            self.outer.nested += elapsed
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def current() -> Optional[Trace]:
+    """The trace of the request being handled, if it is sampled."""
+    return _current.get()
+
+
+def phase(name: str) -> Any:
+    """Context manager timing a phase of the current request, if sampled."""
+    trace = _current.get()
+    if trace is None:
+        return _NO_PHASE
+    return _Phase(trace, name)
+
+
+def timed(func: F, name: str) -> F:
+    """``func``, timed as a phase of the current request if it is sampled.
+
+    For calls in loops, where even ``phase``'s lookup would add up: an
+    unsampled request gets ``func`` itself.
+    """
+    trace = _current.get()
+    if trace is None:
+        return func
+
+    def timed_func(*args: Any, **kwargs: Any) -> Any:
+        with _Phase(trace, name):
+            return func(*args, **kwargs)
+
+    return cast(F, timed_func)
+
+
+def _frame_name(frame: Any) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}:{name}"
+
+
+class StackSampler:
+    """Samples one thread's stack at an interval while anything is profiled.
+
+    Samples cover whatever the thread runs, not only the profiled requests.
+    """
+
+    def __init__(self, interval: float = 0.001, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Dict[str, int] = {}
+        self.thread_id: Optional[int] = None
+        self._users = 0
+        self._active = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def acquire(self) -> None:
+        """Start sampling the calling thread, until every acquire is released."""
+        self.thread_id = threading.get_ident()
+        self._users += 1
+        self._active.set()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="mockllm-profiler", daemon=True
+            )
+            self._thread.start()
+
+    def release(self) -> None:
+        self._users -= 1
+        if self._users <= 0:
+            self._users = 0
+            self._active.clear()
+
+    def _run(self) -> None:
+        while True:
+            self._active.wait()
+            time.sleep(self.interval)
+            if self._users > 0:
+                self.sample()
+
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id or 0)
+        names: List[str] = []
+        while frame is not None and len(names) < self.max_depth:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        if names:
+            stack = ";".join(reversed(names))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def collapsed(self) -> str:
+        """Stacks and their sample counts, one ``a;b;c count`` line each."""
+        stacks = sorted(dict(self.stacks).items(), key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+class Profiler:
+    """Samples requests and keeps the slowest and aggregated phase timings."""
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        slowest: int = 20,
+        sampler: Optional[StackSampler] = None,
+    ):
+        if not 0 < sample_rate <= 1:
+            raise ValueError("profile sample rate must be in (0, 1]")
+        self.sample_rate = sample_rate
+        self.slowest = slowest
+        self.sampler = sampler if sampler is not None else StackSampler()
+        self.reset()
+
+    def reset(self) -> None:
+        self.sampled = 0
+        self.totals: Dict[str, Tuple[int, float]] = {}
+        self._slowest: List[Tuple[float, int, Trace]] = []
+        self._order = itertools.count()
+        self.sampler.stacks = {}
+
+    def should_sample(self, path: str) -> bool:
+        if path.startswith(UNSAMPLED_PREFIXES):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def record(self, trace: Trace) -> None:
+        self.sampled += 1
+        for name, seconds in trace.as_dict()["phases"].items():
+            count, total = self.totals.get(name, (0, 0.0))
+            self.totals[name] = (count + 1, total + seconds)
+            PHASE_SECONDS.observe(seconds, name)
+        entry = (trace.seconds, next(self._order), trace)
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry[0] > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled_requests": self.sampled,
+            "phases": {
+                name: {
+                    "count": count,
+                    "total_seconds": total,
+                    "mean_seconds": total / count,
+                }
+                for name, (count, total) in self.totals.items()
+            },
+            "slowest": [
+                trace.as_dict() for _, _, trace in sorted(self._slowest, reverse=True)
+            ],
+        }
+
+
+class ProfilingMiddleware:
+    """ASGI middleware tracing a sample of requests with a ``Profiler``."""
+
+    def __init__(self, app: ASGIApp, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.should_sample(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        trace = Trace(scope["method"], scope["path"])
+
+        async def send_traced(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                trace.response_started(message["status"])
+            await send(message)
+
+        token = _current.set(trace)
+        self.profiler.sampler.acquire()
+        try:
+            await self.app(scope, receive, send_traced)
+        finally:
+            self.profiler.sampler.release()
+            _current.reset(token)
+            trace.finish()
+            self.profiler.record(trace)
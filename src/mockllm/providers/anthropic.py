@@ -1,65 +1,68 @@
-from typing import Any, AsyncGenerator, Dict, Union
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
-from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
-
-from ..config import ResponseConfig
-from ..models import (
-    AnthropicChatRequest,
-    AnthropicChatResponse,
-    AnthropicStreamDelta,
-    AnthropicStreamResponse,
-)
-from ..utils import count_tokens
+from ..config import Completion
+from ..limits import Admission
+from ..models import AnthropicChatRequest, AnthropicChatResponse
+from ..sse import AnthropicSSEEncoder
+from ..utils import ANTHROPIC_FORMAT
 from .base import LLMProvider
 
 
 class AnthropicProvider(LLMProvider):
-    def __init__(self, response_config: ResponseConfig):
-        self.response_config = response_config
+    route = "/v1/messages"
+    message_format = ANTHROPIC_FORMAT
+    request_model = AnthropicChatRequest
 
-    async def generate_stream_response(
-        self, content: str, model: str
-    ) -> AsyncGenerator[str, None]:
-        async for chunk in self.response_config.get_streaming_response_with_lag(
-            content
-        ):
-            stream_response = AnthropicStreamResponse(
-                delta=AnthropicStreamDelta(delta={"text": chunk})
-            )
-            yield f"data: {stream_response.model_dump_json()}\n\n"
+    def encoder(self, model: str) -> AnthropicSSEEncoder:
+        return AnthropicSSEEncoder(model)
 
-        yield "data: [DONE]\n\n"
+    def stop_reason(self, completion: Completion) -> str:
+        return "max_tokens" if completion.truncated else "end_turn"
 
-    async def handle_chat_completion(
-        self, request: AnthropicChatRequest
-    ) -> Union[Dict[str, Any], StreamingResponse]:
-        last_message = next(
-            (msg for msg in reversed(request.messages) if msg.role == "user"), None
-        )
+    def include_usage(self, request: Any) -> bool:
+        # Anthropic streams always report usage
+        return True
 
-        if not last_message:
-            raise HTTPException(
-                status_code=400, detail="No user message found in request"
-            )
+    def system_prompt(self, request: Any) -> Optional[str]:
+        # Anthropic takes the system prompt as a top-level field
+        system: Optional[str] = request.system
+        return system
 
-        if request.stream:
-            return StreamingResponse(
-                self.generate_stream_response(last_message.content, request.model),
-                media_type="text/event-stream",
-            )
+    def prompt_messages(self, request: Any) -> List[Tuple[str, str]]:
+        messages = super().prompt_messages(request)
+        if request.system:
+            messages.insert(0, ("system", request.system))
+        return messages
 
-        response_content = await self.response_config.get_response_with_lag(
-            last_message.content
-        )
+    def rate_limit_headers(self, admission: Admission) -> Dict[str, str]:
+        headers = {}
+        now = time.time()
+        for name, state in (
+            ("requests", admission.requests),
+            ("tokens", admission.tokens),
+        ):
+            if state is not None:
+                reset = datetime.fromtimestamp(now + state.reset, timezone.utc)
+                headers[f"anthropic-ratelimit-{name}-limit"] = str(state.limit)
+                headers[f"anthropic-ratelimit-{name}-remaining"] = str(state.remaining)
+                headers[f"anthropic-ratelimit-{name}-reset"] = reset.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ"
+                )
+        return headers
 
-        prompt_tokens = count_tokens(str(request.messages), request.model)
-        completion_tokens = count_tokens(response_content, request.model)
+    def chat_response(
+        self, request: AnthropicChatRequest, completion: Completion, prompt_tokens: int
+    ) -> Dict[str, Any]:
+        """The non-streaming response body for a completion."""
+        completion_tokens = completion.tokens
         total_tokens = prompt_tokens + completion_tokens
 
         return AnthropicChatResponse(
             model=request.model,
-            content=[{"type": "text", "text": response_content}],
+            content=[{"type": "text", "text": completion.text}],
+            stop_reason=self.stop_reason(completion),
             usage={
                 "input_tokens": prompt_tokens,
                 "output_tokens": completion_tokens,
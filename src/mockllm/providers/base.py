@@ -1,19 +1,310 @@
 from abc import ABC, abstractmethod
-from typing import Any, AsyncGenerator, Dict, Union
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
+from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from .. import profiling
+from ..config import Completion, ResponseConfig
+from ..latency import LatencyProfile
+from ..limits import Admission, RateLimiter, duration, retry_after
+from ..metrics import track_stream
+from ..recording import Exchange, Recorder, ReplayEntry, ReplayLog
+from ..sse import StreamEncoder, coalesce
+from ..utils import OPENAI_FORMAT, MessageFormat
+
+
+class Resolved(NamedTuple):
+    """What a request is answered with, before it is paced and encoded."""
+
+    prompt: str
+    completion: Completion
+    # Latency replacing the configured lag, for replayed exchanges
+    profile: Optional[LatencyProfile]
+    exchange: Optional[Exchange]
 
 
 class LLMProvider(ABC):
+    """An API format served over the shared response pipeline.
+
+    Every request is resolved to a completion (replayed, scripted, matched
+    or generated, then cut to ``max_tokens``), whose token plan is paced by
+    the configured latency and encoded by the provider's ``encoder``.
+    Providers supply the encoder, the non-streaming body and their stop
+    reasons; the lookup, pacing and usage accounting are shared.
+    """
+
+    # Path of the endpoint served by the provider, used as a metrics label
+    route: str
+    # Per-message overhead the provider's API adds to prompt token counts
+    message_format: MessageFormat = OPENAI_FORMAT
+    # Pydantic model of the endpoint's request body
+    request_model: Type[BaseModel]
+
+    def __init__(
+        self,
+        response_config: ResponseConfig,
+        recorder: Optional[Recorder] = None,
+        replay: Optional[ReplayLog] = None,
+    ):
+        self.response_config = response_config
+        self.recorder = recorder
+        self.replay = replay
+
     @abstractmethod
+    def encoder(self, model: str) -> StreamEncoder:
+        """A new encoder for one stream of the provider's format."""
+
+    def stop_reason(self, completion: Completion) -> str:
+        return "length" if completion.truncated else "stop"
+
+    def include_usage(self, request: Any) -> bool:
+        """Whether a stream should report token usage."""
+        options = getattr(request, "stream_options", None)
+        return bool(options and options.include_usage)
+
+    def resolve(self, request: Any) -> Resolved:
+        """The prompt and completion a request is answered with."""
+        prompt = self.last_user_message(request)
+        if prompt is None:
+            raise HTTPException(
+                status_code=400, detail="No user message found in request"
+            )
+        with profiling.phase("lookup"):
+            response, profile = self.overrides(request)
+        return Resolved(
+            prompt,
+            self.complete(request, response),
+            profile,
+            self.start_exchange(request),
+        )
+
     async def handle_chat_completion(
         self, request: Any
     ) -> Union[Dict[str, Any], StreamingResponse]:
-        pass
+        resolved = self.resolve(request)
+        if request.stream:
+            return self.stream(request, resolved)
+
+        response_content = await self.response_config.get_response_with_lag(
+            resolved.prompt,
+            request.model,
+            response=resolved.completion.text,
+            profile=resolved.profile,
+        )
+        if resolved.exchange is not None:
+            resolved.exchange.add(response_content)
+            resolved.exchange.finish()
+
+        with profiling.phase("serialize"):
+            return self.chat_response(
+                request, resolved.completion, self.count_prompt_tokens(request)
+            )
+
+    def stream(self, request: Any, resolved: Resolved) -> StreamingResponse:
+        include_usage = self.include_usage(request)
+        return StreamingResponse(
+            coalesce(
+                track_stream(
+                    self.generate_stream_response(
+                        resolved.prompt,
+                        request.model,
+                        resolved.completion,
+                        resolved.profile,
+                        resolved.exchange,
+                        self.count_prompt_tokens(request) if include_usage else 0,
+                        include_usage,
+                    ),
+                    self.route,
+                ),
+                self.response_config.coalesce_frames,
+            ),
+            media_type="text/event-stream",
+        )
 
     @abstractmethod
+    def chat_response(
+        self, request: Any, completion: Completion, prompt_tokens: int
+    ) -> Dict[str, Any]:
+        """The non-streaming response body for a completion."""
+
+    def batch_response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Response body for one request of a batch, served without lag.
+
+        Raises ``ValueError`` if the request is invalid.
+        """
+        request = self.request_model.model_validate(body)
+        if self.last_user_message(request) is None:
+            raise ValueError("No user message found in request")
+        response, _ = self.overrides(request)
+        return self.chat_response(
+            request,
+            self.complete(request, response),
+            self.count_prompt_tokens(request),
+        )
+
     async def generate_stream_response(
-        self, content: str, model: str
-    ) -> AsyncGenerator[str, None]:
-        """Generate streaming response"""
-        yield ""  # pragma: no cover
+        self,
+        content: str,
+        model: str,
+        completion: Optional[Completion] = None,
+        profile: Optional[LatencyProfile] = None,
+        exchange: Optional[Exchange] = None,
+        prompt_tokens: int = 0,
+        include_usage: bool = False,
+    ) -> AsyncGenerator[bytes, None]:
+        """Generate streaming response as encoded SSE frames
+
+        ``completion`` is the response to stream, as returned by ``complete``,
+        and ``profile`` overrides the configured latency. ``include_usage``
+        asks for token usage where the API makes it optional.
+        """
+        if completion is None:
+            completion = self.response_config.complete(content, model)
+        encoder = self.encoder(model)
+        encode = profiling.timed(encoder.content, "serialize")
+        complete = False
+        try:
+            with profiling.phase("serialize"):
+                head = encoder.start(prompt_tokens)
+            if head:
+                yield head
+
+            async for chunk in self.response_config.get_streaming_response_with_lag(
+                content, model=model, response=completion.text, profile=profile
+            ):
+                if exchange is not None:
+                    exchange.add(chunk)
+                yield encode(chunk)
+
+            with profiling.phase("serialize"):
+                tail = encoder.end(
+                    prompt_tokens,
+                    completion.tokens,
+                    self.stop_reason(completion),
+                    include_usage,
+                )
+            yield tail
+            complete = True
+        finally:
+            if exchange is not None:
+                exchange.finish(complete)
+
+    def start_exchange(self, request: Any) -> Optional[Exchange]:
+        """Begin capturing the exchange for a request, if recording."""
+        if self.recorder is None:
+            return None
+        return self.recorder.start(
+            self.route,
+            request.model,
+            bool(request.stream),
+            self.prompt_messages(request),
+        )
+
+    def find_replay(self, request: Any) -> Optional[ReplayEntry]:
+        """Recorded response for the request's prompt, if replaying."""
+        if self.replay is None:
+            return None
+        return self.replay.lookup(self.prompt_messages(request))
+
+    def system_prompt(self, request: Any) -> Optional[str]:
+        """The request's system prompt, if it has one."""
+        return next(
+            (msg.content for msg in request.messages if msg.role == "system"), None
+        )
+
+    def last_user_message(self, request: Any) -> Optional[str]:
+        return next(
+            (msg.content for msg in reversed(request.messages) if msg.role == "user"),
+            None,
+        )
+
+    def prompt_messages(self, request: Any) -> List[Tuple[str, str]]:
+        """The ``(role, content)`` pairs that make up the request's prompt."""
+        return [(msg.role, msg.content) for msg in request.messages]
+
+    def count_prompt_tokens(self, request: Any) -> int:
+        return self.response_config.count_prompt_tokens(
+            self.prompt_messages(request), request.model, self.message_format
+        )
+
+    def admit(self, limiter: RateLimiter, request: Any, api_key: str) -> Dict[str, str]:
+        """Admit the request under simulated rate limits.
+
+        Returns the rate limit headers for the response, or raises a 429
+        carrying them and ``retry-after`` when the request is limited.
+        """
+        tokens = self.count_prompt_tokens(request) + (request.max_tokens or 0)
+        admission = limiter.admit(api_key, request.model, tokens, bool(request.stream))
+        headers = self.rate_limit_headers(admission)
+        if admission.retry_after is not None:
+            headers["retry-after"] = retry_after(admission.retry_after)
+            raise HTTPException(
+                status_code=429, detail="Rate limit exceeded", headers=headers
+            )
+        return headers
+
+    def rate_limit_headers(self, admission: Admission) -> Dict[str, str]:
+        """Rate limit headers in OpenAI's format."""
+        headers = {}
+        for name, state in (
+            ("requests", admission.requests),
+            ("tokens", admission.tokens),
+        ):
+            if state is not None:
+                headers[f"x-ratelimit-limit-{name}"] = str(state.limit)
+                headers[f"x-ratelimit-remaining-{name}"] = str(state.remaining)
+                headers[f"x-ratelimit-reset-{name}"] = duration(state.reset)
+        return headers
+
+    def scripted_response(self, request: Any) -> Optional[str]:
+        """Response scripted for the request's conversation, if any."""
+        user_messages = [msg.content for msg in request.messages if msg.role == "user"]
+        return self.response_config.get_conversation_response(
+            self.system_prompt(request), user_messages
+        )
+
+    def overrides(self, request: Any) -> Tuple[Optional[str], Optional[LatencyProfile]]:
+        """Response and latency for the request's message history.
+
+        A replayed exchange takes precedence over a scripted conversation;
+        ``(None, None)`` means the prompt is matched against the responses.
+        """
+        replayed = self.find_replay(request)
+        if replayed is not None:
+            return self.replay_overrides(replayed, request.model, bool(request.stream))
+        return self.scripted_response(request), None
+
+    def complete(self, request: Any, response: Optional[str] = None) -> Completion:
+        """The response to send, cut to the request's ``max_tokens``."""
+        return self.response_config.complete(
+            self.last_user_message(request) or "",
+            request.model,
+            request.max_tokens,
+            response=response,
+        )
+
+    def replay_overrides(
+        self, replayed: Optional[ReplayEntry], model: str, stream: bool
+    ) -> Tuple[Optional[str], Optional[LatencyProfile]]:
+        """Response and latency to use in place of the configured ones."""
+        if replayed is None or self.replay is None:
+            return None, None
+        if stream:
+            tokens = self.response_config.stream_tokens(replayed.response)
+        else:
+            tokens = self.response_config.count_response_tokens(
+                replayed.response, model
+            )
+        return replayed.response, self.replay.profile(replayed, tokens)
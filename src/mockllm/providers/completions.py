@@ -0,0 +1,121 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi.responses import StreamingResponse
+
+from .. import profiling
+from ..config import Completion
+from ..models import OpenAICompletionRequest, OpenAICompletionResponse
+from ..recording import Exchange, ReplayEntry
+from ..sse import TextCompletionSSEEncoder
+from ..utils import PLAIN_FORMAT
+from .base import LLMProvider
+
+
+class CompletionsProvider(LLMProvider):
+    """OpenAI's legacy ``/v1/completions`` endpoint.
+
+    Prompts are looked up like the last user message of a chat request.
+    Requests have no message history, so they are neither recorded nor
+    replayed and never match a scripted conversation.
+    """
+
+    route = "/v1/completions"
+    message_format = PLAIN_FORMAT
+    request_model = OpenAICompletionRequest
+
+    def prompts(self, request: OpenAICompletionRequest) -> List[str]:
+        if isinstance(request.prompt, str):
+            return [request.prompt]
+        return list(request.prompt)
+
+    def last_user_message(self, request: Any) -> Optional[str]:
+        prompts = self.prompts(request)
+        return prompts[-1] if prompts else None
+
+    def prompt_messages(self, request: Any) -> List[Tuple[str, str]]:
+        return [("user", prompt) for prompt in self.prompts(request)]
+
+    def start_exchange(self, request: Any) -> Optional[Exchange]:
+        return None
+
+    def find_replay(self, request: Any) -> Optional[ReplayEntry]:
+        return None
+
+    def scripted_response(self, request: Any) -> Optional[str]:
+        return None
+
+    def encoder(self, model: str) -> TextCompletionSSEEncoder:
+        return TextCompletionSSEEncoder(model)
+
+    async def handle_chat_completion(
+        self, request: OpenAICompletionRequest
+    ) -> Union[Dict[str, Any], StreamingResponse]:
+        if request.stream:
+            # A stream has a single prompt, so it is served like a chat
+            return await super().handle_chat_completion(request)
+
+        prompts = self.prompts(request)
+        completions = self.complete_all(request)
+        # Prompts are answered concurrently, so the lag is the slowest one's
+        await asyncio.gather(
+            *(
+                self.response_config.get_response_with_lag(
+                    prompt, request.model, response=completion.text
+                )
+                for prompt, completion in zip(prompts, completions)
+            )
+        )
+        with profiling.phase("serialize"):
+            return self.text_response(
+                request, completions, self.count_prompt_tokens(request)
+            )
+
+    def complete_all(self, request: OpenAICompletionRequest) -> List[Completion]:
+        """A completion for every prompt of the request."""
+        return [
+            self.response_config.complete(prompt, request.model, request.max_tokens)
+            for prompt in self.prompts(request)
+        ]
+
+    def batch_response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        request = OpenAICompletionRequest.model_validate(body)
+        if not self.prompts(request):
+            raise ValueError("No prompt found in request")
+        return self.text_response(
+            request, self.complete_all(request), self.count_prompt_tokens(request)
+        )
+
+    def chat_response(
+        self,
+        request: OpenAICompletionRequest,
+        completion: Completion,
+        prompt_tokens: int,
+    ) -> Dict[str, Any]:
+        return self.text_response(request, [completion], prompt_tokens)
+
+    def text_response(
+        self,
+        request: OpenAICompletionRequest,
+        completions: List[Completion],
+        prompt_tokens: int,
+    ) -> Dict[str, Any]:
+        """The non-streaming response body, one choice per prompt."""
+        completion_tokens = sum(completion.tokens for completion in completions)
+        return OpenAICompletionResponse(
+            model=request.model,
+            choices=[
+                {
+                    "text": completion.text,
+                    "index": index,
+                    "logprobs": None,
+                    "finish_reason": self.stop_reason(completion),
+                }
+                for index, completion in enumerate(completions)
+            ],
+            usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        ).model_dump()
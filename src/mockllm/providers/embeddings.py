@@ -0,0 +1,65 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config import ResponseConfig
+from ..embeddings import encode
+from ..models import OpenAIEmbeddingRequest, OpenAIEmbeddingResponse
+from ..utils import PLAIN_FORMAT
+
+
+class EmbeddingsProvider:
+    """OpenAI's ``/v1/embeddings`` endpoint."""
+
+    route = "/v1/embeddings"
+
+    def __init__(self, response_config: ResponseConfig):
+        self.response_config = response_config
+
+    def inputs(
+        self, request: OpenAIEmbeddingRequest
+    ) -> List[Tuple[str, Optional[int]]]:
+        """Each input as text and, for token array inputs, its token count."""
+        value = request.input
+        if isinstance(value, str):
+            return [(value, None)]
+        inputs: List[Tuple[str, Optional[int]]] = []
+        if value and isinstance(value[0], int):
+            # A single token array
+            return [(" ".join(map(str, value)), len(value))]
+        for item in value:
+            if isinstance(item, str):
+                inputs.append((item, None))
+            elif isinstance(item, list):
+                inputs.append((" ".join(map(str, item)), len(item)))
+        return inputs
+
+    def embeddings_response(self, request: OpenAIEmbeddingRequest) -> Dict[str, Any]:
+        """Response body for an embeddings request.
+
+        Raises ``ValueError`` if the request has an empty input.
+        """
+        inputs = self.inputs(request)
+        if not inputs or any(not text for text, _ in inputs):
+            raise ValueError("Input must be a non-empty string or array")
+        texts = [text for text, _ in inputs]
+        vectors = self.response_config.embed(texts, request.model, request.dimensions)
+        prompt_tokens = sum(count for _, count in inputs if count is not None)
+        untokenized = [("", text) for text, count in inputs if count is None]
+        if untokenized:
+            prompt_tokens += self.response_config.count_prompt_tokens(
+                untokenized, request.model, PLAIN_FORMAT
+            )
+        return OpenAIEmbeddingResponse(
+            data=[
+                {
+                    "object": "embedding",
+                    "index": index,
+                    "embedding": encode(vector, request.encoding_format),
+                }
+                for index, vector in enumerate(vectors)
+            ],
+            model=request.model,
+            usage={"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+        ).model_dump()
+
+    def batch_response(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return self.embeddings_response(OpenAIEmbeddingRequest.model_validate(body))
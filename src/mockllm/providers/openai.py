@@ -1,75 +1,23 @@
-from typing import Any, AsyncGenerator, Dict, Union
+from typing import Any, Dict
 
-from fastapi import HTTPException
-from fastapi.responses import StreamingResponse
-
-from ..config import ResponseConfig
-from ..models import (
-    OpenAIChatRequest,
-    OpenAIChatResponse,
-    OpenAIDeltaMessage,
-    OpenAIStreamChoice,
-    OpenAIStreamResponse,
-)
-from ..utils import count_tokens
+from ..config import Completion
+from ..models import OpenAIChatRequest, OpenAIChatResponse
+from ..sse import OpenAISSEEncoder
 from .base import LLMProvider
 
 
 class OpenAIProvider(LLMProvider):
-    def __init__(self, response_config: ResponseConfig):
-        self.response_config = response_config
-
-    async def generate_stream_response(
-        self, content: str, model: str
-    ) -> AsyncGenerator[str, None]:
-        first_chunk = OpenAIStreamResponse(
-            model=model,
-            choices=[OpenAIStreamChoice(delta=OpenAIDeltaMessage(role="assistant"))],
-        )
-        yield f"data: {first_chunk.model_dump_json()}\n\n"
-
-        async for chunk in self.response_config.get_streaming_response_with_lag(
-            content
-        ):
-            chunk_response = OpenAIStreamResponse(
-                model=model,
-                choices=[OpenAIStreamChoice(delta=OpenAIDeltaMessage(content=chunk))],
-            )
-            yield f"data: {chunk_response.model_dump_json()}\n\n"
-
-        final_chunk = OpenAIStreamResponse(
-            model=model,
-            choices=[
-                OpenAIStreamChoice(delta=OpenAIDeltaMessage(), finish_reason="stop")
-            ],
-        )
-        yield f"data: {final_chunk.model_dump_json()}\n\n"
-        yield "data: [DONE]\n\n"
-
-    async def handle_chat_completion(
-        self, request: OpenAIChatRequest
-    ) -> Union[Dict[str, Any], StreamingResponse]:
-        last_message = next(
-            (msg for msg in reversed(request.messages) if msg.role == "user"), None
-        )
-
-        if not last_message:
-            raise HTTPException(
-                status_code=400, detail="No user message found in request"
-            )
-
-        if request.stream:
-            return StreamingResponse(
-                self.generate_stream_response(last_message.content, request.model),
-                media_type="text/event-stream",
-            )
+    route = "/v1/chat/completions"
+    request_model = OpenAIChatRequest
 
-        response_content = await self.response_config.get_response_with_lag(
-            last_message.content
-        )
+    def encoder(self, model: str) -> OpenAISSEEncoder:
+        return OpenAISSEEncoder(model)
 
-        prompt_tokens = count_tokens(str(request.messages), request.model)
-        completion_tokens = count_tokens(response_content, request.model)
+    def chat_response(
+        self, request: OpenAIChatRequest, completion: Completion, prompt_tokens: int
+    ) -> Dict[str, Any]:
+        """The non-streaming response body for a completion."""
+        completion_tokens = completion.tokens
         total_tokens = prompt_tokens + completion_tokens
 
         return OpenAIChatResponse(
@@ -77,8 +25,8 @@ class OpenAIProvider(LLMProvider):
             choices=[
                 {
                     "index": 0,
-                    "message": {"role": "assistant", "content": response_content},
-                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": completion.text},
+                    "finish_reason": self.stop_reason(completion),
                 }
             ],
             usage={
@@ -0,0 +1,50 @@
+"""pytest fixtures that serve mockllm in-process.
+
+Installed as a pytest plugin, so the fixtures are available to any test
+suite once mockllm is installed. ``mockllm`` is a new ``MockLLM`` for every
+test, configured by the ``mockllm`` marker::
+
+    @pytest.mark.mockllm(responses={"hello": "Hi there"})
+    def test_greeting(mockllm_client):
+        response = mockllm_client.post("/v1/chat/completions", json=...)
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator
+
+import pytest
+
+if TYPE_CHECKING:
+    from fastapi.testclient import TestClient
+
+    from .testing import MockLLM
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line(
+        "markers",
+        "mockllm(config=None, **sections): configuration of the mockllm fixture, "
+        "as parsed from a responses file",
+    )
+
+
+@pytest.fixture
+def mockllm(request: pytest.FixtureRequest) -> "MockLLM":
+    """A mock server for this test, configured by its ``mockllm`` marker."""
+    # Imported here so test suites that never use the fixture don't pay for
+    # importing the server
+    from .testing import MockLLM
+
+    data: Dict[str, Any] = {}
+    marker = request.node.get_closest_marker("mockllm")
+    if marker is not None:
+        if marker.args:
+            data.update(marker.args[0])
+        data.update(marker.kwargs)
+    return MockLLM(data)
+
+
+@pytest.fixture
+def mockllm_client(mockllm: "MockLLM") -> Iterator["TestClient"]:
+    """A synchronous ``httpx`` client of the ``mockllm`` fixture's server."""
+    with mockllm.client() as client:
+        yield client
@@ -0,0 +1,228 @@
+"""Capture served traffic to a JSONL log and replay it.
+
+Each line of a capture log is one request/response exchange::
+
+    {"key": "...", "timestamp": 1700000000.0, "route": "/v1/messages",
+     "model": "...", "stream": true, "messages": [{"role": "user", ...}],
+     "response": "...", "ttft": 0.41, "duration": 2.3, "complete": true}
+
+``key`` identifies the normalized prompt, including an Anthropic request's
+top-level ``system`` as a leading system message, so a replay can look up
+the response served for a conversation in constant time.
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .latency import Constant, LatencyProfile
+from .matcher import normalize
+
+logger = logging.getLogger(__name__)
+
+REPLAY_PACES = ("full", "recorded")
+
+
+Messages = Sequence[Tuple[str, str]]
+
+
+@lru_cache(maxsize=65536)
+def _extend_key(parent: str, role: str, content: str) -> str:
+    digest = hashlib.sha256(parent.encode("ascii"))
+    digest.update(b"\x00")
+    digest.update(role.encode("utf-8"))
+    digest.update(b"\x00")
+    digest.update(normalize(content).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def history_key(messages: Messages) -> str:
+    """Stable hash of ``(role, content)`` pairs, ignoring case and spacing.
+
+    The key is chained message by message and each link is cached, so a
+    conversation that resends its history only hashes the new turns.
+    """
+    key = ""
+    for role, content in messages:
+        key = _extend_key(key, role, content)
+    return key
+
+
+class Exchange:
+    """Collects the content and timing of one response for the capture log."""
+
+    def __init__(
+        self,
+        recorder: "Recorder",
+        route: str,
+        model: str,
+        stream: bool,
+        messages: Messages,
+    ):
+        self.recorder = recorder
+        self.entry: Dict[str, Any] = {
+            "key": history_key(messages),
+            "timestamp": time.time(),
+            "route": route,
+            "model": model,
+            "stream": stream,
+            "messages": [{"role": r, "content": c} for r, c in messages],
+        }
+        self.start = time.perf_counter()
+        self.first_chunk: Optional[float] = None
+        self.parts: List[str] = []
+        self.finished = False
+
+    def add(self, text: str) -> None:
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter()
+        self.parts.append(text)
+
+    def finish(self, complete: bool = True) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        end = time.perf_counter()
+        first = self.first_chunk if self.first_chunk is not None else end
+        self.entry.update(
+            response="".join(self.parts),
+            ttft=first - self.start,
+            duration=end - self.start,
+            complete=complete,
+        )
+        self.recorder.write(self.entry)
+
+
+class Recorder:
+    """Appends exchanges to a JSONL file from a background thread.
+
+    ``write`` only enqueues the entry, so the event loop never waits on
+    serialization or disk I/O. Entries are written in batches and flushed
+    at least every ``flush_interval`` seconds.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._run, name="mockllm-recorder", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Recording traffic to {path}")
+
+    def start(
+        self, route: str, model: str, stream: bool, messages: Messages
+    ) -> Exchange:
+        return Exchange(self, route, model, stream, messages)
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        self._queue.put(entry)
+
+    def close(self) -> None:
+        """Write out pending entries and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            running = True
+            while running:
+                try:
+                    entry = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                lines = []
+                while entry is not None:
+                    lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+                    try:
+                        entry = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                else:
+                    running = False
+                # One write per batch keeps lines from different worker
+                # processes appending to the same file from interleaving.
+                f.write("".join(lines))
+                f.flush()
+
+
+class ReplayEntry(NamedTuple):
+    response: str
+    ttft: float
+    duration: float
+
+
+class ReplayLog:
+    """Recorded responses indexed by message history.
+
+    A history recorded several times is answered with its responses in the
+    order they were captured, wrapping around once exhausted.
+    """
+
+    def __init__(self, entries: Dict[str, List[ReplayEntry]], pace: str = "full"):
+        if pace not in REPLAY_PACES:
+            raise ValueError(
+                f"Invalid replay pace {pace!r}, expected one of {REPLAY_PACES}"
+            )
+        self.entries = entries
+        self.pace = pace
+        self._cursors: Dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def from_file(cls, path: str, pace: str = "full") -> "ReplayLog":
+        entries: Dict[str, List[ReplayEntry]] = defaultdict(list)
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    # Keyed from the messages where possible, so logs outlive
+                    # changes to how keys are derived
+                    messages = record.get("messages")
+                    key = (
+                        history_key([(m["role"], m["content"]) for m in messages])
+                        if messages
+                        else record["key"]
+                    )
+                    entries[key].append(
+                        ReplayEntry(
+                            response=record["response"],
+                            ttft=float(record.get("ttft", 0.0)),
+                            duration=float(record.get("duration", 0.0)),
+                        )
+                    )
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{path}:{line_number}: invalid record") from e
+        logger.info(f"Loaded {len(entries)} recorded conversations from {path}")
+        return cls(dict(entries), pace)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, messages: Messages) -> Optional[ReplayEntry]:
+        key = history_key(messages)
+        recorded = self.entries.get(key)
+        if not recorded:
+            return None
+        cursor = self._cursors[key]
+        self._cursors[key] = cursor + 1
+        return recorded[cursor % len(recorded)]
+
+    def profile(self, entry: ReplayEntry, tokens: float) -> LatencyProfile:
+        """Latency reproducing the recorded timing, or none at full speed.
+
+        ``tokens`` is the number of tokens the response will be paced over.
+        """
+        if self.pace == "full":
+            return LatencyProfile(Constant(0.0), Constant(0.0))
+        per_token = max(entry.duration - entry.ttft, 0.0) / max(tokens, 1.0)
+        return LatencyProfile(Constant(entry.ttft), Constant(per_token))
@@ -0,0 +1,122 @@
+"""Schema of the responses file, validated once when it is loaded."""
+
+import difflib
+import logging
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, field_validator, model_validator
+
+logger = logging.getLogger(__name__)
+
+
+class _Section(BaseModel):
+    # Unknown keys are ignored, as they always have been, but are usually
+    # typos, so each one is logged
+    model_config = ConfigDict(extra="ignore")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_empty(cls, data: Any) -> Any:
+        # An empty YAML key (``responses:``) parses as None; treat it as unset
+        if isinstance(data, dict):
+            for key in data:
+                if key not in cls.model_fields:
+                    cls._warn_unknown(str(key))
+            return {key: value for key, value in data.items() if value is not None}
+        return data
+
+    @classmethod
+    def _warn_unknown(cls, key: str) -> None:
+        close = difflib.get_close_matches(key, list(cls.model_fields), n=1)
+        hint = f", did you mean {close[0]!r}?" if close else ""
+        logger.warning(f"Ignoring unknown {cls.__name__} key {key!r}{hint}")
+
+
+class Rule(_Section):
+    type: Literal["exact", "prefix", "contains", "regex", "fuzzy"]
+    pattern: str
+    response: str
+    threshold: Optional[float] = None
+
+
+class Turn(_Section):
+    user: Optional[str] = None
+    response: str
+
+
+class Conversation(_Section):
+    system: Optional[str] = None
+    turns: List[Turn]
+
+
+class Generator(_Section):
+    seed: int = 0
+    # Checked in detail by parse_distribution
+    length: Any = None
+    corpus: Optional[List[str]] = None
+    max_words: int = 4096
+
+
+class Defaults(_Section):
+    unknown_response: Optional[str] = None
+    generator: Optional[Generator] = None
+
+
+class Packs(_Section):
+    directory: str
+    max_resident: int = 16
+    cache_dir: Optional[str] = None
+
+
+class Embeddings(_Section):
+    dimensions: int = 1536
+    model_dimensions: Dict[str, int] = {}
+    normalize: bool = True
+    seed: int = 0
+    cache_size: int = 4096
+
+
+class Settings(_Section):
+    lag_enabled: bool = False
+    lag_factor: float = 10
+    reload_mode: Literal["watch", "poll", "off"] = "watch"
+    stream_mode: Literal["char", "token"] = "char"
+    match_cache_size: int = 1024
+    fuzzy_threshold: float = 0.8
+    model_encodings: Dict[str, str] = {}
+    token_cache_size: int = 4096
+    prompt_tokens: Literal["exact", "approximate"] = "exact"
+    approximate_above: Optional[int] = None
+    stream_encoding: str = "cl100k_base"
+    tokens_per_chunk: int = 1
+    coalesce_frames: int = 1
+    # Checked in detail by LatencyModel and RateLimiter
+    latency: Optional[Dict[str, Any]] = None
+    rate_limits: Optional[Dict[str, Any]] = None
+    embeddings: Optional[Embeddings] = None
+
+    @field_validator("reload_mode", mode="before")
+    @classmethod
+    def _off(cls, value: Any) -> Any:
+        # YAML 1.1 parses an unquoted ``off`` as a boolean
+        return "off" if value is False else value
+
+
+class ResponseFile(_Section):
+    responses: Dict[str, str] = {}
+    rules: List[Rule] = []
+    conversations: List[Conversation] = []
+    defaults: Optional[Defaults] = None
+    settings: Settings = Settings()
+    # Checked in detail by FaultInjector
+    faults: Optional[Dict[str, Any]] = None
+    packs: Optional[Packs] = None
+
+
+def validate_config(data: Any) -> Dict[str, Any]:
+    """Validate parsed YAML, returning it with only the keys that were set.
+
+    Raises pydantic's ``ValidationError`` (a ``ValueError``) describing every
+    invalid entry.
+    """
+    return ResponseFile.model_validate(data or {}).model_dump(exclude_unset=True)
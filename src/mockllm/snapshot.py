@@ -0,0 +1,119 @@
+"""Compiled snapshots of the responses file.
+
+Parsing and validating a YAML file with tens of thousands of responses
+takes seconds; loading the same data from JSON takes milliseconds. A
+snapshot stores the validated data together with the size, mtime and
+SHA-256 of the YAML it was compiled from, and is only used while those
+still match.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import yaml
+
+from .schema import validate_config
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+# libyaml's loader is an order of magnitude faster than the pure-Python one
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse(source: bytes) -> Dict[str, Any]:
+    """Parse and validate the contents of a responses file.
+
+    Raises ``ValueError`` for invalid YAML as well as invalid config.
+    """
+    try:
+        data = yaml.load(source, Loader=Loader)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML: {e}") from e
+    return validate_config(data)
+
+
+def _fingerprint(stat: os.stat_result) -> Dict[str, int]:
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load(yaml_path: str, snapshot_path: Optional[str] = None) -> Dict[str, Any]:
+    """Load validated config data, from the snapshot if it is up to date.
+
+    A stale or missing snapshot is rebuilt from the YAML file.
+    """
+    stat = os.stat(yaml_path)
+    snapshot = _read(snapshot_path) if snapshot_path else None
+    if snapshot is not None and snapshot.get("source") == _fingerprint(stat):
+        cached: Dict[str, Any] = snapshot["data"]
+        return cached
+
+    with open(yaml_path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    if snapshot is not None and snapshot.get("sha256") == digest:
+        # Touched but unchanged (e.g. a fresh checkout)
+        data: Dict[str, Any] = snapshot["data"]
+    else:
+        data = parse(source)
+    if snapshot_path:
+        write(snapshot_path, data, stat, digest)
+    return data
+
+
+def compile_snapshot(yaml_path: str, snapshot_path: str) -> Dict[str, Any]:
+    """Validate a responses file and write its snapshot."""
+    stat = os.stat(yaml_path)
+    with open(yaml_path, "rb") as f:
+        source = f.read()
+    data = parse(source)
+    write(snapshot_path, data, stat, hashlib.sha256(source).hexdigest())
+    return data
+
+
+def write(
+    snapshot_path: str, data: Dict[str, Any], stat: os.stat_result, digest: str
+) -> None:
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "source": _fingerprint(stat),
+        "sha256": digest,
+        "data": data,
+    }
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    try:
+        # Write then rename, so concurrent workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    except OSError as e:
+        logger.warning(f"Could not write config snapshot {snapshot_path}: {str(e)}")
+        return
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, snapshot_path)
+    except OSError as e:
+        os.unlink(tmp_path)
+        logger.warning(f"Could not write config snapshot {snapshot_path}: {str(e)}")
+
+
+def _read(snapshot_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable config snapshot {snapshot_path}: {e}")
+        return None
+    if (
+        not isinstance(snapshot, dict)
+        or snapshot.get("version") != SNAPSHOT_VERSION
+        or not isinstance(snapshot.get("data"), dict)
+    ):
+        return None
+    return snapshot
@@ -0,0 +1,269 @@
+import time
+import uuid
+from abc import ABC, abstractmethod
+from json.encoder import encode_basestring
+from typing import AsyncGenerator, AsyncIterable, List, Optional
+
+DONE_FRAME = b"data: [DONE]\n\n"
+
+
+def json_string(text: str) -> bytes:
+    """Encode text as a JSON string literal, escaped the same way as pydantic."""
+    return encode_basestring(text).encode("utf-8")
+
+
+def new_response_id() -> str:
+    return f"mock-{uuid.uuid4()}"
+
+
+def usage_frame(envelope: bytes, prompt_tokens: int, completion_tokens: int) -> bytes:
+    """An OpenAI chunk with no choices, carrying the usage of the stream."""
+    return (
+        envelope
+        + b'[],"usage":{"prompt_tokens":'
+        + str(prompt_tokens).encode()
+        + b',"completion_tokens":'
+        + str(completion_tokens).encode()
+        + b',"total_tokens":'
+        + str(prompt_tokens + completion_tokens).encode()
+        + b"}}\n\n"
+    )
+
+
+class StreamEncoder(ABC):
+    """Encodes one API's stream format for the provider pipeline.
+
+    A stream is ``start``, one ``content`` frame per chunk of the response,
+    then ``end``; the pacing, token plans and usage accounting are shared by
+    every provider, so a new format only needs these three methods.
+    """
+
+    def start(self, prompt_tokens: int) -> bytes:
+        """Frames sent before the first chunk, if any."""
+        return b""
+
+    @abstractmethod
+    def content(self, text: str) -> bytes:
+        """The frame carrying one chunk of the response."""
+
+    @abstractmethod
+    def end(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        stop_reason: str,
+        include_usage: bool = False,
+    ) -> bytes:
+        """Frames sent after the last chunk."""
+
+
+class OpenAISSEEncoder(StreamEncoder):
+    """Encodes OpenAI ``chat.completion.chunk`` frames from byte templates.
+
+    The id, timestamp and model are serialized once per stream; each content
+    frame is then a prefix, the escaped content and a suffix. Output is
+    byte-for-byte what ``OpenAIStreamResponse.model_dump_json()`` produces for
+    the same id and timestamp.
+    """
+
+    object_type = b"chat.completion.chunk"
+
+    def __init__(
+        self,
+        model: str,
+        response_id: Optional[str] = None,
+        created: Optional[int] = None,
+    ):
+        self.response_id = response_id or new_response_id()
+        self.created = int(time.time()) if created is None else created
+        self.envelope = (
+            b'data: {"id":'
+            + json_string(self.response_id)
+            + b',"object":"'
+            + self.object_type
+            + b'","created":'
+            + str(self.created).encode()
+            + b',"model":'
+            + json_string(model)
+            + b',"choices":'
+        )
+        self.head = self.envelope + b'[{"delta":'
+        self.content_prefix = self.head + b'{"role":null,"content":'
+        self.content_suffix = b'},"index":0,"finish_reason":null}]}\n\n'
+
+    def role(self, role: str = "assistant") -> bytes:
+        return (
+            self.head
+            + b'{"role":'
+            + json_string(role)
+            + b',"content":null'
+            + self.content_suffix
+        )
+
+    def start(self, prompt_tokens: int) -> bytes:
+        return self.role()
+
+    def content(self, text: str) -> bytes:
+        return self.content_prefix + json_string(text) + self.content_suffix
+
+    def finish(self, finish_reason: str = "stop") -> bytes:
+        return (
+            self.head
+            + b'{"role":null,"content":null},"index":0,"finish_reason":'
+            + json_string(finish_reason)
+            + b"}]}\n\n"
+        )
+
+    def usage(self, prompt_tokens: int, completion_tokens: int) -> bytes:
+        """The final chunk sent when ``stream_options.include_usage`` is set."""
+        return usage_frame(self.envelope, prompt_tokens, completion_tokens)
+
+    def end(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        stop_reason: str,
+        include_usage: bool = False,
+    ) -> bytes:
+        frames = self.finish(stop_reason)
+        if include_usage:
+            frames += self.usage(prompt_tokens, completion_tokens)
+        return frames + DONE_FRAME
+
+
+class TextCompletionSSEEncoder(OpenAISSEEncoder):
+    """Encodes OpenAI legacy ``text_completion`` stream frames."""
+
+    object_type = b"text_completion"
+
+    def __init__(
+        self,
+        model: str,
+        response_id: Optional[str] = None,
+        created: Optional[int] = None,
+    ):
+        super().__init__(model, response_id, created)
+        self.content_prefix = self.envelope + b'[{"text":'
+        self.content_suffix = b',"index":0,"logprobs":null,"finish_reason":null}]}\n\n'
+
+    def start(self, prompt_tokens: int) -> bytes:
+        # Text completion streams have no role chunk
+        return b""
+
+    def finish(self, finish_reason: str = "stop") -> bytes:
+        return (
+            self.content_prefix
+            + b'"","index":0,"logprobs":null,"finish_reason":'
+            + json_string(finish_reason)
+            + b"}]}\n\n"
+        )
+
+
+def event(name: str, data: bytes) -> bytes:
+    """An SSE frame with an ``event:`` line, as the Anthropic API sends."""
+    return b"event: " + name.encode() + b"\ndata: " + data + b"\n\n"
+
+
+ANTHROPIC_CONTENT_BLOCK_START = event(
+    "content_block_start",
+    b'{"type":"content_block_start","index":0,'
+    b'"content_block":{"type":"text","text":""}}',
+)
+ANTHROPIC_PING = event("ping", b'{"type":"ping"}')
+ANTHROPIC_CONTENT_BLOCK_STOP = event(
+    "content_block_stop", b'{"type":"content_block_stop","index":0}'
+)
+ANTHROPIC_MESSAGE_STOP = event("message_stop", b'{"type":"message_stop"}')
+
+
+class AnthropicSSEEncoder(StreamEncoder):
+    """Encodes the Anthropic Messages streaming event sequence.
+
+    A stream is ``message_start``, ``content_block_start``, ``ping``, one
+    ``content_block_delta`` per chunk, ``content_block_stop``,
+    ``message_delta`` (carrying the stop reason and output token usage) and
+    ``message_stop``. Fixed events are module constants and the per-stream
+    ones are built once, so each delta is a prefix, the escaped text and a
+    suffix.
+    """
+
+    content_prefix = (
+        b"event: content_block_delta\ndata: "
+        b'{"type":"content_block_delta","index":0,'
+        b'"delta":{"type":"text_delta","text":'
+    )
+    content_suffix = b"}}\n\n"
+
+    def __init__(self, model: str, response_id: Optional[str] = None):
+        self.response_id = response_id or new_response_id()
+        self.model = model
+
+    def message_start(self, input_tokens: int = 0) -> bytes:
+        return event(
+            "message_start",
+            b'{"type":"message_start","message":{"id":'
+            + json_string(self.response_id)
+            + b',"type":"message","role":"assistant","content":[],"model":'
+            + json_string(self.model)
+            + b',"stop_reason":null,"stop_sequence":null,'
+            + b'"usage":{"input_tokens":'
+            + str(input_tokens).encode()
+            + b',"output_tokens":1}}}',
+        )
+
+    def start(self, input_tokens: int = 0) -> bytes:
+        """Every event sent before the first delta."""
+        return (
+            self.message_start(input_tokens)
+            + ANTHROPIC_CONTENT_BLOCK_START
+            + ANTHROPIC_PING
+        )
+
+    def content(self, text: str) -> bytes:
+        return self.content_prefix + json_string(text) + self.content_suffix
+
+    def message_delta(self, output_tokens: int, stop_reason: str = "end_turn") -> bytes:
+        return event(
+            "message_delta",
+            b'{"type":"message_delta","delta":{"stop_reason":'
+            + json_string(stop_reason)
+            + b',"stop_sequence":null},"usage":{"output_tokens":'
+            + str(output_tokens).encode()
+            + b"}}",
+        )
+
+    def finish(self, output_tokens: int, stop_reason: str = "end_turn") -> bytes:
+        """Every event sent after the last delta."""
+        return (
+            ANTHROPIC_CONTENT_BLOCK_STOP
+            + self.message_delta(output_tokens, stop_reason)
+            + ANTHROPIC_MESSAGE_STOP
+        )
+
+    def end(
+        self,
+        prompt_tokens: int,
+        completion_tokens: int,
+        stop_reason: str,
+        include_usage: bool = False,
+    ) -> bytes:
+        # Anthropic streams always report usage
+        return self.finish(completion_tokens, stop_reason)
+
+
+async def coalesce(
+    frames: AsyncIterable[bytes], count: int
+) -> AsyncGenerator[bytes, None]:
+    """Join up to ``count`` consecutive frames into a single write."""
+    if count <= 1:
+        async for frame in frames:
+            yield frame
+        return
+    batch: List[bytes] = []
+    async for frame in frames:
+        batch.append(frame)
+        if len(batch) >= count:
+            yield b"".join(batch)
+            batch = []
+    if batch:
+        yield b"".join(batch)
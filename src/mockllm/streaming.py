@@ -0,0 +1,76 @@
+"""Stops streams whose client has gone away."""
+
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, AsyncIterable, Awaitable, Callable, TypeVar
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# The ASGI ``receive`` callable of a request
+Receive = Callable[[], Awaitable[Any]]
+
+ABORTED = metrics.REGISTRY.counter(
+    "mockllm_streams_aborted_total",
+    "Streams that ended before their last event, by reason",
+    ("route", "reason"),
+)
+
+_END = object()
+
+
+async def _wait_for_disconnect(receive: Receive) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _produce(frames: AsyncIterable[T], queue: "asyncio.Queue[Any]") -> None:
+    try:
+        async for frame in frames:
+            await queue.put(frame)
+    finally:
+        # Runs the stream's cleanup now if it was cancelled between frames
+        aclose = getattr(frames, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        if queue.empty():
+            queue.put_nowait(_END)
+
+
+async def cancel_on_disconnect(
+    frames: AsyncIterable[T], receive: Receive, route: str
+) -> AsyncGenerator[T, None]:
+    """Pass a stream through, cancelling it as soon as the client disconnects.
+
+    Frames are produced by a separate task at most one frame ahead of the
+    client. A disconnect cancels that task, so a pending lag sleep ends at
+    once and the stream's cleanup (recording, stream slots) runs right away
+    rather than when the next write fails.
+    """
+    queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=1)
+    producer = asyncio.create_task(_produce(frames, queue))
+    watcher = asyncio.create_task(_wait_for_disconnect(receive))
+    watcher.add_done_callback(lambda _: producer.cancel())
+    reason = "disconnect"
+    try:
+        while not (producer.done() and queue.empty()):
+            frame = await queue.get()
+            if frame is _END:
+                break
+            yield frame
+        if not producer.cancelled():
+            reason = "error"
+            await producer  # raises whatever ended the stream early
+            reason = ""
+    finally:
+        watcher.cancel()
+        producer.cancel()
+        if reason:
+            ABORTED.inc(route, reason)
+            if reason == "disconnect":
+                logger.info("Client disconnected, stream cancelled")
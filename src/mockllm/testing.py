@@ -0,0 +1,57 @@
+"""Serve mockllm in-process, for the test suites of LLM clients.
+
+Requests go straight to an app instance through an ASGI transport, with no
+server process or socket, and every ``MockLLM`` has its own configuration::
+
+    mock = MockLLM({"responses": {"hello": "Hi there"}})
+    client = openai.OpenAI(
+        api_key="test", base_url=f"{BASE_URL}/v1", http_client=mock.client()
+    )
+"""
+
+from typing import Any, Mapping, Optional, Union
+
+import httpx
+from fastapi.testclient import TestClient
+
+from .app import create_app
+from .config import ResponseConfig
+
+BASE_URL = "http://mockllm"
+
+
+class MockLLM:
+    """An isolated mock server app and clients that call it in-process.
+
+    ``config`` is a response configuration as parsed from YAML, the path of
+    a responses file, or a ``ResponseConfig``; by default every prompt gets
+    the default response. Lag is off unless the configuration enables it.
+    """
+
+    def __init__(
+        self, config: Union[None, str, Mapping[str, Any], ResponseConfig] = None
+    ):
+        if isinstance(config, ResponseConfig):
+            self.response_config = config
+        elif isinstance(config, str):
+            self.response_config = ResponseConfig(config, reload_mode="off")
+        else:
+            self.response_config = ResponseConfig.from_dict(dict(config or {}))
+        self.app = create_app(self.response_config)
+
+    def configure(self, data: Mapping[str, Any]) -> None:
+        """Replace the configuration, e.g. to change responses mid-test."""
+        self.response_config.configure(dict(data))
+
+    def transport(self) -> httpx.ASGITransport:
+        """An async ``httpx`` transport that calls the app directly."""
+        return httpx.ASGITransport(app=self.app)
+
+    def async_client(self, **kwargs: Any) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=self.transport(), base_url=BASE_URL, **kwargs
+        )
+
+    def client(self, base_url: Optional[str] = None, **kwargs: Any) -> TestClient:
+        """A synchronous ``httpx.Client`` that calls the app in-process."""
+        return TestClient(self.app, base_url=base_url or BASE_URL, **kwargs)
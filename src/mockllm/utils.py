@@ -1,11 +1,147 @@
+import logging
+import re
+import threading
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
 import tiktoken
 
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKEN_MODES = ("exact", "approximate")
+
+_WORD = re.compile(r"\S+")
+
+
+class MessageFormat(NamedTuple):
+    """Tokens a chat API adds around the messages of a prompt."""
+
+    per_message: int  # framing around each message
+    per_request: int  # priming of the assistant's reply
+    count_roles: bool  # whether the role name is tokenized as well
+
+
+# OpenAI's documented accounting for chat models
+OPENAI_FORMAT = MessageFormat(per_message=3, per_request=3, count_roles=True)
+# Anthropic doesn't document its framing; this approximates its turn markers
+ANTHROPIC_FORMAT = MessageFormat(per_message=3, per_request=1, count_roles=False)
+# Plain text prompts, such as legacy completions and embedding inputs
+PLAIN_FORMAT = MessageFormat(per_message=0, per_request=0, count_roles=False)
+
+
+def approximate_count(text: str) -> int:
+    """Estimate tokens as one per four bytes of UTF-8, without encoding."""
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, resolving each model's encoding only once.
+
+    Models can be mapped to an encoding name explicitly; otherwise tiktoken's
+    own model lookup is used. Models without a usable encoding are remembered
+    so later calls go straight to the whitespace fallback instead of raising
+    and catching an exception per request.
+
+    Prompt messages are counted one at a time and cached by content, so the
+    prefix a conversation resends on every turn is only encoded once. In
+    ``approximate`` mode, or for messages longer than ``approximate_above``
+    characters, messages are estimated from their size instead.
+    """
+
+    def __init__(
+        self,
+        model_encodings: Optional[Mapping[str, str]] = None,
+        cache_size: int = 4096,
+        prompt_tokens: str = "exact",
+        approximate_above: Optional[int] = None,
+        message_cache_size: int = 16384,
+    ):
+        if prompt_tokens not in PROMPT_TOKEN_MODES:
+            raise ValueError(
+                f"Invalid prompt_tokens {prompt_tokens!r}, "
+                f"expected one of {PROMPT_TOKEN_MODES}"
+            )
+        self.model_encodings: Dict[str, str] = dict(model_encodings or {})
+        self.approximate = prompt_tokens == "approximate"
+        self.approximate_above = approximate_above
+        self._encodings: Dict[str, Optional[tiktoken.Encoding]] = {}
+        self._lock = threading.Lock()
+        self.count_cached = lru_cache(maxsize=cache_size)(self.count)
+        # Separate from count_cached so prompts don't evict canned responses
+        self._count_message = lru_cache(maxsize=message_cache_size)(self.count)
+
+    def encoding_for(self, model: str) -> Optional[tiktoken.Encoding]:
+        """Return the encoding for a model, or None if it has none."""
+        try:
+            return self._encodings[model]
+        except KeyError:
+            pass
+        with self._lock:
+            if model not in self._encodings:
+                self._encodings[model] = self._resolve(model)
+            return self._encodings[model]
+
+    def _resolve(self, model: str) -> Optional[tiktoken.Encoding]:
+        name = self.model_encodings.get(model)
+        try:
+            if name:
+                return tiktoken.get_encoding(name)
+            return tiktoken.encoding_for_model(model)
+        except Exception as e:
+            logger.info(f"No tiktoken encoding for model {model!r}: {str(e)}")
+            return None
+
+    def count(self, text: str, model: str) -> int:
+        """Get realistic token count for text using tiktoken"""
+        encoding = self.encoding_for(model)
+        if encoding is None:
+            # Fallback to rough estimation if model not supported
+            return len(text.split())
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int, model: str) -> str:
+        """Return the longest prefix of text that is at most max_tokens."""
+        encoding = self.encoding_for(model)
+        if encoding is None:
+            # Same whitespace-word fallback as count
+            words = list(islice(_WORD.finditer(text), max_tokens + 1))
+            if len(words) <= max_tokens:
+                return text
+            return text[: words[max_tokens - 1].end()] if max_tokens > 0 else ""
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        # A cut inside a multi-byte character drops the partial character
+        data = encoding.decode_bytes(tokens[:max_tokens])
+        return data.decode("utf-8", errors="ignore")
+
+    def count_message(self, content: str, model: str) -> int:
+        """Count the tokens of one prompt message's content."""
+        if self.approximate or (
+            self.approximate_above is not None and len(content) > self.approximate_above
+        ):
+            return approximate_count(content)
+        return self._count_message(content, model)
+
+    def count_messages(
+        self,
+        messages: Iterable[Tuple[str, str]],
+        model: str,
+        message_format: MessageFormat = OPENAI_FORMAT,
+    ) -> int:
+        """Count the prompt tokens of ``(role, content)`` pairs."""
+        total = message_format.per_request
+        for role, content in messages:
+            total += message_format.per_message + self.count_message(content, model)
+            if message_format.count_roles:
+                total += self.count_message(role, model)
+        return total
+
+
+default_counter = TokenCounter()
+
 
 def count_tokens(text: str, model: str) -> int:
     """Get realistic token count for text using tiktoken"""
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-        return len(encoding.encode(text))
-    except Exception:
-        # Fallback to rough estimation if model not supported
-        return len(text.split())
+    return default_counter.count(text, model)
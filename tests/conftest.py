@@ -0,0 +1,4 @@
+def pytest_configure(config):
+    # Installed copies of mockllm register the plugin through its entry point
+    if not config.pluginmanager.has_plugin("mockllm"):
+        config.pluginmanager.import_plugin("mockllm.pytest_plugin")
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mockllm import batches as batches_module
+from mockllm.app import create_app
+from mockllm.batches import BatchStore
+
+with patch("mockllm.config.ResponseConfig.load_responses"):
+    from mockllm import server
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = create_app(server.response_config, batches=BatchStore(str(tmp_path)))
+    # One event loop for the client's life, so background batches keep running
+    with TestClient(app) as client:
+        yield client
+
+
+def openai_line(custom_id, content, url="/v1/chat/completions"):
+    return json.dumps(
+        {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": url,
+            "body": {
+                "model": "mock-llm",
+                "messages": [{"role": "user", "content": content}],
+                "max_tokens": 2,
+            },
+        }
+    )
+
+
+def upload(client, lines):
+    response = client.post(
+        "/v1/files",
+        files={"file": ("input.jsonl", "\n".join(lines).encode(), "application/jsonl")},
+        data={"purpose": "batch"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["filename"] == "input.jsonl"
+    assert data["purpose"] == "batch"
+    return data["id"]
+
+
+def test_openai_batch(client):
+    file_id = upload(
+        client,
+        [
+            openai_line("a", "hello"),
+            "not json",
+            openai_line("b", "hello", url="/v1/embeddings"),
+            openai_line("c", "again"),
+        ],
+    )
+    response = client.post(
+        "/v1/batches",
+        json={
+            "input_file_id": file_id,
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+        },
+    )
+    batch = response.json()
+    assert batch["status"] == "completed"
+    assert batch["request_counts"] == {"total": 4, "completed": 2, "failed": 2}
+    assert client.get(f"/v1/batches/{batch['id']}").json() == batch
+
+    output = client.get(f"/v1/files/{batch['output_file_id']}/content")
+    results = [json.loads(line) for line in output.text.splitlines()]
+    assert [r["custom_id"] for r in results] == ["a", "c"]
+    body = results[0]["response"]["body"]
+    assert body["choices"][0]["message"]["content"] == "I don't"
+    assert body["choices"][0]["finish_reason"] == "length"
+    assert body["usage"]["completion_tokens"] == 2
+
+    errors = client.get(f"/v1/files/{batch['error_file_id']}/content")
+    failed = [json.loads(line) for line in errors.text.splitlines()]
+    assert [f["custom_id"] for f in failed] == [None, "b"]
+    assert all(f["response"] is None for f in failed)
+
+
+def test_unknown_batch_resources(client):
+    assert client.get("/v1/batches/batch_missing").status_code == 404
+    assert client.get("/v1/files/file_missing/content").status_code == 404
+    response = client.post(
+        "/v1/batches",
+        json={"input_file_id": "file_missing", "endpoint": "/v1/chat/completions"},
+    )
+    assert response.status_code == 404
+    response = client.post(
+        "/v1/batches", json={"input_file_id": "x", "endpoint": "/v1/unknown"}
+    )
+    assert response.status_code == 400
+
+
+def test_large_batches_run_in_the_background(client, monkeypatch):
+    monkeypatch.setattr(batches_module, "INLINE_LIMIT", 1)
+    monkeypatch.setattr(batches_module, "SLICE_SIZE", 3)
+    file_id = upload(client, [openai_line(str(i), "hello") for i in range(20)])
+    batch = client.post(
+        "/v1/batches",
+        json={"input_file_id": file_id, "endpoint": "/v1/chat/completions"},
+    ).json()
+    deadline = time.monotonic() + 5
+    while batch["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.01)
+        batch = client.get(f"/v1/batches/{batch['id']}").json()
+    assert batch["status"] == "completed"
+    assert batch["request_counts"]["completed"] == 20
+
+
+def create_batch(store, handler, count):
+    lines = [openai_line(str(i), "hello") for i in range(count)]
+    file_id = store.create_file("\n".join(lines).encode(), "in.jsonl", "batch")["id"]
+
+    async def run():
+        batch = await store.create_batch(file_id, "/v1/chat/completions", handler)
+        await asyncio.gather(*store._jobs)
+        return store.get_batch(batch["id"])
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("inline_limit", [256, 1])
+def test_unexpected_handler_errors_fail_one_request(
+    tmp_path, monkeypatch, inline_limit
+):
+    monkeypatch.setattr(batches_module, "INLINE_LIMIT", inline_limit)
+
+    def handler(body):
+        if body["messages"][0]["content"] == "hello":
+            raise RuntimeError("boom")
+        return {}
+
+    batch = create_batch(BatchStore(str(tmp_path)), handler, 3)
+    assert batch["status"] == "completed"
+    assert batch["request_counts"] == {"total": 3, "completed": 0, "failed": 3}
+
+
+@pytest.mark.parametrize("inline_limit", [256, 1])
+def test_batch_fails_when_processing_raises(tmp_path, monkeypatch, inline_limit):
+    monkeypatch.setattr(batches_module, "INLINE_LIMIT", inline_limit)
+    # A result that can't be written fails the batch rather than one request
+    batch = create_batch(BatchStore(str(tmp_path)), lambda body: {"x": object()}, 3)
+    assert batch["status"] == "failed"
+    assert batch["failed_at"] is not None
+    assert batch["errors"]["data"][0]["code"] == "batch_error"
+
+
+def test_anthropic_message_batch(client):
+    response = client.post(
+        "/v1/messages/batches",
+        json={
+            "requests": [
+                {
+                    "custom_id": "ok",
+                    "params": {
+                        "model": "claude-3-sonnet-20240229",
+                        "max_tokens": 1024,
+                        "messages": [{"role": "user", "content": "hello"}],
+                    },
+                },
+                {
+                    "custom_id": "bad",
+                    "params": {"model": "claude-3-sonnet-20240229", "messages": []},
+                },
+            ]
+        },
+    )
+    batch = response.json()
+    assert batch["type"] == "message_batch"
+    assert batch["processing_status"] == "ended"
+    assert batch["request_counts"]["succeeded"] == 1
+    assert batch["request_counts"]["errored"] == 1
+
+    results = client.get(batch["results_url"])
+    assert results.status_code == 200
+    lines = [json.loads(line) for line in results.text.splitlines()]
+    assert lines[0]["custom_id"] == "ok"
+    assert lines[0]["result"]["type"] == "succeeded"
+    assert lines[0]["result"]["message"]["type"] == "message"
+    assert lines[1]["result"]["type"] == "errored"
+
+
+def test_message_batch_ends_when_processing_raises(tmp_path):
+    store = BatchStore(str(tmp_path))
+    requests = [(str(i), {}) for i in range(3)]
+    batch = asyncio.run(
+        store.create_message_batch(requests, lambda params: {"x": object()})
+    )
+    assert batch["processing_status"] == "ended"
+    assert batch["request_counts"]["processing"] == 0
+    assert batch["request_counts"]["errored"] == 3
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import httpx
+
+from mockllm.bench import build_scenarios, is_content, percentile, run_benchmark
+
+ROLE = b'data: {"choices":[{"delta":{"role":"assistant","content":null}}]}\n\n'
+DELTA = b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\n'
+
+
+class SplitStream(httpx.AsyncByteStream):
+    """A stream whose reads split events mid-frame."""
+
+    async def __aiter__(self):
+        body = ROLE + DELTA + b"data: [DONE]\n\n"
+        for i in range(0, len(body), 7):
+            yield body[i : i + 7]
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body["stream"]:
+        return httpx.Response(200, stream=SplitStream())
+    return httpx.Response(200, json={"ok": True})
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([float(v) for v in range(1, 22)], 50) == 11
+    assert percentile([1, 2, 3], 100) == 3
+    assert percentile([1, 2, 3], 0) == 1
+    assert percentile([], 50) is None
+
+
+def test_is_content():
+    assert not is_content(ROLE.decode().strip())
+    assert is_content(DELTA.decode().strip())
+    assert is_content(
+        'data: {"type":"content_block_delta","delta":{"type":"text_delta"}}'
+    )
+    assert not is_content("event: content_block_delta")
+    assert not is_content("data: [DONE]")
+
+
+def test_run_benchmark_report():
+    lags = []
+    scenarios = build_scenarios(["openai", "anthropic"], [False, True], [False])
+
+    async def run():
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://mockllm"
+        ) as client:
+            return await run_benchmark(
+                client, scenarios, 5, 2, "hello", set_lag=lags.append
+            )
+
+    report = asyncio.run(run())
+    json.dumps(report)
+    assert lags == [False] * 4
+    results = {r["scenario"]: r for r in report["scenarios"]}
+    assert set(results) == {
+        "openai-json-nolag",
+        "openai-stream-nolag",
+        "anthropic-json-nolag",
+        "anthropic-stream-nolag",
+    }
+    stream = results["openai-stream-nolag"]
+    assert stream["requests"] == 5
+    assert stream["errors"] == 0
+    assert stream["events"] == 15
+    assert stream["ttft_s"]["p50"] is not None
+    assert results["openai-json-nolag"]["events_per_s"] is None
@@ -0,0 +1,53 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from mockllm.chunking import ChunkPlanner
+
+
+def byte_encoding():
+    """Fake encoding with one token per UTF-8 byte."""
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text, **kwargs: list(text.encode("utf-8"))
+    encoding.decode_tokens_bytes.side_effect = lambda tokens: [
+        bytes([t]) for t in tokens
+    ]
+    return encoding
+
+
+def test_approximate_tokens_without_encoding():
+    planner = ChunkPlanner(None)
+    plan = planner.plan("Hello, world!  Bye")
+    assert plan.chunks == ("Hello", ",", " world", "!", "  ", "Bye")
+    assert plan.total_tokens == 6
+
+
+def test_tokens_per_chunk():
+    planner = ChunkPlanner(None, tokens_per_chunk=2)
+    plan = planner.plan("one two three")
+    assert plan.chunks == ("one two", " three")
+    assert plan.token_counts == (2, 1)
+
+
+def test_multibyte_characters_are_not_split():
+    with patch("mockllm.chunking.tiktoken.get_encoding", return_value=byte_encoding()):
+        planner = ChunkPlanner("fake")
+    plan = planner.plan("héllo")
+    assert "".join(plan.chunks) == "héllo"
+    assert "é" in plan.chunks
+    assert plan.total_tokens == len("héllo".encode("utf-8"))
+
+
+def test_precomputed_plans_skip_tokenization():
+    encoding = byte_encoding()
+    with patch("mockllm.chunking.tiktoken.get_encoding", return_value=encoding):
+        planner = ChunkPlanner("fake")
+    planner.precompute(["canned"])
+    encoding.encode.reset_mock()
+    assert "".join(planner.plan("canned").chunks) == "canned"
+    encoding.encode.assert_not_called()
+
+
+def test_invalid_tokens_per_chunk():
+    with pytest.raises(ValueError):
+        ChunkPlanner(None, tokens_per_chunk=0)
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from mockllm import env
+from mockllm.__main__ import main
+from mockllm.env import RESPONSES_ENV
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    """Undo the variables ``serve`` sets for its workers after each test."""
+    for name in dir(env):
+        if name.endswith("_ENV"):
+            monkeypatch.delenv(getattr(env, name), raising=False)
+
+
+def run(argv):
+    with patch("mockllm.__main__.uvicorn.run") as uvicorn_run:
+        main(argv)
+    return uvicorn_run.call_args
+
+
+def test_serve_with_workers(monkeypatch):
+    monkeypatch.setenv(RESPONSES_ENV, "responses.yml")
+    call = run(["serve", "--workers", "4", "--port", "9000", "--config", "x.yml"])
+    assert call.args == ("mockllm.server:app",)
+    assert call.kwargs["workers"] == 4
+    assert call.kwargs["port"] == 9000
+    assert call.kwargs["reload"] is False
+    assert call.kwargs["loop"] == "auto"
+    assert os.environ[RESPONSES_ENV] == "x.yml"
+
+
+def test_serve_is_the_default_command(monkeypatch):
+    monkeypatch.setenv(RESPONSES_ENV, "responses.yml")
+    assert run(["--port", "9001"]).kwargs["port"] == 9001
+    assert run([]).kwargs["port"] == 8000
+
+
+def test_dev_mode_reloads_in_a_single_process(monkeypatch):
+    monkeypatch.setenv(RESPONSES_ENV, "responses.yml")
+    call = run(["serve", "--dev", "--workers", "4"])
+    assert call.kwargs["reload"] is True
+    assert call.kwargs["workers"] is None
+
+
+def test_missing_optional_backend(monkeypatch):
+    monkeypatch.setattr("mockllm.__main__.importlib.util.find_spec", lambda _: None)
+    with pytest.raises(SystemExit):
+        run(["serve", "--loop", "uvloop"])
+
+
+def test_serving_does_not_import_the_benchmark():
+    code = (
+        "import sys, mockllm.__main__; "
+        "assert 'mockllm.bench' not in sys.modules; "
+        "assert 'fastapi.testclient' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
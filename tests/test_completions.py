@@ -0,0 +1,91 @@
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from mockllm.sse import TextCompletionSSEEncoder
+
+with patch("mockllm.config.ResponseConfig.load_responses"):
+    from mockllm import server
+
+client = TestClient(server.app)
+
+
+def test_completion():
+    response = client.post(
+        "/v1/completions",
+        json={"model": "mock-llm", "prompt": ["one", "two"], "max_tokens": 100},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["object"] == "text_completion"
+    assert [choice["index"] for choice in data["choices"]] == [0, 1]
+    assert data["choices"][0]["text"] == server.response_config.default_response
+    assert data["choices"][0]["finish_reason"] == "stop"
+    usage = data["usage"]
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+
+def test_completion_defaults_to_16_tokens():
+    response = client.post(
+        "/v1/completions", json={"model": "mock-llm", "prompt": "hello"}
+    )
+    choice = response.json()["choices"][0]
+    assert response.json()["usage"]["completion_tokens"] <= 16
+    assert (
+        choice["text"] == server.response_config.complete("hello", "mock-llm", 16).text
+    )
+
+
+def test_streaming_completion():
+    response = client.post(
+        "/v1/completions",
+        json={
+            "model": "mock-llm",
+            "prompt": "hello",
+            "max_tokens": 3,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        },
+    )
+    frames = [
+        line[len("data: ") :]
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert frames[-1] == "[DONE]"
+    chunks = [json.loads(frame) for frame in frames[:-1]]
+    assert all(chunk["object"] == "text_completion" for chunk in chunks)
+    text = "".join(chunk["choices"][0]["text"] for chunk in chunks[:-1])
+    assert text == "I don't know"
+    assert chunks[-2]["choices"][0]["finish_reason"] == "length"
+    assert chunks[-1]["usage"]["completion_tokens"] == 3
+
+
+def test_streaming_completion_requires_one_prompt():
+    response = client.post(
+        "/v1/completions",
+        json={"model": "mock-llm", "prompt": ["a", "b"], "stream": True},
+    )
+    assert response.status_code == 400
+
+
+def test_text_completion_frames():
+    encoder = TextCompletionSSEEncoder('odd "model"', response_id="id", created=1)
+    frame = json.loads(encoder.content('a "quoted"\n')[len(b"data: ") :])
+    assert frame == {
+        "id": "id",
+        "object": "text_completion",
+        "created": 1,
+        "model": 'odd "model"',
+        "choices": [
+            {
+                "text": 'a "quoted"\n',
+                "index": 0,
+                "logprobs": None,
+                "finish_reason": None,
+            }
+        ],
+    }
+    finish = json.loads(encoder.finish("length")[len(b"data: ") :])
+    assert finish["choices"][0]["finish_reason"] == "length"
@@ -0,0 +1,100 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from mockllm.config import ResponseConfig
+
+YAML_CONTENT = """
+responses:
+  "hello": "world"
+settings:
+  reload_mode: {mode}
+"""
+
+
+def write_config(path, mode, response="world"):
+    path.write_text(YAML_CONTENT.format(mode=mode).replace("world", response))
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_watch_mode_reloads_on_change(tmp_path):
+    path = tmp_path / "responses.yml"
+    write_config(path, "watch")
+    config = ResponseConfig(str(path))
+    try:
+        assert config.get_response("hello") == "world"
+        write_config(path, "watch", response="updated")
+        assert wait_for(lambda: config.get_response("hello") == "updated")
+    finally:
+        config.stop_watching()
+
+
+def test_watch_mode_request_path_does_no_filesystem_work(tmp_path):
+    path = tmp_path / "responses.yml"
+    write_config(path, "watch")
+    config = ResponseConfig(str(path))
+    try:
+        with patch.object(config, "load_responses") as load:
+            assert config.get_response("hello") == "world"
+            load.assert_not_called()
+    finally:
+        config.stop_watching()
+
+
+def test_watch_mode_keeps_previous_table_on_invalid_file(tmp_path):
+    path = tmp_path / "responses.yml"
+    write_config(path, "off")
+    config = ResponseConfig(str(path))
+    table = config.table
+    path.write_text("responses: [unterminated")
+    os.utime(path, (time.time() + 1, time.time() + 1))
+    assert config.reload() is False
+    assert config.table is table
+
+
+def test_poll_mode_checks_file_per_request(tmp_path):
+    path = tmp_path / "responses.yml"
+    write_config(path, "poll")
+    config = ResponseConfig(str(path))
+    with patch.object(config, "load_responses") as load:
+        config.get_response("hello")
+        load.assert_called_once()
+
+
+def test_invalid_reload_mode(tmp_path):
+    path = tmp_path / "responses.yml"
+    write_config(path, "sometimes")
+    with pytest.raises(HTTPException):
+        ResponseConfig(str(path))
+
+
+def test_complete_cuts_token_plans_at_the_exact_token(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(
+        'responses:\n  "hello": "one two three four five six seven"\n'
+        'settings:\n  reload_mode: "off"\n  stream_mode: token\n'
+        "  tokens_per_chunk: 2\n"
+    )
+    config = ResponseConfig(str(path))
+    # mock-llm has no tiktoken encoding, so it counts whitespace-separated words
+    full = "one two three four five six seven"
+    assert config.complete("hello", "mock-llm") == (full, 7, False)
+    assert config.complete("hello", "mock-llm", 7).truncated is False
+    # The cut splits the chunk of tokens five and six
+    assert config.complete("hello", "mock-llm", 5) == (
+        "one two three four five",
+        5,
+        True,
+    )
+    assert config.complete("x", "mock-llm", 0, response="Hi") == ("", 0, True)
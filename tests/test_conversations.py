@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from mockllm.config import ResponseConfig
+from mockllm.conversations import ConversationIndex
+from mockllm.models import (
+    AnthropicChatRequest,
+    AnthropicMessage,
+    OpenAIChatRequest,
+    OpenAIMessage,
+)
+from mockllm.providers.anthropic import AnthropicProvider
+from mockllm.providers.openai import OpenAIProvider
+
+CONVERSATIONS = [
+    {
+        "turns": [
+            {"user": "Book a flight", "response": "Where to?"},
+            {"user": "Paris", "response": "Which date?"},
+            {"response": "Booked."},
+        ]
+    },
+    {
+        "system": "You are a pirate",
+        "turns": [
+            {"response": "Ahoy!"},
+            {"response": "Arr."},
+        ],
+    },
+]
+
+
+@pytest.fixture
+def index():
+    return ConversationIndex(CONVERSATIONS)
+
+
+def test_lookup_follows_user_turns(index):
+    assert len(index) == 2
+    assert index.lookup(None, ["Book a flight"]) == "Where to?"
+    assert index.lookup(None, ["book a  FLIGHT", "paris"]) == "Which date?"
+    assert index.lookup(None, ["Book a flight", "Paris", "tomorrow"]) == "Booked."
+
+
+def test_lookup_misses_off_script(index):
+    assert index.lookup(None, ["Book a hotel"]) is None
+    assert index.lookup(None, ["Book a flight", "Rome"]) is None
+    assert index.lookup(None, ["Book a flight", "Paris", "x", "y"]) is None
+    assert index.lookup(None, []) is None
+
+
+def test_lookup_by_system_prompt_and_turn_index(index):
+    assert index.lookup("You are a pirate", ["hi"]) == "Ahoy!"
+    assert index.lookup("you are a PIRATE", ["hi", "where?"]) == "Arr."
+    # Falls back to conversations without a system prompt once off script
+    history = ["Book a flight", "Paris", "tomorrow"]
+    assert index.lookup("You are a pirate", history) == "Booked."
+    assert index.lookup("You are a parrot", ["hi"]) is None
+
+
+@pytest.mark.parametrize(
+    "conversations",
+    [[{"turns": "hello"}], [{"turns": [{"user": "hi"}]}], ["hello"]],
+)
+def test_invalid_conversations(conversations):
+    with pytest.raises(ValueError):
+        ConversationIndex(conversations)
+
+
+@pytest.fixture
+def response_config(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(
+        """
+responses:
+  "paris": "configured"
+conversations:
+  - turns:
+      - user: "Book a flight"
+        response: "Where to?"
+      - user: "Paris"
+        response: "Which date?"
+  - system: "You are a pirate"
+    turns:
+      - response: "Ahoy!"
+settings:
+  reload_mode: "off"
+"""
+    )
+    return ResponseConfig(str(path))
+
+
+def test_openai_serves_scripted_turn(response_config):
+    provider = OpenAIProvider(response_config)
+    request = OpenAIChatRequest(
+        model="mock-llm",
+        messages=[
+            OpenAIMessage(role="user", content="Book a flight"),
+            OpenAIMessage(role="assistant", content="Where to?"),
+            OpenAIMessage(role="user", content="Paris"),
+        ],
+    )
+    result = asyncio.run(provider.handle_chat_completion(request))
+    assert result["choices"][0]["message"]["content"] == "Which date?"
+
+    # Outside the script the prompt is matched as before
+    request.messages = [OpenAIMessage(role="user", content="Paris")]
+    result = asyncio.run(provider.handle_chat_completion(request))
+    assert result["choices"][0]["message"]["content"] == "configured"
+
+
+def test_anthropic_uses_top_level_system_prompt(response_config):
+    provider = AnthropicProvider(response_config)
+    request = AnthropicChatRequest(
+        model="claude-3-sonnet-20240229",
+        system="You are a pirate",
+        messages=[AnthropicMessage(role="user", content="hello")],
+    )
+    result = asyncio.run(provider.handle_chat_completion(request))
+    assert result["content"][0]["text"] == "Ahoy!"
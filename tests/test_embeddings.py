@@ -0,0 +1,84 @@
+import base64
+import math
+from array import array
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mockllm.embeddings import EmbeddingModel, encode
+
+with patch("mockllm.config.ResponseConfig.load_responses"):
+    from mockllm import server
+
+client = TestClient(server.app)
+
+
+def test_vectors_are_deterministic_and_normalized():
+    model = EmbeddingModel(dimensions=64)
+    vector = model.vector("hello", "m", 64)
+    assert len(vector) == 64
+    assert math.isclose(math.hypot(*vector), 1.0, rel_tol=1e-5)
+    assert EmbeddingModel().vector("hello", "m", 64) == vector
+    assert model.vector("goodbye", "m", 64) != vector
+    assert model.vector("hello", "other", 64) != vector
+    assert EmbeddingModel(seed=1).vector("hello", "m", 64) != vector
+
+
+def test_shorter_dimensions_are_a_rescaled_prefix():
+    model = EmbeddingModel()
+    full, short = model.vector("hello", "m", 256), model.vector("hello", "m", 16)
+    scale = short[0] / full[0]
+    assert all(math.isclose(s, f * scale, rel_tol=1e-5) for s, f in zip(short, full))
+
+
+def test_unnormalized_vectors_are_in_unit_range():
+    vector = EmbeddingModel(normalize=False).vector("hello", "m", 256)
+    assert all(-1 <= value < 1 for value in vector)
+    assert max(abs(value) for value in vector) > 0.5
+
+
+def test_base64_encoding():
+    vector = array("f", [0.5, -0.25])
+    data = base64.b64decode(encode(vector, "base64"))
+    assert array("f", data).tolist() == [0.5, -0.25]
+    assert encode(vector) == [0.5, -0.25]
+
+
+def test_invalid_dimensions():
+    with pytest.raises(ValueError):
+        EmbeddingModel(dimensions=0)
+
+
+def test_embeddings_endpoint():
+    response = client.post(
+        "/v1/embeddings",
+        json={"model": "text-embedding-3-small", "input": ["hello", "world"]},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["object"] == "list"
+    assert [item["index"] for item in data["data"]] == [0, 1]
+    assert len(data["data"][0]["embedding"]) == 1536
+    assert data["usage"]["prompt_tokens"] == data["usage"]["total_tokens"] > 0
+
+
+def test_embeddings_endpoint_token_input_and_base64():
+    response = client.post(
+        "/v1/embeddings",
+        json={
+            "model": "text-embedding-3-small",
+            "input": [1, 2, 3],
+            "dimensions": 8,
+            "encoding_format": "base64",
+        },
+    )
+    data = response.json()
+    vector = array("f", base64.b64decode(data["data"][0]["embedding"]))
+    assert len(vector) == 8
+    assert data["usage"]["prompt_tokens"] == 3
+
+
+def test_embeddings_endpoint_rejects_empty_input():
+    response = client.post("/v1/embeddings", json={"model": "m", "input": ""})
+    assert response.status_code == 400
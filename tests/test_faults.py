@@ -0,0 +1,120 @@
+import asyncio
+import dataclasses
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mockllm.faults import Fault, FaultInjector, InjectedDisconnect
+
+with patch("mockllm.config.ResponseConfig.load_responses"):
+    from mockllm import server
+
+OPENAI_BODY = {"model": "mock-llm", "messages": [{"role": "user", "content": "hi"}]}
+
+
+async def frames(count, closed):
+    try:
+        for i in range(count):
+            yield f"event {i}".encode()
+    finally:
+        closed.append(True)
+
+
+async def collect(stream):
+    return [frame async for frame in stream]
+
+
+def test_fault_validation():
+    with pytest.raises(ValueError):
+        Fault.from_dict({"type": "explode"})
+    with pytest.raises(ValueError):
+        Fault.from_dict({"type": "error", "rate": 2})
+    with pytest.raises(ValueError):
+        Fault.from_dict({"type": "error", "status": 200})
+
+
+def test_pick_is_seeded_and_filtered():
+    data = {
+        "seed": 7,
+        "rules": [
+            {"type": "error", "status": 529, "rate": 0.5, "model": "gpt-4"},
+            {"type": "stall", "prompt": "Slow  Down"},
+        ],
+    }
+    picks = [
+        FaultInjector.from_dict(data).pick("/v1/messages", "gpt-4", "hi")
+        for _ in range(2)
+    ]
+    assert picks[0] == picks[1]
+
+    injector = FaultInjector.from_dict(data)
+    draws = [injector.pick("/", "gpt-4", "hi") for _ in range(200)]
+    assert 50 < sum(1 for fault in draws if fault is not None) < 150
+    assert injector.pick("/", "gpt-3", "hi") is None
+    # Stream-only faults are skipped for non-streaming requests
+    assert injector.pick("/", "gpt-3", "please slow down") is None
+    assert injector.pick("/", "gpt-3", "please slow down", stream=True).type == "stall"
+
+
+def test_disconnect_after_events():
+    closed = []
+    fault = Fault(type="disconnect", after=2)
+    received = []
+
+    async def consume():
+        async for frame in fault.apply(frames(5, closed)):
+            received.append(frame)
+
+    with pytest.raises(InjectedDisconnect):
+        asyncio.run(consume())
+    assert received == [b"event 0", b"event 1"]
+    assert closed == [True]
+
+
+def test_truncate_stream():
+    closed = []
+    fault = Fault(type="truncate", after=1)
+    result = asyncio.run(collect(fault.apply(frames(5, closed))))
+    assert result == [b"event 0", b"eve"]
+    assert closed == [True]
+
+
+@pytest.fixture
+def faults():
+    table = server.response_config.table
+
+    def install(*rules):
+        injector = FaultInjector([Fault.from_dict(rule) for rule in rules])
+        server.response_config.table = dataclasses.replace(table, faults=injector)
+
+    yield install
+    server.response_config.table = table
+
+
+def test_injected_error_response(faults):
+    faults({"type": "error", "status": 529})
+    response = TestClient(server.app).post("/v1/chat/completions", json=OPENAI_BODY)
+    assert response.status_code == 529
+    assert response.json() == {"detail": "Overloaded"}
+
+
+def test_truncated_json_response(faults):
+    faults({"type": "truncate"})
+    response = TestClient(server.app).post("/v1/chat/completions", json=OPENAI_BODY)
+    assert response.status_code == 200
+    with pytest.raises(ValueError):
+        response.json()
+
+
+def test_stream_disconnect(faults):
+    faults({"type": "disconnect", "after": 1, "route": "/v1/chat/completions"})
+    client = TestClient(server.app)
+    with pytest.raises(InjectedDisconnect):
+        client.post("/v1/chat/completions", json={**OPENAI_BODY, "stream": True})
+    # Other routes are unaffected
+    response = client.post(
+        "/v1/messages",
+        json={**OPENAI_BODY, "model": "claude-3-sonnet-20240229", "stream": True},
+    )
+    assert response.status_code == 200
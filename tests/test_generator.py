@@ -0,0 +1,62 @@
+import pytest
+
+from mockllm.config import ResponseConfig
+from mockllm.generator import ResponseGenerator
+from mockllm.latency import Constant
+
+
+def test_generation_is_deterministic_per_prompt():
+    generator = ResponseGenerator.from_dict({"seed": 7})
+    assert generator.generate("hello") == generator.generate("hello")
+    assert generator.generate("hello") != generator.generate("goodbye")
+    assert ResponseGenerator.from_dict({"seed": 8}).generate(
+        "hello"
+    ) != generator.generate("hello")
+
+
+def test_length_follows_distribution_and_limit():
+    generator = ResponseGenerator(Constant(50), corpus=["word"])
+    text = generator.generate("prompt")
+    assert len(text.split()) == 50
+    assert text.startswith("Word word")
+    assert text.endswith("word.")
+
+    short = generator.generate("prompt", limit=10)
+    assert len(short.split()) == 10
+    assert generator.generate("prompt", limit=0) == ""
+
+
+def test_limit_cuts_the_same_text():
+    generator = ResponseGenerator.from_dict({})
+    full = generator.generate("prompt").split()
+    short = generator.generate("prompt", limit=12).split()
+    assert [w.strip(".").lower() for w in short] == [
+        w.strip(".").lower() for w in full[:12]
+    ]
+
+
+def test_invalid_generator():
+    with pytest.raises(ValueError):
+        ResponseGenerator.from_dict({"length": {"distribution": "zipf"}})
+    with pytest.raises(ValueError):
+        ResponseGenerator(Constant(1), corpus=[])
+
+
+def test_unmatched_prompts_are_generated(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(
+        'responses:\n  "hello": "world"\n'
+        "defaults:\n  generator:\n    seed: 1\n"
+        "    length: {distribution: uniform, low: 40, high: 60}\n"
+        'settings:\n  reload_mode: "off"\n'
+    )
+    config = ResponseConfig(str(path))
+    assert config.get_response("hello") == "world"
+    generated = config.get_response("anything else")
+    assert 40 <= len(generated.split()) <= 60
+    assert config.get_response("anything else") == generated
+
+    completion = config.complete("anything else", "mock-llm", 5)
+    assert completion.truncated
+    assert completion.tokens == 5
+    assert generated.startswith(completion.text[:-1])
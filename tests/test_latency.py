@@ -0,0 +1,84 @@
+import asyncio
+import random
+import time
+from unittest.mock import patch
+
+import pytest
+
+from mockllm.latency import (
+    Distribution,
+    LatencyModel,
+    LatencyProfile,
+    Percentiles,
+    pace,
+    parse_distribution,
+)
+
+
+def test_parse_distributions():
+    assert parse_distribution(0.5).sample(random.Random()) == 0.5
+    normal = parse_distribution({"distribution": "normal", "mean": 1, "stddev": 0})
+    assert normal.sample(random.Random()) == 1
+    lognormal = parse_distribution({"distribution": "lognormal", "median": 0.2})
+    assert lognormal.sample(random.Random(1)) > 0
+    with pytest.raises(ValueError):
+        parse_distribution({"distribution": "pareto"})
+    with pytest.raises(TypeError):
+        Distribution()
+
+
+def test_percentiles_interpolate_and_clamp():
+    dist = Percentiles({"p50": 1.0, "p90": 2.0})
+    samples = [dist.sample(random.Random(seed)) for seed in range(200)]
+    assert min(samples) == 1.0
+    assert max(samples) == 2.0
+
+
+def test_seeded_requests_are_deterministic():
+    latency = LatencyModel.from_dict(
+        {
+            "seed": 7,
+            "default": {"ttft": {"distribution": "uniform", "low": 0, "high": 1}},
+            "models": {"slow": {"ttft": 5}},
+        }
+    )
+    profile = latency.profile_for("mock-llm")
+    first = profile.ttft.sample(latency.rng("mock-llm", "hi"))
+    assert first == profile.ttft.sample(latency.rng("mock-llm", "hi"))
+    assert latency.profile_for("slow").ttft.mean == 5
+
+
+def test_pace_batches_sleeps():
+    profile = LatencyProfile(
+        ttft=parse_distribution(0.01),
+        inter_token=parse_distribution(0.001),
+        batch_interval=0.02,
+    )
+    chunks = [(str(i), 1.0) for i in range(100)]
+    real_sleep = asyncio.sleep
+    sleeps = []
+
+    async def recording_sleep(delay):
+        sleeps.append(delay)
+        await real_sleep(delay)
+
+    async def run():
+        return [chunk async for chunk in pace(chunks, profile, random.Random())]
+
+    start = time.monotonic()
+    with patch("mockllm.latency.asyncio.sleep", recording_sleep):
+        result = asyncio.run(run())
+    elapsed = time.monotonic() - start
+    assert result == [chunk for chunk, _ in chunks]
+    # ~0.11s of simulated output, released in batches rather than 100 sleeps
+    assert len(sleeps) < 20
+    assert 0.1 <= elapsed < 0.5
+
+
+def test_throughput_cap_bounds_total_delay():
+    profile = LatencyProfile(
+        ttft=parse_distribution(0.5),
+        inter_token=parse_distribution(0.0),
+        max_tokens_per_second=100,
+    )
+    assert profile.total_delay(200, random.Random()) == pytest.approx(2.5)
@@ -0,0 +1,146 @@
+import asyncio
+import dataclasses
+from unittest.mock import patch
+
+import pytest
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+
+from mockllm.app import SlotStreamingResponse
+from mockllm.limits import RateLimiter, TokenBucket, duration
+
+with patch("mockllm.config.ResponseConfig.load_responses"):
+    from mockllm import server
+
+
+def test_token_bucket_refills_lazily():
+    bucket = TokenBucket(60)  # one unit per second
+    start = bucket.updated
+    assert bucket.wait(60, start) == 0
+    bucket.take(60)
+    assert bucket.wait(1, start) == pytest.approx(1.0)
+    assert bucket.wait(1, start + 0.5) == pytest.approx(0.5)
+    assert bucket.wait(1, start + 1.0) == 0
+    # Larger than the bucket: admitted once it is full
+    assert bucket.wait(100, start + 1.0) == pytest.approx(59.0)
+
+
+def test_limiter_only_consumes_on_admission():
+    limiter = RateLimiter.from_dict(
+        {"requests_per_minute": 2, "tokens_per_minute": 100}
+    )
+    assert limiter.admit("key", "gpt-4", 80, stream=False).retry_after is None
+    rejected = limiter.admit("key", "gpt-4", 80, stream=False)
+    assert rejected.retry_after is not None
+    assert rejected.requests.remaining == 1
+    assert rejected.tokens.remaining == 20
+    # Other keys and models have their own buckets
+    assert limiter.admit("other", "gpt-4", 80, stream=False).retry_after is None
+    assert limiter.admit("key", "gpt-3", 80, stream=False).retry_after is None
+
+
+def test_model_overrides():
+    limiter = RateLimiter.from_dict(
+        {"requests_per_minute": 100, "models": {"slow": {"requests_per_minute": 1}}}
+    )
+    assert limiter.models["slow"].requests_per_minute == 1
+    limiter.admit("", "slow", 0, stream=False)
+    assert limiter.admit("", "slow", 0, stream=False).retry_after is not None
+    assert limiter.admit("", "fast", 0, stream=False).retry_after is None
+
+
+def test_concurrent_stream_slots():
+    limiter = RateLimiter.from_dict({"max_concurrent_streams": 1})
+    assert limiter.admit("", "m", 0, stream=True).retry_after is None
+    assert limiter.admit("", "m", 0, stream=True).retry_after == 1.0
+    # Non-streaming requests don't take a slot
+    assert limiter.admit("", "m", 0, stream=False).retry_after is None
+    limiter.release()
+    assert limiter.admit("", "m", 0, stream=True).retry_after is None
+
+
+def test_refilled_buckets_are_forgotten_first():
+    limiter = RateLimiter.from_dict({"requests_per_minute": 60, "max_clients": 2})
+    with patch("mockllm.limits.time.monotonic", return_value=0.0) as clock:
+        limiter.admit("old", "m", 0, stream=False)
+        clock.return_value = 30.0  # "old" has refilled by now
+        limiter.admit("busy", "m", 0, stream=False)
+        limiter.admit("new", "m", 0, stream=False)
+    assert list(limiter._buckets) == [("busy", "m"), ("new", "m")]
+
+
+def test_bucket_count_is_bounded():
+    limiter = RateLimiter.from_dict({"requests_per_minute": 60, "max_clients": 8})
+    for i in range(100):
+        limiter.admit(f"key-{i}", "m", 0, stream=False)
+    assert len(limiter._buckets) <= 8
+    assert ("key-99", "m") in limiter._buckets
+
+
+def test_slot_is_released_when_the_body_never_starts():
+    released = []
+
+    async def body():
+        yield b"never sent"
+
+    async def send(message):
+        raise OSError("client went away")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    response = SlotStreamingResponse(
+        StreamingResponse(body()), lambda: released.append(True)
+    )
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    with pytest.raises(ClientDisconnect):
+        asyncio.run(response(scope, receive, send))
+    assert released == [True]
+
+
+def test_duration():
+    assert duration(0.12) == "120ms"
+    assert duration(1.5) == "1.5s"
+    assert duration(90) == "1m30s"
+
+
+@pytest.fixture
+def limited():
+    table = server.response_config.table
+    limiter = RateLimiter.from_dict(
+        {"requests_per_minute": 1, "max_concurrent_streams": 1}
+    )
+    server.response_config.table = dataclasses.replace(table, limiter=limiter)
+    yield limiter
+    server.response_config.table = table
+
+
+def test_openai_rate_limit_response(limited):
+    client = TestClient(server.app)
+    body = {"model": "mock-llm", "messages": [{"role": "user", "content": "hi"}]}
+    headers = {"authorization": "Bearer sk-test"}
+
+    response = client.post("/v1/chat/completions", json=body, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["x-ratelimit-limit-requests"] == "1"
+    assert response.headers["x-ratelimit-remaining-requests"] == "0"
+
+    response = client.post("/v1/chat/completions", json=body, headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    assert "x-ratelimit-reset-requests" in response.headers
+
+
+def test_anthropic_stream_releases_slot(limited):
+    client = TestClient(server.app)
+    limited.default = limited.default._replace(requests_per_minute=None)
+    body = {
+        "model": "claude-3-sonnet-20240229",
+        "messages": [{"role": "user", "content": "hi"}],
+        "stream": True,
+    }
+    for _ in range(2):
+        response = client.post("/v1/messages", json=body, headers={"x-api-key": "k"})
+        assert response.status_code == 200
+    assert limited.active_streams == 0
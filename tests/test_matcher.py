@@ -0,0 +1,89 @@
+import pytest
+
+from mockllm.matcher import PromptMatcher, normalize
+
+RULES = [
+    {"type": "exact", "pattern": "Ping", "response": "pong"},
+    {"type": "prefix", "pattern": "write a", "response": "short prefix"},
+    {"type": "prefix", "pattern": "write a python", "response": "long prefix"},
+    {"type": "contains", "pattern": "weather", "response": "sunny"},
+    {"type": "contains", "pattern": "the weather", "response": "later rule"},
+    {"type": "regex", "pattern": r"^order #(?P<id>\d+)$", "response": "order"},
+    {"type": "fuzzy", "pattern": "tell me a funny joke", "response": "joke"},
+]
+
+
+@pytest.fixture
+def matcher():
+    return PromptMatcher({"Hello  World": "hi"}, RULES)
+
+
+def test_normalize():
+    assert normalize("  Hello\n\tWORLD  ") == "hello world"
+
+
+def test_exact_is_case_and_whitespace_insensitive(matcher):
+    assert matcher.match("Hello  World") == "hi"
+    assert matcher.match("  hello world ") == "hi"
+    assert matcher.match("PING") == "pong"
+
+
+def test_longest_prefix_wins(matcher):
+    assert matcher.match("Write a   Python script") == "long prefix"
+    assert matcher.match("write a poem") == "short prefix"
+
+
+def test_earliest_declared_substring_wins(matcher):
+    assert matcher.match("how is the weather today?") == "sunny"
+
+
+def test_regex(matcher):
+    assert matcher.match("order #1234") == "order"
+    assert matcher.match("order #abc") is None
+
+
+def test_regex_inline_flags_and_named_groups():
+    matcher = PromptMatcher(
+        rules=[
+            {"type": "regex", "pattern": "(?i)^hello", "response": "greeting"},
+            {"type": "regex", "pattern": r"^a(?P<n>\d)", "response": "first"},
+            {"type": "regex", "pattern": r"^b(?P<n>\d)", "response": "second"},
+        ]
+    )
+    assert matcher.match("HELLO there") == "greeting"
+    assert matcher.match("a1") == "first"
+    assert matcher.match("b2") == "second"
+
+
+def test_earliest_declared_regex_wins():
+    matcher = PromptMatcher(
+        rules=[
+            {"type": "regex", "pattern": "world", "response": "A"},
+            {"type": "regex", "pattern": "hello", "response": "B"},
+        ]
+    )
+    assert matcher.match("hello world") == "A"
+
+
+def test_fuzzy(matcher):
+    assert matcher.match("tell me a funny joke please") == "joke"
+    assert matcher.match("tell me something") is None
+
+
+def test_results_are_memoized(matcher):
+    matcher.match("write a poem")
+    matcher.match("write a poem")
+    assert matcher.match.cache_info().hits == 1
+
+
+def test_invalid_rules_fail_at_build_time():
+    with pytest.raises(ValueError):
+        PromptMatcher(rules=[{"type": "glob", "pattern": "x", "response": "y"}])
+    with pytest.raises(ValueError):
+        PromptMatcher(rules=[{"type": "regex", "pattern": "(", "response": "y"}])
+
+
+@pytest.mark.parametrize("rule_type", ["exact", "prefix", "contains", "fuzzy"])
+def test_whitespace_only_patterns_are_rejected(rule_type):
+    with pytest.raises(ValueError, match="empty"):
+        PromptMatcher(rules=[{"type": rule_type, "pattern": " \t", "response": "y"}])
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from mockllm.metrics import Metric, Registry, track_stream
+
+
+def test_counter_and_gauge_render():
+    registry = Registry()
+    counter = registry.counter("requests_total", "Requests", ("route",))
+    gauge = registry.gauge("active", "Active")
+    counter.inc("/a")
+    counter.inc("/a")
+    counter.inc('/b"')
+    gauge.inc()
+    gauge.dec()
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 2' in text
+    assert 'requests_total{route="/b\\""} 1' in text
+    assert "active 0" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram("latency", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+    text = registry.render()
+    assert 'latency_bucket{le="0.1"} 1' in text
+    assert 'latency_bucket{le="1"} 3' in text
+    assert 'latency_bucket{le="+Inf"} 4' in text
+    assert "latency_count 4" in text
+    assert "latency_sum 6.05" in text
+
+
+def test_track_stream_counts_events_and_active_streams():
+    from mockllm import metrics
+
+    start = (
+        b"event: message_start\ndata: {}\n\n"
+        b"event: content_block_start\ndata: {}\n\n"
+    )
+    delta = b'data: {"text": "data: \\ndata: x"}\n\n'
+
+    async def frames():
+        assert metrics.ACTIVE_STREAMS.get("/test") == 1
+        yield start
+        yield delta
+
+    async def run():
+        return [frame async for frame in track_stream(frames(), "/test")]
+
+    assert asyncio.run(run()) == [start, delta]
+    assert metrics.STREAM_CHUNKS.get("/test") == 3
+    assert metrics.ACTIVE_STREAMS.get("/test") == 0
+    assert metrics.STREAM_SECONDS.count("/test") == 1
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("m", "Abstract")
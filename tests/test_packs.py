@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from mockllm.config import ResponseConfig
+from mockllm.packs import CACHE_DIR, PackIndex
+
+
+@pytest.fixture
+def packs_dir(tmp_path):
+    directory = tmp_path / "packs"
+    directory.mkdir()
+    (directory / "a-team.yml").write_text(
+        'responses:\n  "Hello  World": "from a"\n  "shared": "a wins"\n'
+    )
+    (directory / "b-model.json").write_text(
+        '{"responses": {"goodbye": "from b", "shared": "b loses", "ünï": "çødé"}}'
+    )
+    (directory / "notes.txt").write_text("not a pack")
+    return directory
+
+
+def test_lookup_across_packs(packs_dir):
+    index = PackIndex(str(packs_dir))
+    assert len(index) == 5
+    assert index.get("hello world") == "from a"
+    assert index.get("GOODBYE") == "from b"
+    assert index.get("shared") == "a wins"
+    assert index.get("ÜNÏ") == "çødé"
+    assert index.get("missing") is None
+
+
+def test_packs_are_mapped_lazily_with_lru_eviction(packs_dir):
+    index = PackIndex(str(packs_dir), max_resident=1)
+    assert index.resident == 0
+    index.get("hello world")
+    assert index.resident == 1
+    index.get("goodbye")
+    assert index.resident == 1
+    assert index.get("hello world") == "from a"
+    index.close()
+    assert index.resident == 0
+
+
+def test_compiled_packs_are_reused(packs_dir):
+    PackIndex(str(packs_dir))
+    compiled = packs_dir / CACHE_DIR / "a-team.yml.pack"
+    mtime = compiled.stat().st_mtime_ns
+    PackIndex(str(packs_dir))
+    assert compiled.stat().st_mtime_ns == mtime
+
+    (packs_dir / "a-team.yml").write_text('responses:\n  "hello world": "new"\n')
+    index = PackIndex(str(packs_dir))
+    assert index.get("hello world") == "new"
+    assert index.get("shared") == "b loses"
+
+
+def test_invalid_pack(packs_dir):
+    (packs_dir / "bad.yml").write_text("responses:\n  hello: [1, 2]\n")
+    with pytest.raises(ValueError):
+        PackIndex(str(packs_dir))
+
+
+def test_response_config_falls_back_to_packs(packs_dir, tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(
+        'responses:\n  "goodbye": "from config"\n'
+        "packs:\n  directory: packs\n  max_resident: 2\n"
+        'settings:\n  reload_mode: "off"\n'
+    )
+    config = ResponseConfig(str(path))
+    assert config.get_response("goodbye") == "from config"
+    assert config.get_response("hello world") == "from a"
+    assert config.get_response("missing") == config.default_response
+    assert os.path.isdir(packs_dir / CACHE_DIR)
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from mockllm import profiling
+from mockllm.app import create_app
+from mockllm.config import ResponseConfig
+from mockllm.profiling import Profiler, StackSampler, Trace
+
+CHAT = {"model": "mock-llm", "messages": [{"role": "user", "content": "hello"}]}
+
+
+def test_nested_phases_are_exclusive():
+    trace = Trace("POST", "/v1/chat/completions")
+    token = profiling._current.set(trace)
+    try:
+        with profiling.phase("lookup"):
+            time.sleep(0.01)
+            with profiling.phase("tokenize"):
+                time.sleep(0.02)
+    finally:
+        profiling._current.reset(token)
+    trace.finish()
+    assert 0.01 <= trace.phases["lookup"] < 0.02
+    assert trace.phases["tokenize"] >= 0.02
+    phases = trace.as_dict()["phases"]
+    assert sum(phases.values()) == pytest.approx(trace.seconds)
+
+
+def test_unsampled_requests_are_not_timed():
+    func = len
+    assert profiling.timed(func, "serialize") is func
+    with profiling.phase("lookup"):
+        pass
+    assert profiling.current() is None
+
+
+def test_keeps_the_slowest_requests():
+    profiler = Profiler(slowest=2)
+    for seconds in (0.3, 0.1, 0.5, 0.2):
+        trace = Trace("POST", "/v1/messages")
+        trace.seconds = seconds
+        profiler.record(trace)
+    report = profiler.report()
+    assert report["sampled_requests"] == 4
+    assert [entry["seconds"] for entry in report["slowest"]] == [0.5, 0.3]
+
+
+def test_sample_rate():
+    with pytest.raises(ValueError):
+        Profiler(sample_rate=0)
+    profiler = Profiler(sample_rate=0.5)
+    assert not profiler.should_sample("/admin/profile")
+    sampled = sum(profiler.should_sample("/v1/messages") for _ in range(1000))
+    assert 350 < sampled < 650
+
+
+def test_stack_sampler_collapses_stacks():
+    sampler = StackSampler()
+    sampler.thread_id = threading.get_ident()
+    sampler.sample()
+    [line] = sampler.collapsed().splitlines()
+    stack, count = line.rsplit(" ", 1)
+    assert count == "1"
+    assert stack.endswith("mockllm.profiling:StackSampler.sample")
+    assert "test_profiling:test_stack_sampler_collapses_stacks" in stack
+
+
+def test_profile_endpoints():
+    config = ResponseConfig.from_dict({"responses": {"hello": "Hi there"}})
+    client = TestClient(create_app(config, profiler=Profiler(slowest=5)))
+    client.post("/v1/chat/completions", json=CHAT)
+    client.post("/v1/chat/completions", json={**CHAT, "stream": True})
+
+    report = client.get("/admin/profile").json()
+    assert report["sampled_requests"] == 2
+    assert {"parse", "lookup", "tokenize", "serialize", "stream"} <= set(
+        report["phases"]
+    )
+    [slowest, _] = report["slowest"]
+    assert slowest["path"] == "/v1/chat/completions"
+    assert slowest["status"] == 200
+    assert sum(slowest["phases"].values()) == pytest.approx(slowest["seconds"])
+    assert client.get("/admin/profile/flame").status_code == 200
+
+    client.delete("/admin/profile")
+    assert client.get("/admin/profile").json()["sampled_requests"] == 0
+
+
+def test_profiling_disabled():
+    client = TestClient(create_app(ResponseConfig.from_dict({})))
+    assert client.get("/admin/profile").status_code == 404
@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from mockllm.config import ResponseConfig
+from mockllm.models import OpenAIChatRequest, OpenAIMessage
+from mockllm.providers.base import LLMProvider
+from mockllm.sse import StreamEncoder
+
+
+class NDJSONEncoder(StreamEncoder):
+    """A line-delimited JSON format, in the style of Ollama's streams."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def content(self, text):
+        return json.dumps({"model": self.model, "response": text}).encode() + b"\n"
+
+    def end(self, prompt_tokens, completion_tokens, stop_reason, include_usage=False):
+        return (
+            json.dumps(
+                {"done": True, "reason": stop_reason, "eval_count": completion_tokens}
+            ).encode()
+            + b"\n"
+        )
+
+
+class NDJSONProvider(LLMProvider):
+    route = "/api/generate"
+    request_model = OpenAIChatRequest
+
+    def encoder(self, model):
+        return NDJSONEncoder(model)
+
+    def chat_response(self, request, completion, prompt_tokens):
+        return {"response": completion.text, "done": True}
+
+
+@pytest.fixture
+def provider(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(
+        'responses:\n  "hello": "Hello there, friend"\n'
+        'settings:\n  reload_mode: "off"\n'
+    )
+    return NDJSONProvider(ResponseConfig(str(path)))
+
+
+def request(stream, max_tokens=None):
+    return OpenAIChatRequest(
+        model="mock-llm",
+        messages=[OpenAIMessage(role="user", content="hello")],
+        stream=stream,
+        max_tokens=max_tokens,
+    )
+
+
+async def collect(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+def test_provider_needs_only_an_encoder(provider):
+    body = asyncio.run(provider.handle_chat_completion(request(False)))
+    assert body == {"response": "Hello there, friend", "done": True}
+
+    response = asyncio.run(provider.handle_chat_completion(request(True)))
+    lines = [json.loads(line) for line in asyncio.run(collect(response)).splitlines()]
+    assert "".join(line.get("response", "") for line in lines) == (
+        "Hello there, friend"
+    )
+    assert lines[-1]["done"] is True
+    assert lines[-1]["reason"] == "stop"
+
+
+def test_pipeline_applies_max_tokens(provider):
+    response = asyncio.run(provider.handle_chat_completion(request(True, 1)))
+    lines = [json.loads(line) for line in asyncio.run(collect(response)).splitlines()]
+    assert lines[-1] == {"done": True, "reason": "length", "eval_count": 1}
+
+
+def test_request_without_user_message(provider):
+    empty = OpenAIChatRequest(model="mock-llm", messages=[])
+    with pytest.raises(HTTPException, match="No user message"):
+        provider.resolve(empty)
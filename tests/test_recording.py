@@ -0,0 +1,128 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from mockllm import metrics
+from mockllm.config import ResponseConfig
+from mockllm.matcher import normalize
+from mockllm.models import (
+    AnthropicChatRequest,
+    AnthropicMessage,
+    OpenAIChatRequest,
+    OpenAIMessage,
+)
+from mockllm.providers.anthropic import AnthropicProvider
+from mockllm.providers.openai import OpenAIProvider
+from mockllm.recording import Recorder, ReplayLog, history_key
+
+
+def messages(*contents):
+    return [OpenAIMessage(role="user", content=c) for c in contents]
+
+
+@pytest.fixture
+def response_config(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(
+        'responses:\n  "hello": "configured"\nsettings:\n  reload_mode: "off"\n'
+    )
+    return ResponseConfig(str(path))
+
+
+def test_record_then_replay(tmp_path, response_config):
+    log = tmp_path / "capture.jsonl"
+    recorder = Recorder(str(log), flush_interval=0.01)
+    provider = OpenAIProvider(response_config, recorder=recorder)
+    request = OpenAIChatRequest(model="mock-llm", messages=messages("hello"))
+    asyncio.run(provider.handle_chat_completion(request))
+    recorder.close()
+
+    [record] = [json.loads(line) for line in log.read_text().splitlines()]
+    assert record["response"] == "configured"
+    assert record["messages"] == [{"role": "user", "content": "hello"}]
+    assert record["complete"] is True
+
+    # Served from the log, even though the configured response differs
+    record["response"] = "recorded"
+    log.write_text(json.dumps(record) + "\n")
+    replay = ReplayLog.from_file(str(log))
+    provider = OpenAIProvider(response_config, replay=replay)
+    request = OpenAIChatRequest(model="mock-llm", messages=messages("  HELLO "))
+    hits = metrics.MATCHES.get("hit")
+    result = asyncio.run(provider.handle_chat_completion(request))
+    assert result["choices"][0]["message"]["content"] == "recorded"
+    assert metrics.MATCHES.get("hit") == hits + 1
+
+
+def test_replay_cycles_through_recorded_responses(tmp_path):
+    log = tmp_path / "capture.jsonl"
+    recorder = Recorder(str(log))
+    for response in ("first", "second"):
+        exchange = recorder.start("/v1/messages", "m", False, [("user", "hi")])
+        exchange.add(response)
+        exchange.finish()
+    recorder.close()
+
+    replay = ReplayLog.from_file(str(log))
+    responses = [replay.lookup([("user", "hi")]).response for _ in range(3)]
+    assert responses == ["first", "second", "first"]
+    assert replay.lookup([("user", "other")]) is None
+
+
+def test_replay_distinguishes_anthropic_system_prompts(tmp_path, response_config):
+    def request(system):
+        return AnthropicChatRequest(
+            model="claude-3-sonnet-20240229",
+            messages=[AnthropicMessage(role="user", content="hello")],
+            system=system,
+        )
+
+    log = tmp_path / "capture.jsonl"
+    recorder = Recorder(str(log))
+    provider = AnthropicProvider(response_config, recorder=recorder)
+    for system, response in (("You are a pirate", "Ahoy"), ("You are a cat", "Meow")):
+        exchange = provider.start_exchange(request(system))
+        exchange.add(response)
+        exchange.finish()
+    recorder.close()
+
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert records[0]["messages"][0] == {
+        "role": "system",
+        "content": "You are a pirate",
+    }
+    provider = AnthropicProvider(response_config, replay=ReplayLog.from_file(str(log)))
+    assert provider.find_replay(request("you are a CAT")).response == "Meow"
+    assert provider.find_replay(request("You are a pirate")).response == "Ahoy"
+    assert provider.find_replay(request(None)) is None
+
+
+def test_recorded_pace_profile(tmp_path):
+    log = tmp_path / "capture.jsonl"
+    log.write_text(
+        json.dumps({"key": "k", "response": "abcd", "ttft": 0.5, "duration": 1.5})
+    )
+    entry = ReplayLog.from_file(str(log)).entries["k"][0]
+    recorded = ReplayLog({}, pace="recorded").profile(entry, tokens=4)
+    assert recorded.total_delay(4, None) == pytest.approx(1.5)
+    full = ReplayLog({}, pace="full").profile(entry, tokens=4)
+    assert full.total_delay(4, None) == 0
+
+
+def test_invalid_log_line(tmp_path):
+    log = tmp_path / "capture.jsonl"
+    log.write_text("not json\n")
+    with pytest.raises(ValueError):
+        ReplayLog.from_file(str(log))
+
+
+def test_history_key_only_hashes_new_turns():
+    history = [("user", f"turn {i}") for i in range(50)]
+    key = history_key(history)
+    with patch("mockllm.recording.normalize", side_effect=normalize) as spy:
+        extended = history_key(history + [("assistant", "next")])
+    assert spy.call_count == 1
+    assert extended != key
+    assert history_key([("user", "  TURN 0 ")]) == history_key(history[:1])
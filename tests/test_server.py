@@ -1,3 +1,4 @@
+import json
 from unittest.mock import mock_open, patch
 
 import pytest
@@ -83,6 +84,14 @@ def test_anthropic_streaming():
     )
     assert response.status_code == 200
     assert response.headers["content-type"] == "text/event-stream; charset=utf-8"
+    events = [
+        line[len("event: ") :]
+        for line in response.text.splitlines()
+        if line.startswith("event: ")
+    ]
+    assert events[0] == "message_start"
+    assert events[-2:] == ["message_delta", "message_stop"]
+    assert "[DONE]" not in response.text
 
 
 def test_invalid_request():
@@ -90,3 +99,66 @@ def test_invalid_request():
         "/v1/chat/completions", json={"model": "mock-llm", "messages": []}
     )
     assert response.status_code == 500
+
+
+def test_metrics_endpoint():
+    client.post(
+        "/v1/chat/completions",
+        json={
+            "model": "mock-llm",
+            "messages": [{"role": "user", "content": "test message"}],
+        },
+    )
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    # The config doesn't name mock-llm, so it isn't given a label of its own
+    assert (
+        'mockllm_requests_total{route="/v1/chat/completions",model="other"}'
+        in response.text
+    )
+    assert 'model="mock-llm"' not in response.text
+
+
+def test_openai_streaming_usage_and_max_tokens():
+    response = client.post(
+        "/v1/chat/completions",
+        json={
+            "model": "mock-llm",
+            "messages": [{"role": "user", "content": "test message"}],
+            "stream": True,
+            "max_tokens": 3,
+            "stream_options": {"include_usage": True},
+        },
+    )
+    assert response.status_code == 200
+    frames = [
+        line[len("data: ") :]
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert frames[-1] == "[DONE]"
+    chunks = [json.loads(frame) for frame in frames[:-1]]
+    text = "".join(
+        chunk["choices"][0]["delta"]["content"] or "" for chunk in chunks[:-1]
+    )
+    assert text == "I don't know"
+    assert chunks[-2]["choices"][0]["finish_reason"] == "length"
+    assert chunks[-1]["choices"] == []
+    assert chunks[-1]["usage"]["completion_tokens"] == 3
+    assert chunks[-1]["usage"]["prompt_tokens"] > 0
+
+
+def test_anthropic_max_tokens():
+    response = client.post(
+        "/v1/messages",
+        json={
+            "model": "claude-3-sonnet-20240229",
+            "max_tokens": 3,
+            "messages": [{"role": "user", "content": "test message"}],
+        },
+    )
+    data = response.json()
+    assert data["content"][0]["text"] == "I don't know"
+    assert data["stop_reason"] == "max_tokens"
+    assert data["usage"]["output_tokens"] == 3
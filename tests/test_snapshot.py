@@ -0,0 +1,123 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from mockllm import snapshot
+from mockllm.__main__ import main
+from mockllm.config import ResponseConfig, ResponseTable
+
+YAML_CONTENT = """
+responses:
+  "hello": "world"
+settings:
+  reload_mode: off
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text(YAML_CONTENT)
+    return path
+
+
+def test_load_builds_and_reuses_snapshot(config_path, tmp_path):
+    snapshot_path = str(tmp_path / "responses.snapshot.json")
+    data = snapshot.load(str(config_path), snapshot_path)
+    assert data["responses"] == {"hello": "world"}
+    assert data["settings"] == {"reload_mode": "off"}
+
+    with patch("mockllm.snapshot.parse") as parse:
+        assert snapshot.load(str(config_path), snapshot_path) == data
+        # Touched but unchanged: verified by hash, not re-parsed
+        os.utime(config_path, (0, 0))
+        assert snapshot.load(str(config_path), snapshot_path) == data
+    parse.assert_not_called()
+
+
+def test_stale_snapshot_is_rebuilt(config_path, tmp_path):
+    snapshot_path = str(tmp_path / "responses.snapshot.json")
+    snapshot.load(str(config_path), snapshot_path)
+    config_path.write_text(YAML_CONTENT.replace("world", "updated"))
+    data = snapshot.load(str(config_path), snapshot_path)
+    assert data["responses"] == {"hello": "updated"}
+    with open(snapshot_path) as f:
+        assert json.load(f)["data"] == data
+
+
+def test_unreadable_snapshot_is_ignored(config_path, tmp_path):
+    snapshot_path = tmp_path / "responses.snapshot.json"
+    snapshot_path.write_text("{not json")
+    data = snapshot.load(str(config_path), str(snapshot_path))
+    assert data["responses"] == {"hello": "world"}
+
+
+def test_response_config_uses_snapshot(config_path, tmp_path):
+    snapshot_path = str(tmp_path / "responses.snapshot.json")
+    ResponseConfig(str(config_path), snapshot_path=snapshot_path)
+    with patch("mockllm.snapshot.parse") as parse:
+        config = ResponseConfig(str(config_path), snapshot_path=snapshot_path)
+    parse.assert_not_called()
+    assert config.get_response("hello") == "world"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"responses": {"hello": ["not", "a", "string"]}},
+        {"settings": {"stream_mode": "word"}},
+        {"rules": [{"type": "prefix", "pattern": "hi"}]},
+        {"conversations": [{"turns": [{"user": "hi"}]}]},
+    ],
+)
+def test_schema_rejects_invalid_config(data):
+    with pytest.raises(ValueError):
+        ResponseTable.from_dict(data)
+
+
+def test_unknown_keys_are_ignored_with_a_warning(caplog):
+    table = ResponseTable.from_dict(
+        {"respones": {}, "settings": {"lag_enabeld": True, "lag_factor": 2}}
+    )
+    assert table.lag_enabled is False
+    assert table.lag_factor == 2
+    assert "did you mean 'lag_enabled'?" in caplog.text
+    assert "Ignoring unknown ResponseFile key 'respones'" in caplog.text
+
+
+def test_models_named_by_the_config():
+    table = ResponseTable.from_dict(
+        {
+            "settings": {
+                "model_encodings": {"a": "cl100k_base"},
+                "latency": {"models": {"b": {"ttft": 0.1}}},
+                "rate_limits": {"models": {"c": {"requests_per_minute": 1}}},
+                "embeddings": {"model_dimensions": {"d": 8}},
+            },
+            "faults": {"rules": [{"type": "error", "model": "e"}]},
+        }
+    )
+    assert table.models == {"a", "b", "c", "d", "e"}
+
+
+def test_fractional_lag_factor_is_allowed():
+    table = ResponseTable.from_dict({"settings": {"lag_factor": 2.5}})
+    assert table.lag_factor == 2.5
+
+
+def test_empty_sections_are_allowed():
+    table = ResponseTable.from_dict({"responses": None, "settings": None})
+    assert dict(table.responses) == {}
+
+
+def test_compile_command(config_path, tmp_path, capsys):
+    output = tmp_path / "compiled.json"
+    main(["compile", str(config_path), "-o", str(output)])
+    assert "Compiled 1 responses" in capsys.readouterr().out
+    assert json.loads(output.read_text())["data"]["responses"] == {"hello": "world"}
+
+    config_path.write_text("responses: [unterminated")
+    with pytest.raises(SystemExit):
+        main(["compile", str(config_path), "-o", str(output)])
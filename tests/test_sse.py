@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import pytest
+
+from mockllm.models import (
+    OpenAIDeltaMessage,
+    OpenAIStreamChoice,
+    OpenAIStreamResponse,
+)
+from mockllm.sse import AnthropicSSEEncoder, OpenAISSEEncoder, coalesce
+
+CONTENTS = [
+    "plain",
+    "",
+    'quotes " and \\ backslashes',
+    "newline\n tab\t return\r",
+    "".join(chr(i) for i in range(0x20)) + "\x7f",
+    "unicode é € 😀  ",
+]
+
+RESPONSE_ID = "mock-00000000-0000-0000-0000-000000000000"
+CREATED = 1700000000
+
+
+def openai_frame(model, **choice):
+    response = OpenAIStreamResponse(
+        id=RESPONSE_ID,
+        created=CREATED,
+        model=model,
+        choices=[OpenAIStreamChoice(**choice)],
+    )
+    return f"data: {response.model_dump_json()}\n\n".encode()
+
+
+@pytest.mark.parametrize("model", ["mock-llm", 'odd "model" é'])
+@pytest.mark.parametrize("content", CONTENTS)
+def test_openai_frames_match_pydantic(model, content):
+    encoder = OpenAISSEEncoder(model, response_id=RESPONSE_ID, created=CREATED)
+    assert encoder.content(content) == openai_frame(
+        model, delta=OpenAIDeltaMessage(content=content)
+    )
+    assert encoder.role() == openai_frame(
+        model, delta=OpenAIDeltaMessage(role="assistant")
+    )
+    assert encoder.finish() == openai_frame(
+        model, delta=OpenAIDeltaMessage(), finish_reason="stop"
+    )
+
+
+def test_openai_usage_frame():
+    encoder = OpenAISSEEncoder(
+        'odd "model" é', response_id=RESPONSE_ID, created=CREATED
+    )
+    frame = encoder.usage(12, 7)
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    assert json.loads(frame[len(b"data: ") :]) == {
+        "id": RESPONSE_ID,
+        "object": "chat.completion.chunk",
+        "created": CREATED,
+        "model": 'odd "model" é',
+        "choices": [],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 7, "total_tokens": 19},
+    }
+
+
+def parse_events(stream):
+    events = []
+    for frame in stream.decode().split("\n\n")[:-1]:
+        name, data = frame.split("\n")
+        assert name.startswith("event: ") and data.startswith("data: ")
+        events.append((name[len("event: ") :], json.loads(data[len("data: ") :])))
+    return events
+
+
+@pytest.mark.parametrize("content", CONTENTS)
+def test_anthropic_event_sequence(content):
+    encoder = AnthropicSSEEncoder('odd "model" é', response_id=RESPONSE_ID)
+    stream = encoder.start(12) + encoder.content(content) + encoder.finish(7)
+    events = parse_events(stream)
+    assert [name for name, _ in events] == [
+        "message_start",
+        "content_block_start",
+        "ping",
+        "content_block_delta",
+        "content_block_stop",
+        "message_delta",
+        "message_stop",
+    ]
+    assert all(data["type"] == name for name, data in events)
+    message = events[0][1]["message"]
+    assert message["id"] == RESPONSE_ID
+    assert message["model"] == 'odd "model" é'
+    assert message["usage"] == {"input_tokens": 12, "output_tokens": 1}
+    assert events[3][1]["delta"] == {"type": "text_delta", "text": content}
+    assert events[5][1] == {
+        "type": "message_delta",
+        "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+        "usage": {"output_tokens": 7},
+    }
+
+
+def test_coalesce():
+    async def frames():
+        for frame in (b"a", b"b", b"c", b"d", b"e"):
+            yield frame
+
+    async def collect(count):
+        return [frame async for frame in coalesce(frames(), count)]
+
+    assert asyncio.run(collect(2)) == [b"ab", b"cd", b"e"]
+    assert asyncio.run(collect(1)) == [b"a", b"b", b"c", b"d", b"e"]
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from mockllm.streaming import ABORTED, cancel_on_disconnect
+
+
+def connected():
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    return disconnected, receive
+
+
+def test_frames_pass_through():
+    async def frames():
+        for frame in (b"a", b"b", b"c"):
+            await asyncio.sleep(0)
+            yield frame
+
+    async def collect():
+        _, receive = connected()
+        return [f async for f in cancel_on_disconnect(frames(), receive, "/test")]
+
+    before = ABORTED.get("/test", "disconnect")
+    assert asyncio.run(collect()) == [b"a", b"b", b"c"]
+    assert ABORTED.get("/test", "disconnect") == before
+
+
+def test_disconnect_cancels_pending_sleep():
+    cleaned_up = []
+
+    async def frames():
+        try:
+            yield b"first"
+            await asyncio.sleep(60)
+            yield b"never"
+        finally:
+            cleaned_up.append(True)
+
+    async def run():
+        disconnected, receive = connected()
+        received = []
+        stream = cancel_on_disconnect(frames(), receive, "/test")
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, disconnected.set)
+        start = loop.time()
+        async for frame in stream:
+            received.append(frame)
+        return received, loop.time() - start
+
+    before = ABORTED.get("/test", "disconnect")
+    received, elapsed = asyncio.run(run())
+    assert received == [b"first"]
+    assert elapsed < 5
+    assert cleaned_up == [True]
+    assert ABORTED.get("/test", "disconnect") == before + 1
+
+
+def test_errors_propagate():
+    async def frames():
+        yield b"first"
+        raise RuntimeError("boom")
+
+    async def run():
+        _, receive = connected()
+        return [f async for f in cancel_on_disconnect(frames(), receive, "/test")]
+
+    before = ABORTED.get("/test", "error")
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert ABORTED.get("/test", "error") == before + 1
+
+
+def test_closing_the_stream_cancels_the_producer():
+    cleaned_up = []
+
+    async def frames():
+        try:
+            while True:
+                yield b"frame"
+        finally:
+            cleaned_up.append(True)
+
+    async def run():
+        _, receive = connected()
+        stream = cancel_on_disconnect(frames(), receive, "/test")
+        assert await stream.__anext__() == b"frame"
+        await stream.aclose()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert cleaned_up == [True]
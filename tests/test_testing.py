@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from mockllm.testing import MockLLM
+
+CHAT = {"model": "mock-llm", "messages": [{"role": "user", "content": "hello"}]}
+
+
+def reply(response):
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def test_apps_are_isolated():
+    first = MockLLM({"responses": {"hello": "first"}})
+    second = MockLLM({"responses": {"hello": "second"}})
+    with first.client() as a, second.client() as b:
+        assert reply(a.post("/v1/chat/completions", json=CHAT)) == "first"
+        assert reply(b.post("/v1/chat/completions", json=CHAT)) == "second"
+
+        first.configure({"responses": {"hello": "changed"}})
+        assert reply(a.post("/v1/chat/completions", json=CHAT)) == "changed"
+        assert reply(b.post("/v1/chat/completions", json=CHAT)) == "second"
+
+
+def test_async_client_streams():
+    mock = MockLLM({"responses": {"hello": "Hi there"}})
+
+    async def stream():
+        async with mock.async_client() as client:
+            response = await client.post(
+                "/v1/messages",
+                json={**CHAT, "model": "claude-3", "stream": True},
+            )
+            return response.text
+
+    assert "event: message_stop" in asyncio.run(stream())
+
+
+def test_responses_file(tmp_path):
+    path = tmp_path / "responses.yml"
+    path.write_text('responses:\n  "hello": "from file"\n')
+    with MockLLM(str(path)).client() as client:
+        assert reply(client.post("/v1/chat/completions", json=CHAT)) == "from file"
+
+
+def test_invalid_config():
+    with pytest.raises(ValueError):
+        MockLLM({"settings": {"stream_mode": "bytes"}})
+
+
+def test_default_fixture(mockllm_client):  # noqa: F811
+    response = mockllm_client.post("/v1/chat/completions", json=CHAT)
+    assert reply(response) == "I don't know the answer to that."
+
+
+@pytest.mark.mockllm(responses={"hello": "marked"})
+def test_marker_configures_fixture(mockllm, mockllm_client):  # noqa: F811
+    assert reply(mockllm_client.post("/v1/chat/completions", json=CHAT)) == "marked"
+    mockllm.configure({"responses": {"hello": "reconfigured"}})
+    response = mockllm_client.post("/v1/chat/completions", json=CHAT)
+    assert reply(response) == "reconfigured"
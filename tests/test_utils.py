@@ -0,0 +1,92 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from mockllm.utils import ANTHROPIC_FORMAT, OPENAI_FORMAT, TokenCounter
+
+
+def test_unknown_model_is_resolved_once():
+    counter = TokenCounter()
+    with patch(
+        "mockllm.utils.tiktoken.encoding_for_model", side_effect=KeyError("mock-llm")
+    ) as lookup:
+        assert counter.count("one two three", "mock-llm") == 3
+        assert counter.count("one two", "mock-llm") == 2
+    lookup.assert_called_once_with("mock-llm")
+
+
+def test_model_encoding_mapping():
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2, 3, 4]
+    counter = TokenCounter({"mock-llm": "cl100k_base"})
+    with patch(
+        "mockllm.utils.tiktoken.get_encoding", return_value=encoding
+    ) as get_encoding:
+        assert counter.count("hello", "mock-llm") == 4
+        assert counter.count("hello", "mock-llm") == 4
+    get_encoding.assert_called_once_with("cl100k_base")
+
+
+def test_cached_counts():
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2]
+    counter = TokenCounter()
+    with patch("mockllm.utils.tiktoken.encoding_for_model", return_value=encoding):
+        for _ in range(3):
+            assert counter.count_cached("canned response", "gpt-4") == 2
+    encoding.encode.assert_called_once()
+
+
+def test_count_messages_adds_format_overhead():
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text, **kwargs: text.split()
+    counter = TokenCounter()
+    messages = [("system", "be brief"), ("user", "hello there world")]
+    with patch("mockllm.utils.tiktoken.encoding_for_model", return_value=encoding):
+        # 3 per message, 3 to prime the reply, plus roles and contents
+        assert counter.count_messages(messages, "gpt-4", OPENAI_FORMAT) == 16
+        # Roles aren't counted, and the reply is primed with a single token
+        assert counter.count_messages(messages, "gpt-4", ANTHROPIC_FORMAT) == 12
+
+
+def test_message_counts_are_cached_by_content():
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2]
+    counter = TokenCounter()
+    history = [("user", "first"), ("assistant", "reply")]
+    with patch("mockllm.utils.tiktoken.encoding_for_model", return_value=encoding):
+        counter.count_messages(history, "gpt-4")
+        calls = encoding.encode.call_count
+        # The next turn resends the history; only the new message is encoded
+        counter.count_messages(history + [("user", "second")], "gpt-4")
+    assert encoding.encode.call_count == calls + 1
+
+
+def test_approximate_prompt_tokens():
+    counter = TokenCounter(prompt_tokens="approximate")
+    with patch("mockllm.utils.tiktoken.encoding_for_model") as lookup:
+        assert counter.count_message("x" * 400, "gpt-4") == 100
+        assert counter.count_message("é" * 2, "gpt-4") == 1
+    lookup.assert_not_called()
+
+    counter = TokenCounter(approximate_above=100)
+    with patch("mockllm.utils.tiktoken.encoding_for_model", side_effect=KeyError):
+        assert counter.count_message("one two", "gpt-4") == 2
+        assert counter.count_message("word " * 100, "gpt-4") == 125
+
+
+def test_invalid_prompt_token_mode():
+    with pytest.raises(ValueError):
+        TokenCounter(prompt_tokens="fast")
+
+
+def test_truncate_without_encoding_keeps_whitespace():
+    counter = TokenCounter()
+    with patch(
+        "mockllm.utils.tiktoken.encoding_for_model", side_effect=KeyError("mock-llm")
+    ):
+        assert counter.truncate("one  two\nthree four", 3, "mock-llm") == (
+            "one  two\nthree"
+        )
+        assert counter.truncate("one two", 2, "mock-llm") == "one two"
+        assert counter.truncate("one two", 0, "mock-llm") == ""